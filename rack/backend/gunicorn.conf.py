@@ -0,0 +1,39 @@
+"""
+gunicorn.conf.py — multi-worker production server for the Rack backend.
+
+    cd rack/backend
+    gunicorn main:app -c gunicorn.conf.py
+
+preload_app imports main:app once in the master; when_ready then loads the
+embedding model and read-only lookup tables there (warmup.preload_shared_assets)
+before any worker forks. Workers share those pages copy-on-write instead of each
+loading its own ~90 MB model copy, so more workers fit per host. Each worker
+still runs its own lifespan warm-up batch and gates /health on it.
+"""
+
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+os.environ["WEB_CONCURRENCY"] = str(workers)  # llm_client splits the account rate limits by this
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+
+def when_ready(server):
+    """Master, app already imported, workers not yet forked."""
+    from services.warmup import preload_shared_assets
+    preload_shared_assets()
+
+
+def post_fork(server, worker):
+    """Split CPU threads across workers so N model copies don't oversubscribe cores."""
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
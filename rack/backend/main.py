@@ -1,6 +1,8 @@
 """
 main.py — FastAPI entry point for Rack backend
 CORS configured for localhost:5173 (Vite dev server)
+Startup warm-up (model load, skill matchers, optional FAISS preload) runs in
+the background; /health returns 503 until the worker is warm.
 """
 
 from dotenv import load_dotenv
@@ -9,15 +11,34 @@ load_dotenv()
 import logging
 logging.basicConfig(level=logging.INFO)
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 from routers import resumes, match, tracking, account, auth
+from services import http_clients
+from services.warmup import WARMUP_STATE, run_warmup
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pooled outbound HTTP clients (keep-alive, HTTP/2 when available)
+    await http_clients.start()
+    # Warm up off the event loop so the worker can answer /health (503) meanwhile
+    warmup_task = asyncio.create_task(asyncio.to_thread(run_warmup))
+    yield
+    warmup_task.cancel()
+    await http_clients.stop()
+
 
 app = FastAPI(
     title="Rack — Career Intelligence API",
     version="0.1.0",
     description="AI-powered resume matching and career tracking",
+    lifespan=lifespan,
 )
 
 # CORS — allow Vite dev server
@@ -44,4 +65,13 @@ async def root():
 
 @app.get("/health")
 async def health():
-    return {"status": "healthy"}
\ No newline at end of file
+    # Readiness: only report healthy once warm-up finished
+    if not WARMUP_STATE["ready"]:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": "failed" if WARMUP_STATE["error"] else "warming_up",
+                "warmup": WARMUP_STATE,
+            },
+        )
+    return {"status": "healthy", "warmup": WARMUP_STATE}
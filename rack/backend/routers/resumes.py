@@ -20,6 +20,7 @@ Endpoints:
   POST   /api/resumes/migrate         → bulk migrate localStorage resumes on sign-in
 """
 
+import asyncio
 import base64
 import logging
 import os
@@ -27,7 +28,6 @@ import uuid
 from pathlib import Path
 from typing import Optional
 
-import httpx
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import select
@@ -36,6 +36,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from db.database import get_db
 from models.orm import Resume, ResumeChunk
 from routers.auth import get_current_user
+from services.http_clients import get_async_client
 from services.ingestion import ingest_resume_bytes
 from fastapi import Request
 
@@ -66,19 +67,18 @@ async def _upload_to_storage(user_id: uuid.UUID, filename: str, content: bytes,
     storage_path = f"{user_id}/{filename}"
     url = f"{SUPABASE_URL}/storage/v1/object/{STORAGE_BUCKET}/{storage_path}"
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            url,
-            content=content,
-            headers={
-                "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-                "Content-Type": content_type,
-                "x-upsert": "true",  # overwrite if same filename
-            },
-        )
-        if resp.status_code not in (200, 201):
-            logger.error(f"Storage upload failed: {resp.status_code} {resp.text}")
-            raise HTTPException(status_code=500, detail="Failed to upload file to storage.")
+    resp = await get_async_client().post(
+        url,
+        content=content,
+        headers={
+            "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+            "Content-Type": content_type,
+            "x-upsert": "true",  # overwrite if same filename
+        },
+    )
+    if resp.status_code not in (200, 201):
+        logger.error(f"Storage upload failed: {resp.status_code} {resp.text}")
+        raise HTTPException(status_code=500, detail="Failed to upload file to storage.")
 
     return storage_path
 
@@ -90,30 +90,28 @@ async def _get_signed_url(storage_path: str, expires_in: int = 3600) -> str:
     """
     url = f"{SUPABASE_URL}/storage/v1/object/sign/{STORAGE_BUCKET}/{storage_path}"
 
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            url,
-            json={"expiresIn": expires_in},
-            headers={
-                "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
-                "Content-Type": "application/json",
-            },
-        )
-        if resp.status_code != 200:
-            raise HTTPException(status_code=500, detail="Failed to generate signed URL.")
-        data = resp.json()
-        return f"{SUPABASE_URL}/storage/v1{data['signedURL']}"
+    resp = await get_async_client().post(
+        url,
+        json={"expiresIn": expires_in},
+        headers={
+            "Authorization": f"Bearer {SUPABASE_SERVICE_KEY}",
+            "Content-Type": "application/json",
+        },
+    )
+    if resp.status_code != 200:
+        raise HTTPException(status_code=500, detail="Failed to generate signed URL.")
+    data = resp.json()
+    return f"{SUPABASE_URL}/storage/v1{data['signedURL']}"
 
 
 async def _delete_from_storage(storage_path: str) -> None:
     """Delete a file from Supabase Storage."""
     url = f"{SUPABASE_URL}/storage/v1/object/{STORAGE_BUCKET}/{storage_path}"
 
-    async with httpx.AsyncClient() as client:
-        await client.delete(
-            url,
-            headers={"Authorization": f"Bearer {SUPABASE_SERVICE_KEY}"},
-        )
+    await get_async_client().delete(
+        url,
+        headers={"Authorization": f"Bearer {SUPABASE_SERVICE_KEY}"},
+    )
 
 
 # ── Anonymous upload ──────────────────────────────────────────────────────────
@@ -158,8 +156,12 @@ async def upload_resume(
     # ── Run ingestion pipeline ────────────────────────────────────────────
     # ingest_resume_bytes() is the same pipeline as before but takes bytes
     # instead of a file path. See services/ingestion.py for the signature.
+    # It runs in a worker thread: extraction, embedding and the optional LLM
+    # extraction call are blocking and must not stall the event loop.
     try:
-        resume_data = ingest_resume_bytes(content, file.filename, session_id=session_id)
+        resume_data = await asyncio.to_thread(
+            ingest_resume_bytes, content, file.filename, session_id=session_id,
+        )
     except Exception as e:
         logger.error(f"Ingestion failed for {file.filename}: {e}")
         raise HTTPException(status_code=500, detail=f"Ingestion failed: {str(e)}")
@@ -30,11 +30,15 @@ Ranking formula (post Phase 2):
 Pipeline steps:
   1.  Load uploads/user_profile.json → get target_roles
   2.  If pool stale or force=True → fan out ~80 Greenhouse boards in parallel
+      → job_enricher parses + embeds new/changed postings once (unchanged
+        content hash = reused), vectors in auto_job_pool.vectors.npz
   3.  Filter pool by target_role (ROLE_MATCH_RATIO word-overlap on title)
   4.  Remove seen_job_ids
   5.  If all seen → reset seen list
-  6.  Sort unseen by posted_at descending
-  7.  Phase 1: match_resumes(desc, use_llm=False) for each job → collect ALL
+  6.  Job index: each resume retrieves its top PHASE1_JOBS_PER_RESUME unseen
+      jobs by embedding similarity (job_index); the union is the candidate set,
+      sorted by posted_at descending
+  7.  Phase 1: match_resumes_batch(descs, use_llm=False) over all candidates → collect ALL
       resumes above PHASE2_THRESHOLD per job (not just the best one)
   8.  Phase 2: LLM deep score all qualifying (job × resume) pairs concurrently
   9.  Per job: pick best LLM-scored resume as the display entry
@@ -55,6 +59,8 @@ import httpx
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 
+from services.http_clients import get_async_client
+
 logger = logging.getLogger(__name__)
 
 # ── Storage ──────────────────────────────────────────────────────────
@@ -62,6 +68,7 @@ WATCHLIST_DIR = os.path.join("uploads", "watchlist")
 AUTO_RESULTS_PATH = os.path.join(WATCHLIST_DIR, "auto_match_results.json")
 AUTO_META_PATH    = os.path.join(WATCHLIST_DIR, "auto_match_meta.json")
 AUTO_POOL_PATH    = os.path.join(WATCHLIST_DIR, "auto_job_pool.json")
+AUTO_POOL_VECTORS_PATH = os.path.join(WATCHLIST_DIR, "auto_job_pool.vectors.npz")  # job_enricher sidecar
 
 # ── Tunables ─────────────────────────────────────────────────────────
 DISPLAY_CAP             = 20    # Jobs shown to user
@@ -74,9 +81,10 @@ PHASE2_THRESHOLD        = 60    # Min hybrid % to qualify for Phase 2 LLM scorin
                                  # 45% → ~2500 pairs (way too many)
                                  # 55% → ~165 pairs (still scores weak matches)
                                  # 60% → ~40-80 pairs (only genuine candidates)
-PHASE1_JOB_CAP          = 100   # Max jobs scored per refresh. Prevents 580-job blowouts
-                                 # on first run. Sorted by recency — newest jobs first.
-                                 # Remaining jobs are picked up on next refresh.
+PHASE1_JOBS_PER_RESUME  = 40    # Job index candidates per resume (reverse retrieval)
+PHASE1_JOB_CAP          = 100   # Fallback when the pool has no vectors: max jobs scored
+                                 # per refresh, newest first. Prevents 580-job blowouts
+                                 # on first run. Remaining jobs are picked up on next refresh.
 MIN_DESC_LEN            = 100   # Skip jobs with short descriptions
 STALE_HOURS             = 24    # Pool refresh interval
 MAX_CONCURRENT          = 15    # Parallel Greenhouse requests (semaphore)
@@ -130,13 +138,12 @@ async def _fetch_greenhouse(board_token: str, semaphore: asyncio.Semaphore) -> l
     url = f"https://boards-api.greenhouse.io/v1/boards/{board_token}/jobs?content=true"
     async with semaphore:
         try:
-            async with httpx.AsyncClient(timeout=FETCH_TIMEOUT) as client:
-                resp = await client.get(url)
-                if resp.status_code == 404:
-                    logger.debug(f"[Greenhouse] 404 for board: {board_token}")
-                    return []
-                resp.raise_for_status()
-                data = resp.json()
+            resp = await get_async_client().get(url, timeout=FETCH_TIMEOUT)
+            if resp.status_code == 404:
+                logger.debug(f"[Greenhouse] 404 for board: {board_token}")
+                return []
+            resp.raise_for_status()
+            data = resp.json()
         except httpx.HTTPStatusError as e:
             logger.warning(f"[Greenhouse] {board_token} HTTP {e.response.status_code}")
             return []
@@ -334,8 +341,8 @@ async def run_auto_pipeline(force: bool = False) -> dict:
           "from_cache": bool,
         }
     """
-    from services.matcher import match_resumes
-    from services.ingestion import get_resume_by_id
+    from services.matcher import match_resumes_batch
+    from services.ingestion import get_resumes_full
     from services.llm_scorer import llm_score_batch, rerank_by_llm_score
 
     # ── Load user profile ─────────────────────────────────────────────
@@ -392,6 +399,10 @@ async def run_auto_pipeline(force: bool = False) -> dict:
                 raw_pool.extend(r)
 
         logger.info(f"[AutoMatch] Pool: {len(raw_pool)} jobs from {len(GREENHOUSE_COMPANIES) - failed} boards ({failed} failed)")
+
+        # Parse + embed new/changed postings once, here — Phase 1 only scores
+        from services.job_enricher import enrich_jobs
+        await enrich_jobs(raw_pool, previous_jobs=_load_job_pool(), vectors_path=AUTO_POOL_VECTORS_PATH)
         _save_job_pool(raw_pool)
         meta["last_pool_fetch_at"] = datetime.now(timezone.utc).isoformat()
     else:
@@ -469,11 +480,24 @@ async def run_auto_pipeline(force: bool = False) -> dict:
         except Exception:
             return datetime.min.replace(tzinfo=timezone.utc)
 
+    # Reverse retrieval: each resume queries the pool's job index for its
+    # top-N jobs; only those go through Phase 1. Jobs outside every resume's
+    # top-N are left unseen, so they stay eligible as the pool changes.
+    from services.job_index import select_candidate_jobs
+    candidates = select_candidate_jobs(unseen, AUTO_POOL_VECTORS_PATH, top_n=PHASE1_JOBS_PER_RESUME)
+    if candidates is not None:
+        logger.info(
+            f"[AutoMatch] Job index: {len(candidates)} candidate jobs of {len(unseen)} unseen "
+            f"(top {PHASE1_JOBS_PER_RESUME} per resume)"
+        )
+        unseen = candidates
+
     unseen_sorted = sorted(unseen, key=_posted_sort_key, reverse=True)
 
-    # Cap Phase 1 to newest N jobs — prevents first-run / reset from scoring
-    # 500+ jobs at once and generating thousands of LLM pairs.
-    if len(unseen_sorted) > PHASE1_JOB_CAP:
+    # Fallback when the pool has no vectors yet (fetched before enrichment) or
+    # no resume is indexed: cap Phase 1 to newest N jobs — prevents first-run /
+    # reset from scoring 500+ jobs at once and generating thousands of LLM pairs.
+    if candidates is None and len(unseen_sorted) > PHASE1_JOB_CAP:
         logger.info(
             f"[AutoMatch] Capping Phase 1 to {PHASE1_JOB_CAP} most-recent jobs "
             f"({len(unseen_sorted) - PHASE1_JOB_CAP} deferred to next run)"
@@ -486,18 +510,35 @@ async def run_auto_pipeline(force: bool = False) -> dict:
     scored_count  = 0
     parsed_jd_cache = {}  # job_id → parsed_jd (reused in Phase 2)
 
+    from services.job_enricher import load_job_vectors
+    job_vectors = load_job_vectors(AUTO_POOL_VECTORS_PATH)
+
     logger.info(f"[AutoMatch] Phase 1: scoring {len(unseen_sorted)} jobs with hybrid scorer…")
 
+    scorable = []
     for job in unseen_sorted:
-        desc = job.get("description_text", "").strip()
-        if len(desc) < MIN_DESC_LEN:
+        if len(job.get("description_text", "").strip()) < MIN_DESC_LEN:
             seen_ids.add(job["job_id"])
-            continue
+        else:
+            scorable.append(job)
 
-        try:
-            result = await match_resumes(jd_text=desc, use_llm=False)
-        except Exception as e:
-            logger.error(f"[AutoMatch] Phase 1 scoring error for '{job.get('title')}': {e}")
+    # One batched pass over all jobs: resumes loaded once, one embedding
+    # batch + one vector search, then the jobs × resumes grid is scored
+    try:
+        batch_results = await match_resumes_batch(
+            [job["description_text"].strip() for job in scorable],
+            use_llm=False,
+            parsed_jds=[job.get("parsed_jd") for job in scorable],
+            jd_embeddings=[job_vectors.get(job["job_id"]) for job in scorable],
+        )
+    except Exception as e:
+        logger.error(f"[AutoMatch] Phase 1 batch scoring error ({len(scorable)} jobs): {e}")
+        batch_results = []
+    resumes_by_id = {r["id"]: r for r in get_resumes_full()}
+
+    for job, result in zip(scorable, batch_results):
+        if result["meta"].get("error"):
+            logger.error(f"[AutoMatch] Phase 1 scoring error for '{job.get('title')}': {result['meta']['error']}")
             continue
 
         scored_count += 1
@@ -524,7 +565,7 @@ async def run_auto_pipeline(force: bool = False) -> dict:
         for resume_match in qualifying:
             hybrid_score = round(resume_match.get("raw_score", 0) * 100)
             resume_id = resume_match.get("resume_id", "")
-            full_resume = get_resume_by_id(resume_id)
+            full_resume = resumes_by_id.get(resume_id)
             if not full_resume:
                 continue
 
@@ -0,0 +1,250 @@
+"""
+cache_store.py
+Small persistent key → bytes cache on SQLite, shared by the services that
+memoize expensive work (embeddings, parsed JDs, LLM verdicts).
+
+Why SQLite:
+  - Ships with Python, no server, one file per cache
+  - WAL mode lets every uvicorn worker read while one writes
+  - Batch lookups are a single indexed SELECT ... WHERE key IN (...)
+
+Design decisions:
+  1. Content-addressed keys — callers hash everything that affects the value
+     (model name, prompt, flags, input text) with make_key(); a change in any
+     of them is simply a different key, so nothing needs explicit invalidation
+  2. Values are opaque bytes — embeddings store raw float32, JSON users go
+     through get_json()/set_json()
+  3. Bounded — optional TTL (expired rows are misses and get purged) and a
+     max row count enforced by dropping least-recently-used rows. Recency is
+     kept at TOUCH_SLACK_SECONDS granularity, so repeat hits stay read-only
+  4. Best effort — a cache that can't be opened or written degrades to a miss,
+     it never fails the request
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+# ═══════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════
+
+BASE_DIR = Path(__file__).resolve().parent.parent.parent  # rack/
+CACHE_DIR = BASE_DIR / "uploads" / "cache"
+
+EVICT_EVERY_WRITES = 500           # Check the row limit every N inserted rows
+SQLITE_MAX_VARIABLES = 900         # Stay under SQLite's bound-parameter limit per statement
+TOUCH_SLACK_SECONDS = 3600.0       # A hit only rewrites accessed_at once it is older than this
+
+
+def make_key(*parts: Any) -> str:
+    """Content-addressed cache key: sha256 over the parts (NUL-separated)."""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class SqliteCache:
+    """
+    Key → bytes store with LRU row limit and optional TTL.
+
+    Thread-safe within a process (one connection behind a lock); safe across
+    processes through SQLite's own locking.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        path: Optional[Path] = None,
+    ):
+        self.name = name
+        self.path = Path(path) if path else CACHE_DIR / f"{name}.sqlite"
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._writes_since_evict = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+
+    # ── Connection ──────────────────────────────────────────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    # ── Reads ───────────────────────────────────────────────────────
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """Look up many keys in one pass. Returns only the keys found (and fresh)."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        now = time.time()
+        found: Dict[str, bytes] = {}
+        stale: List[str] = []  # hits whose accessed_at is past the touch slack
+        with self._lock:
+            try:
+                conn = self._connect()
+                for start in range(0, len(keys), SQLITE_MAX_VARIABLES):
+                    batch = keys[start:start + SQLITE_MAX_VARIABLES]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = conn.execute(
+                        f"SELECT key, value, created_at, accessed_at FROM entries "
+                        f"WHERE key IN ({placeholders})",
+                        batch,
+                    ).fetchall()
+                    for key, value, created_at, accessed_at in rows:
+                        if self.ttl_seconds is None or now - created_at <= self.ttl_seconds:
+                            found[key] = bytes(value)
+                            if now - accessed_at > TOUCH_SLACK_SECONDS:
+                                stale.append(key)
+                # LRU touch — one write transaction per lookup at most, and none
+                # for keys touched within the slack (the common hot-key case)
+                for start in range(0, len(stale), SQLITE_MAX_VARIABLES - 1):
+                    batch = stale[start:start + SQLITE_MAX_VARIABLES - 1]
+                    conn.execute(
+                        f"UPDATE entries SET accessed_at = ? WHERE key IN ({','.join('?' * len(batch))})",
+                        [now, *batch],
+                    )
+                if stale:
+                    conn.commit()
+            except (sqlite3.Error, OSError) as e:
+                self.errors += 1
+                print(f"[cache_store] {self.name}: read failed ({e}) — treating as miss")
+                found = {}
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.get_many([key]).get(key)
+
+    def get_json(self, key: str) -> Optional[Any]:
+        value = self.get(key)
+        return json.loads(value) if value is not None else None
+
+    # ── Writes ──────────────────────────────────────────────────────
+
+    def set_many(self, items: Dict[str, bytes]):
+        """Insert or replace many entries in one transaction."""
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.executemany(
+                    "INSERT OR REPLACE INTO entries (key, value, created_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    [(key, sqlite3.Binary(value), now, now) for key, value in items.items()],
+                )
+                conn.commit()
+                self.writes += len(items)
+                self._writes_since_evict += len(items)
+                if self._writes_since_evict >= EVICT_EVERY_WRITES:
+                    self._evict(conn, now)
+            except (sqlite3.Error, OSError) as e:
+                self.errors += 1
+                print(f"[cache_store] {self.name}: write failed ({e}) — entries not cached")
+
+    def set(self, key: str, value: bytes):
+        self.set_many({key: value})
+
+    def set_json(self, key: str, value: Any):
+        self.set(key, json.dumps(value, separators=(",", ":"), default=str).encode("utf-8"))
+
+    def delete(self, key: str):
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                conn.commit()
+            except (sqlite3.Error, OSError) as e:
+                self.errors += 1
+                print(f"[cache_store] {self.name}: delete failed ({e})")
+
+    # ── Eviction ────────────────────────────────────────────────────
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """Purge expired rows, then least-recently-used rows beyond max_entries."""
+        self._writes_since_evict = 0
+        removed = 0
+        if self.ttl_seconds is not None:
+            removed += conn.execute(
+                "DELETE FROM entries WHERE created_at < ?", (now - self.ttl_seconds,)
+            ).rowcount
+        if self.max_entries is not None:
+            (count,) = conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+            if count > self.max_entries:
+                removed += conn.execute(
+                    "DELETE FROM entries WHERE key IN ("
+                    " SELECT key FROM entries ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,),
+                ).rowcount
+        conn.commit()
+        self.evictions += removed
+
+    def evict(self):
+        """Run TTL + size eviction now (normally runs every EVICT_EVERY_WRITES writes)."""
+        with self._lock:
+            try:
+                self._evict(self._connect(), time.time())
+            except (sqlite3.Error, OSError) as e:
+                self.errors += 1
+                print(f"[cache_store] {self.name}: eviction failed ({e})")
+
+    def clear(self):
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute("DELETE FROM entries")
+                conn.commit()
+            except (sqlite3.Error, OSError) as e:
+                self.errors += 1
+                print(f"[cache_store] {self.name}: clear failed ({e})")
+
+    # ── Metrics ─────────────────────────────────────────────────────
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "path": str(self.path),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+        }
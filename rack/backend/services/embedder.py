@@ -11,37 +11,201 @@ This model:
 
 Design decisions:
   - Model loaded once as a singleton (not per-request)
-  - Batch encoding for efficiency (all chunks at once)
+  - Batch encoding for efficiency (all chunks at once), length-bucketed:
+    texts are sorted by token count and cut into batches under a padded-token
+    budget, so short skill chunks aren't padded to 190-word experience chunks;
+    texts over the 256-token window are counted and reported as truncated
   - Normalized embeddings (unit vectors) so cosine similarity = dot product
   - Same model used for both resume chunks AND job description queries
     (critical: query and document must share the same embedding space)
+  - Content-addressed embedding cache: vectors keyed by hash(model, normalize,
+    text), an in-memory LRU in front of a persistent SQLite store, so
+    re-uploaded chunks, repeated JD queries and re-scored postings skip the
+    model — only cache misses are encoded
+  - Async callers go through a micro-batching queue: concurrent requests
+    arriving within EMBED_BATCH_WINDOW_MS are encoded as one batch in a worker
+    thread, so the event loop never blocks on the model
+  - Pluggable CPU backend (EMBED_BACKEND): PyTorch, the exported ONNX graph,
+    or its dynamically int8-quantized variant via ONNX Runtime. Check a backend
+    against PyTorch and time it with:
+        python -m services.embedder parity --backend onnx-int8
+        python -m services.embedder bench
 
 """
 
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-from typing import List, Optional
+from typing import Dict, List, Optional
+
+from services.cache_store import SqliteCache, make_key
+
+# ═══════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+
+# "torch" (reference), "onnx" (fp32 graph) or "onnx-int8" (dynamic int8 quantized).
+# ONNX backends need: pip install "optimum[onnxruntime]"
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "torch")
+ONNX_MODEL_FILES = {
+    "onnx": "onnx/model.onnx",
+    "onnx-int8": "onnx/model_quint8_avx2.onnx",  # Shipped in the model repo; AVX2 covers our x86 hosts
+}
+EMBED_TOKEN_BUDGET = 8192          # Padded tokens per forward pass (= 32 texts × 256 tokens)
+EMBED_MAX_BATCH_ITEMS = 256        # Cap on texts per forward pass, however short
+PARITY_MIN_COSINE = 0.98           # A backend passes parity if every corpus vector agrees this well
+EMBED_CACHE_MEMORY_ITEMS = 4096    # Hot vectors kept in-process (~6 MB)
+EMBED_CACHE_MAX_ENTRIES = 200_000  # Vectors kept on disk (~300 MB), LRU beyond that
+EMBED_BATCH_WINDOW_MS = 5          # Async queue: wait this long for more requests to batch
+EMBED_MAX_BATCH = 64               # Async queue: flush early once this many texts are waiting
 
 # Lazy-loaded singleton — avoids loading the model on import
 _model = None
 
 
+def _load_model(backend: str):
+    """Load MODEL_NAME on the given backend ("torch", "onnx", "onnx-int8")."""
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(MODEL_NAME)
+    if backend in ONNX_MODEL_FILES:
+        try:
+            return SentenceTransformer(
+                MODEL_NAME,
+                backend="onnx",
+                model_kwargs={"file_name": ONNX_MODEL_FILES[backend]},
+            )
+        except ImportError as e:
+            raise RuntimeError(
+                f"EMBED_BACKEND={backend} needs ONNX Runtime: pip install \"optimum[onnxruntime]\""
+            ) from e
+    raise ValueError(f"Unknown EMBED_BACKEND {backend!r} (torch, {', '.join(ONNX_MODEL_FILES)})")
+
+
 def _get_model():
     """Load the sentence-transformer model (singleton, loaded once)."""
     global _model
     if _model is None:
-        from sentence_transformers import SentenceTransformer
-        _model = SentenceTransformer("all-MiniLM-L6-v2")
-        print(f"[embedder] Loaded all-MiniLM-L6-v2 (dim={_model.get_sentence_embedding_dimension()})")
+        _model = _load_model(EMBED_BACKEND)
+        print(f"[embedder] Loaded {MODEL_NAME} on {EMBED_BACKEND} "
+              f"(dim={_model.get_sentence_embedding_dimension()})")
     return _model
 
 
 # ═══════════════════════════════════════════════════════════════════
-# PUBLIC API
+# EMBEDDING CACHE (memory LRU → SQLite → model)
 # ═══════════════════════════════════════════════════════════════════
 
+_disk_cache = SqliteCache("embeddings", max_entries=EMBED_CACHE_MAX_ENTRIES)
+_memory_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+_memory_lock = threading.Lock()
+_cache_metrics = {"texts": 0, "memory_hits": 0, "disk_hits": 0, "encoded": 0}
+
+
+def _cache_key(text: str, normalize: bool) -> str:
+    # Backend is part of the key: int8 vectors must not be served as fp32 ones
+    return make_key(MODEL_NAME, EMBED_BACKEND, normalize, text)
+
+
+def _remember(key: str, vector: np.ndarray):
+    """Insert into the in-memory LRU (vectors are stored read-only)."""
+    vector.flags.writeable = False
+    with _memory_lock:
+        _memory_cache[key] = vector
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > EMBED_CACHE_MEMORY_ITEMS:
+            _memory_cache.popitem(last=False)
+
+
+_encode_metrics = {"texts": 0, "batches": 0, "tokens": 0, "padded_tokens": 0, "truncated": 0}
+
+
+def _token_lengths(model, texts: List[str]) -> List[int]:
+    """Token count per text (incl. special tokens), before truncation."""
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is None:
+        return [int(len(text.split()) * 1.3) + 2 for text in texts]  # rough WordPiece ratio
+    encoded = tokenizer(texts, add_special_tokens=True, truncation=False, verbose=False)
+    return [len(ids) for ids in encoded["input_ids"]]
+
+
+def _plan_batches(lengths: List[int], max_seq_length: int) -> List[List[int]]:
+    """
+    Group text positions into batches, longest first: each batch is padded to
+    its first (longest) item, and grows while len(batch) × that length stays
+    within EMBED_TOKEN_BUDGET.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    batches: List[List[int]] = []
+    current: List[int] = []
+    padded_to = 0
+    for i in order:
+        if not current:
+            padded_to = min(lengths[i], max_seq_length)
+        if current and (
+            (len(current) + 1) * padded_to > EMBED_TOKEN_BUDGET
+            or len(current) >= EMBED_MAX_BATCH_ITEMS
+        ):
+            batches.append(current)
+            current = []
+            padded_to = min(lengths[i], max_seq_length)
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _encode(texts: List[str], normalize: bool, model=None) -> np.ndarray:
+    """
+    Run the model (default: the configured singleton) on texts — no caching.
+    Length-bucketed under a token budget; output rows keep the input order.
+    """
+    model = model if model is not None else _get_model()
+    max_seq_length = getattr(model, "max_seq_length", None) or 256
+    
+    lengths = _token_lengths(model, texts)
+    truncated = [i for i, n in enumerate(lengths) if n > max_seq_length]
+    if truncated:
+        print(f"[embedder] {len(truncated)}/{len(texts)} texts exceed {max_seq_length} tokens "
+              f"(longest {max(lengths[i] for i in truncated)}) — truncated")
+    
+    embeddings = np.empty((len(texts), EMBEDDING_DIM), dtype=np.float32)
+    padded = 0
+    batches = _plan_batches(lengths, max_seq_length)
+    for batch in batches:
+        # Batch encode — one forward pass per bucket of similar-length texts
+        embeddings[batch] = model.encode(
+            [texts[i] for i in batch],
+            batch_size=len(batch),
+            show_progress_bar=False,
+            normalize_embeddings=normalize,  # L2 normalize → cosine sim = dot product
+            convert_to_numpy=True,
+        )
+        padded += len(batch) * min(lengths[batch[0]], max_seq_length)
+    
+    with _memory_lock:
+        _encode_metrics["texts"] += len(texts)
+        _encode_metrics["batches"] += len(batches)
+        _encode_metrics["tokens"] += sum(min(n, max_seq_length) for n in lengths)
+        _encode_metrics["padded_tokens"] += padded
+        _encode_metrics["truncated"] += len(truncated)
+    
+    return embeddings
+
+
 def embed_texts(texts: List[str], normalize: bool = True) -> np.ndarray:
     """
     Embed a list of text strings into 384-dim vectors.
+    Texts embedded before come from the cache; only misses reach the model.
     
     Args:
         texts: List of text strings to embed
@@ -51,20 +215,50 @@ def embed_texts(texts: List[str], normalize: bool = True) -> np.ndarray:
         np.ndarray of shape (len(texts), 384), dtype float32
     """
     if not texts:
-        return np.array([], dtype=np.float32).reshape(0, 384)
+        return np.array([], dtype=np.float32).reshape(0, EMBEDDING_DIM)
     
-    model = _get_model()
+    keys = [_cache_key(text, normalize) for text in texts]
+    embeddings = np.empty((len(texts), EMBEDDING_DIM), dtype=np.float32)
     
-    # Batch encode — much faster than encoding one at a time
-    embeddings = model.encode(
-        texts,
-        batch_size=32,
-        show_progress_bar=False,
-        normalize_embeddings=normalize,  # L2 normalize → cosine sim = dot product
-        convert_to_numpy=True,
-    )
+    # 1. In-memory LRU
+    pending: Dict[str, List[int]] = {}  # key → positions still missing (dedupes repeats)
+    memory_hits = 0
+    with _memory_lock:
+        for i, key in enumerate(keys):
+            vector = _memory_cache.get(key)
+            if vector is not None:
+                _memory_cache.move_to_end(key)
+                embeddings[i] = vector
+                memory_hits += 1
+            else:
+                pending.setdefault(key, []).append(i)
+    
+    # 2. Persistent store — one batched lookup for everything the LRU missed
+    disk_hits = 0
+    if pending:
+        for key, blob in _disk_cache.get_many(pending).items():
+            vector = np.frombuffer(blob, dtype=np.float32).copy()
+            for i in pending.pop(key):
+                embeddings[i] = vector
+                disk_hits += 1
+            _remember(key, vector)
+    
+    # 3. Model — only the true misses, each distinct text once
+    if pending:
+        miss_keys = list(pending)
+        vectors = _encode([texts[pending[key][0]] for key in miss_keys], normalize)
+        for key, vector in zip(miss_keys, vectors):
+            embeddings[pending[key]] = vector
+            _remember(key, vector.copy())
+        _disk_cache.set_many({key: vector.tobytes() for key, vector in zip(miss_keys, vectors)})
     
-    return embeddings.astype(np.float32)
+    with _memory_lock:
+        _cache_metrics["texts"] += len(texts)
+        _cache_metrics["memory_hits"] += memory_hits
+        _cache_metrics["disk_hits"] += disk_hits
+        _cache_metrics["encoded"] += len(pending)
+    
+    return embeddings
 
 
 def embed_single(text: str, normalize: bool = True) -> np.ndarray:
@@ -79,6 +273,43 @@ def embed_single(text: str, normalize: bool = True) -> np.ndarray:
     return result[0]
 
 
+def get_embedding_cache_stats() -> Dict:
+    """Hit-rate metrics for the embedding cache (memory LRU + persistent store)."""
+    with _memory_lock:
+        metrics = dict(_cache_metrics)
+        metrics["memory_items"] = len(_memory_cache)
+    hits = metrics["memory_hits"] + metrics["disk_hits"]
+    metrics["hit_rate"] = round(hits / metrics["texts"], 4) if metrics["texts"] else 0.0
+    metrics["disk"] = _disk_cache.stats()
+    return metrics
+
+
+def warm_up() -> Dict:
+    """
+    Load the model and run one representative batch through it (bypassing the
+    cache), so the first real request doesn't pay model load + first-call setup.
+    """
+    start = time.perf_counter()
+    model = _get_model()
+    loaded_ms = (time.perf_counter() - start) * 1000
+    _encode(PARITY_CORPUS, True, model=model)
+    return {
+        "backend": EMBED_BACKEND,
+        "load_ms": round(loaded_ms, 1),
+        "warmup_batch_ms": round((time.perf_counter() - start) * 1000 - loaded_ms, 1),
+    }
+
+
+def get_encode_stats() -> Dict:
+    """Model-side batching metrics: padding efficiency and truncated texts."""
+    with _memory_lock:
+        metrics = dict(_encode_metrics)
+    metrics["padding_efficiency"] = (
+        round(metrics["tokens"] / metrics["padded_tokens"], 4) if metrics["padded_tokens"] else 1.0
+    )
+    return metrics
+
+
 def get_embedding_dimension() -> int:
     """Return the embedding dimension (384 for all-MiniLM-L6-v2)."""
     return _get_model().get_sentence_embedding_dimension()
@@ -105,4 +336,235 @@ def embed_chunks(chunks: List[dict], normalize: bool = True) -> List[dict]:
     for chunk, embedding in zip(chunks, embeddings):
         chunk["embedding"] = embedding.tolist()  # Convert to list for JSON storage
     
-    return chunks
\ No newline at end of file
+    return chunks
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ASYNC MICRO-BATCHING
+# ═══════════════════════════════════════════════════════════════════
+
+class _EmbeddingBatcher:
+    """
+    Collects concurrent async embed requests into one model call.
+
+    The first request opens a window of EMBED_BATCH_WINDOW_MS (closed early at
+    EMBED_MAX_BATCH texts); everything queued by then is encoded together in
+    a single worker thread and each caller's future gets its own rows back.
+    """
+
+    def __init__(self, window_ms: float, max_batch: int):
+        self.window_s = window_ms / 1000
+        self.max_batch = max_batch
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+        # One thread: the model is the bottleneck, batching is the parallelism
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedder")
+        self._latencies_ms: deque = deque(maxlen=1000)
+        self.requests = 0
+        self.batches = 0
+        self.batched_texts = 0
+        self.max_batch_seen = 0
+
+    def _ensure_worker(self):
+        """(Re)start the queue + worker on the running loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._worker is None or self._worker.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._worker = loop.create_task(self._run())
+
+    async def submit(self, texts: List[str], normalize: bool) -> np.ndarray:
+        self._ensure_worker()
+        future = self._loop.create_future()
+        self.requests += 1
+        await self._queue.put((texts, normalize, future, time.perf_counter()))
+        return await future
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            n_texts = len(batch[0][0])
+            deadline = self._loop.time() + self.window_s
+            while n_texts < self.max_batch:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                n_texts += len(item[0])
+
+            # normalize is part of the cache key and the model call → one group each
+            for normalize in {item[1] for item in batch}:
+                group = [item for item in batch if item[1] == normalize]
+                await self._flush(group, normalize)
+
+    async def _flush(self, group: List, normalize: bool):
+        texts = [text for item in group for text in item[0]]
+        try:
+            embeddings = await self._loop.run_in_executor(
+                self._executor, embed_texts, texts, normalize
+            )
+        except Exception as e:
+            for _, _, future, _ in group:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.batched_texts += len(texts)
+        self.max_batch_seen = max(self.max_batch_seen, len(texts))
+        now = time.perf_counter()
+        offset = 0
+        for item_texts, _, future, enqueued_at in group:
+            rows = embeddings[offset:offset + len(item_texts)]
+            offset += len(item_texts)
+            self._latencies_ms.append((now - enqueued_at) * 1000)
+            if not future.done():  # caller may have been cancelled
+                future.set_result(rows)
+
+    def stats(self) -> Dict:
+        latencies = sorted(self._latencies_ms)
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_texts / self.batches, 2) if self.batches else 0.0,
+            "max_batch_size": self.max_batch_seen,
+            "latency_ms_p50": round(latencies[len(latencies) // 2], 2) if latencies else 0.0,
+            "latency_ms_p95": round(latencies[int(len(latencies) * 0.95)], 2) if latencies else 0.0,
+            "window_ms": self.window_s * 1000,
+            "max_batch": self.max_batch,
+        }
+
+
+_batcher = _EmbeddingBatcher(EMBED_BATCH_WINDOW_MS, EMBED_MAX_BATCH)
+
+
+async def aembed_texts(texts: List[str], normalize: bool = True) -> np.ndarray:
+    """
+    Async embed_texts: queued and micro-batched with other concurrent callers,
+    encoded off the event loop.
+    
+    Returns:
+        np.ndarray of shape (len(texts), 384), dtype float32
+    """
+    if not texts:
+        return np.array([], dtype=np.float32).reshape(0, EMBEDDING_DIM)
+    return await _batcher.submit(list(texts), normalize)
+
+
+async def aembed_single(text: str, normalize: bool = True) -> np.ndarray:
+    """
+    Async embed_single — for query-time embedding inside request handlers.
+    
+    Returns:
+        np.ndarray of shape (384,), dtype float32
+    """
+    result = await aembed_texts([text], normalize=normalize)
+    return result[0]
+
+
+def get_embedding_batcher_stats() -> Dict:
+    """Queue depth, batch-size and latency metrics for the async embedding queue."""
+    return _batcher.stats()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# BACKEND PARITY + BENCHMARK
+# ═══════════════════════════════════════════════════════════════════
+
+# Fixed corpus shaped like what we embed: resume chunks and JD queries
+PARITY_CORPUS = [
+    "Python, FastAPI, PostgreSQL, Docker, Kubernetes, AWS, CI/CD",
+    "Built a retrieval-augmented generation pipeline over 2M support tickets "
+    "using FAISS and sentence-transformers, cutting answer latency by 60%.",
+    "Led a team of four engineers migrating a monolith to event-driven microservices on Kafka.",
+    "B.S. Computer Science, University of Washington, 2021. GPA 3.8.",
+    "Applied AI Engineer. Python, RAG, LLM, Fine-tuning, Docker. "
+    "Build and deploy AI applications. Production ML systems.",
+    "Senior Frontend Engineer. React, TypeScript, Next.js, GraphQL, design systems.",
+    "Fine-tuned Llama models with LoRA for contract clause classification (F1 0.91).",
+    "Data engineer: Airflow, dbt, Snowflake, Spark batch jobs processing 5 TB/day.",
+    "Mentored interns; wrote onboarding docs; ran weekly architecture reviews.",
+    "Experience with MLOps tooling such as MLflow, Weights & Biases, and SageMaker.",
+    "Summary: backend engineer with 6 years building payment APIs at scale.",
+    "Requirements: 3+ years of experience, strong communication, startup mindset.",
+]
+
+
+def check_parity(backend: str, reference: str = "torch", texts: Optional[List[str]] = None) -> Dict:
+    """
+    Cosine agreement between a backend and the reference backend on a fixed
+    corpus. Passes when every vector agrees to at least PARITY_MIN_COSINE.
+    """
+    texts = texts or PARITY_CORPUS
+    expected = _encode(texts, True, model=_load_model(reference))
+    actual = _encode(texts, True, model=_load_model(backend))
+    cosines = np.sum(expected * actual, axis=1)  # both L2-normalized
+    return {
+        "backend": backend,
+        "reference": reference,
+        "texts": len(texts),
+        "min_cosine": round(float(cosines.min()), 5),
+        "mean_cosine": round(float(cosines.mean()), 5),
+        "passed": bool(cosines.min() >= PARITY_MIN_COSINE),
+    }
+
+
+def benchmark(backends: Optional[List[str]] = None, n_texts: int = 256, repeats: int = 3) -> List[Dict]:
+    """
+    Encode n_texts (corpus cycled) per backend, uncached. Reports throughput,
+    single-query latency and the RSS growth from loading + running the model.
+    Run each backend in a fresh process for clean RSS numbers.
+    """
+    import resource
+
+    backends = backends or ["torch", *ONNX_MODEL_FILES]
+    texts = [PARITY_CORPUS[i % len(PARITY_CORPUS)] + f" ({i})" for i in range(n_texts)]
+    results = []
+    for backend in backends:
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        model = _load_model(backend)
+        _encode(texts[:8], True, model=model)  # warm-up
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            _encode(texts, True, model=model)
+        batch_s = (time.perf_counter() - start) / repeats
+
+        start = time.perf_counter()
+        for text in texts[:32]:
+            _encode([text], True, model=model)
+        single_ms = (time.perf_counter() - start) / 32 * 1000
+
+        results.append({
+            "backend": backend,
+            "texts_per_s": round(n_texts / batch_s, 1),
+            "single_query_ms": round(single_ms, 2),
+            # ru_maxrss is KB on Linux; peak-based, so later backends may read 0
+            "rss_growth_mb": round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024, 1),
+        })
+        del model
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Embedding backend parity check and micro-benchmark")
+    parser.add_argument("command", choices=["parity", "bench"])
+    parser.add_argument("--backend", action="append", choices=["torch", *ONNX_MODEL_FILES],
+                        help="Backend(s) to check (default: the ONNX ones) or benchmark (default: all); repeatable")
+    parser.add_argument("--texts", type=int, default=256, help="bench: texts per batch run")
+    args = parser.parse_args()
+
+    if args.command == "parity":
+        reports = [check_parity(b) for b in (args.backend or list(ONNX_MODEL_FILES))]
+        print(json.dumps(reports, indent=2))
+        raise SystemExit(0 if all(r["passed"] for r in reports) else 1)
+    print(json.dumps(benchmark(args.backend, n_texts=args.texts), indent=2))
@@ -7,7 +7,13 @@ Architecture:
   - Uses inner product (= cosine similarity when vectors are L2-normalized)
   - nprobe=3 by default (tunable accuracy/speed tradeoff)
   - One index file per user (stored on disk, loaded into memory for search)
-  - Metadata stored alongside in a JSON sidecar file
+  - Loaded indexes cached in-process per user (LRU + memory budget,
+    invalidated when the files on disk change)
+  - Metadata stored alongside in a compact JSON sidecar (no vectors)
+  - A tiny stats manifest is rewritten atomically with every index write, so
+    get_index_stats() never parses the sidecar or deserializes the index
+  - Raw vectors stored in a float32 sidecar, row N = faiss_idx N, read via np.memmap
+  - Vectors carry stable IDs (faiss_idx) so new resumes are appended in place
 
 Why IVFFlat over Flat:
   - Flat index does exact search (O(n) per query) — fine for < 100 vectors
@@ -22,17 +28,39 @@ Design decisions:
   1. FAISS over ChromaDB — direct control over nprobe, no external server needed
   2. Inner product over L2 distance — with normalized vectors, IP = cosine sim
   3. Disk persistence — index saved/loaded per user, survives server restarts
-  4. Metadata sidecar — chunk text, section, weight stored alongside vectors
-  5. Auto index type — Flat for small collections, IVFFlat when vectors > threshold
+  4. Metadata sidecar — chunk text, section, weight stored alongside vectors;
+     the vectors themselves live in a binary sidecar so searches never parse
+     them and rebuilds read them zero-copy
+  5. Auto index type — Flat for small collections, IVFFlat when vectors > threshold;
+     large collections move to HNSW (latency) or IVFSQ8/IVFPQ (memory) within
+     INDEX_MEMORY_BUDGET, or INDEX_MODE pins one type. Every build measures
+     recall@k against exact search (again as appends grow the index) and
+     get_index_stats() reports it with the vector count it was measured at
+  6. Incremental writes — uploads append only their own vectors (add_with_ids);
+     the full rebuild + IVF training only runs when the retrain policy says so
+     (crossing IVFFLAT_THRESHOLD, collection outgrew its centroids, or drift)
+  7. Resume-scoped search — each resume's IDs form a contiguous run recorded
+     in metadata["resume_ranges"], so a filtered query is a FAISS
+     IDSelectorRange search over that resume only (no over-fetch + filter)
+  8. In-place deletes — remove_ids() drops one resume's vectors, other IDs
+     stay put; dead rows in the vector store are reclaimed by compact_index(),
+     run in the background once they pass COMPACT_DEAD_RATIO
 """
 
 import json
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+
 import numpy as np
 import faiss
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+logger = logging.getLogger(__name__)
+
 # ═══════════════════════════════════════════════════════════════════
 # CONFIGURATION
 # ═══════════════════════════════════════════════════════════════════
@@ -41,6 +69,27 @@ EMBEDDING_DIM = 384                # all-MiniLM-L6-v2 output dimension
 IVFFLAT_THRESHOLD = 100            # Switch from Flat to IVFFlat above this many vectors
 NPROBE_DEFAULT = 3                 # Cells to search at query time (accuracy/speed knob)
 NLIST_FACTOR = 4                   # Number of cells = total_vectors / NLIST_FACTOR
+RETRAIN_GROWTH_FACTOR = 2.0        # Retrain IVF once the index doubles past its training size
+RETRAIN_DRIFT_MAX = 0.10           # Retrain IVF if new vectors sit this much further from centroids
+COMPACT_DEAD_RATIO = 0.5           # Compact the vector store once half its rows are deleted
+INDEX_CACHE_MAX_USERS = 32         # Loaded (index, metadata) pairs kept per process
+INDEX_CACHE_MAX_BYTES = 256 * 1024 * 1024  # Memory budget for the cache (estimated from file sizes)
+DENSE_EXACT_MAX_VECTORS = 2000     # At or below this, matching scores every chunk with one matmul
+
+# Index modes (above IVFFLAT_THRESHOLD; smaller collections are always Flat)
+INDEX_MODE = "auto"                # "auto", or force one of INDEX_TYPES
+INDEX_TYPES = ("Flat", "IVFFlat", "IVFSQ8", "IVFPQ", "HNSW")
+INDEX_MEMORY_BUDGET = 512 * 1024 * 1024  # Auto policy: max bytes one index may occupy
+HNSW_MIN_VECTORS = 50_000          # Auto policy: prefer HNSW (lowest latency) from this size, if it fits
+HNSW_M = 32                        # HNSW graph neighbours per node
+HNSW_EF_CONSTRUCTION = 80          # HNSW build-time beam width
+HNSW_EF_SEARCH = 64                # HNSW query-time beam width (accuracy/speed knob)
+PQ_M = 48                          # PQ sub-quantizers (384 / 48 = 8 dims each)
+PQ_NBITS = 8                       # Bits per PQ code (256 centroids per sub-quantizer)
+PQ_MIN_TRAIN_VECTORS = 39 * 2 ** PQ_NBITS  # Fewer training points → fall back to SQ8
+RECALL_EVAL_QUERIES = 100          # Queries used to measure recall@k
+RECALL_K = 10                      # k for the recall@k check against exact search
+RECALL_REMEASURE_GROWTH = 1.25     # Re-measure recall once appends grow the index this much
 
 # Storage paths
 BASE_DIR = Path(__file__).resolve().parent.parent.parent  # rack/
@@ -52,6 +101,16 @@ FAISS_DIR.mkdir(parents=True, exist_ok=True)
 # INDEX MANAGEMENT
 # ═══════════════════════════════════════════════════════════════════
 
+_write_locks: Dict[str, threading.Lock] = {}
+_write_locks_guard = threading.Lock()
+
+
+def _user_lock(user_id: str = "default") -> threading.Lock:
+    """Per-user lock serializing index writers (uploads, deletes, compaction)."""
+    with _write_locks_guard:
+        return _write_locks.setdefault(user_id, threading.Lock())
+
+
 def _index_path(user_id: str = "default") -> Path:
     """Path to the FAISS index file for a user."""
     return FAISS_DIR / f"{user_id}.index"
@@ -62,49 +121,504 @@ def _metadata_path(user_id: str = "default") -> Path:
     return FAISS_DIR / f"{user_id}_metadata.json"
 
 
+def _vectors_path(user_id: str = "default") -> Path:
+    """Path to the raw float32 vector sidecar for a user (row N = faiss_idx N)."""
+    return FAISS_DIR / f"{user_id}_vectors.f32"
+
+
+def _manifest_path(user_id: str = "default") -> Path:
+    """Path to the small stats manifest (what get_index_stats returns)."""
+    return FAISS_DIR / f"{user_id}_manifest.json"
+
+
 def _load_metadata(user_id: str = "default") -> Dict:
     """Load the metadata sidecar file."""
     path = _metadata_path(user_id)
     if path.exists():
         with open(path, "r") as f:
-            return json.load(f)
-    return {"chunks": [], "resume_ids": []}
+            metadata = json.load(f)
+        _migrate_legacy_sidecar(metadata, user_id)
+        return metadata
+    return {"chunks": [], "resume_ids": [], "next_id": 0}
 
 
 def _save_metadata(metadata: Dict, user_id: str = "default"):
-    """Save the metadata sidecar file."""
+    """Save the metadata sidecar file (compact — it is re-read on every search)."""
     with open(_metadata_path(user_id), "w") as f:
-        json.dump(metadata, f, indent=2, default=str)
+        json.dump(metadata, f, separators=(",", ":"), default=str)
+
+
+def _migrate_legacy_sidecar(metadata: Dict, user_id: str = "default"):
+    """
+    Upgrade sidecars written by older versions, once:
+      - list position was the faiss_idx → positions are valid IDs, seed the counter
+      - vectors were stored as "_embedding" float lists → move them to the binary store
+      - no per-resume ID range map → derive it from the chunks
+    """
+    if "next_id" not in metadata:
+        metadata["next_id"] = max((c["faiss_idx"] for c in metadata["chunks"]), default=-1) + 1
+
+    if "resume_ranges" not in metadata:
+        _rebuild_resume_ranges(metadata)
+
+    if not any("_embedding" in c for c in metadata["chunks"]):
+        return
+
+    vectors = np.zeros((metadata["next_id"], EMBEDDING_DIM), dtype=np.float32)
+    for chunk in metadata["chunks"]:
+        embedding = chunk.pop("_embedding", None)
+        if embedding is not None:
+            vectors[chunk["faiss_idx"]] = embedding
+    _write_vectors(vectors, start_row=0, user_id=user_id)
+    _save_metadata(metadata, user_id)
+
+
+def _rebuild_resume_ranges(metadata: Dict):
+    """
+    Recompute metadata["resume_ranges"]: resume_id → [[start, end), ...] ID runs.
+    Normally one run per resume (its chunks are added in one batch).
+    """
+    ranges: Dict[str, List[List[int]]] = {}
+    for chunk in sorted(metadata["chunks"], key=lambda c: c["faiss_idx"]):
+        runs = ranges.setdefault(chunk["resume_id"], [])
+        if runs and runs[-1][1] == chunk["faiss_idx"]:
+            runs[-1][1] += 1
+        else:
+            runs.append([chunk["faiss_idx"], chunk["faiss_idx"] + 1])
+    metadata["resume_ranges"] = ranges
 
 
-def _build_index(vectors: np.ndarray) -> faiss.Index:
+# ═══════════════════════════════════════════════════════════════════
+# VECTOR STORE (binary, memory-mapped)
+# ═══════════════════════════════════════════════════════════════════
+
+def _write_vectors(vectors: np.ndarray, start_row: int, user_id: str = "default"):
+    """
+    Write vectors at rows [start_row, start_row + n) and drop anything after.
+    Appends are O(new vectors); the truncate discards rows left behind by a
+    write that crashed before its metadata was saved, keeping row == faiss_idx.
     """
-    Build a FAISS index from vectors.
-    Auto-selects Flat or IVFFlat based on vector count.
+    path = _vectors_path(user_id)
+    row_bytes = EMBEDDING_DIM * np.dtype(np.float32).itemsize
+    with open(path, "r+b" if path.exists() else "wb") as f:
+        f.seek(start_row * row_bytes)
+        f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        f.truncate()
+
+
+def _replace_vectors(vectors: np.ndarray, user_id: str = "default"):
+    """
+    Swap in a rewritten vector store (compaction). tmp + os.replace gives the
+    file a new inode, so memmaps held by cached entries keep reading the old
+    rows until they are reloaded together with the new index and metadata.
+    """
+    path = _vectors_path(user_id)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+    os.replace(tmp_path, path)
+
+
+def _open_vectors(user_id: str = "default") -> np.ndarray:
+    """Memory-map the vector sidecar read-only as an (n_rows, EMBEDDING_DIM) array."""
+    path = _vectors_path(user_id)
+    if not path.exists() or path.stat().st_size == 0:
+        return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+    return np.memmap(path, dtype=np.float32, mode="r").reshape(-1, EMBEDDING_DIM)
+
+
+def _bytes_per_vector(index_type: str) -> int:
+    """Approximate in-memory cost of one vector (+ its 64-bit ID) per index type."""
+    return {
+        "Flat": EMBEDDING_DIM * 4 + 16,
+        "IVFFlat": EMBEDDING_DIM * 4 + 8,
+        "IVFSQ8": EMBEDDING_DIM + 8,
+        "IVFPQ": PQ_M * PQ_NBITS // 8 + 8,
+        "HNSW": EMBEDDING_DIM * 4 + HNSW_M * 2 * 4 + 16,
+    }[index_type]
+
+
+def _select_index_type(n_vectors: int) -> str:
+    """
+    Pick the index type for a collection of n_vectors.
+
+    Below IVFFLAT_THRESHOLD: always Flat (exact, nothing to train).
+    Otherwise INDEX_MODE if forced, else the auto policy:
+      - HNSW from HNSW_MIN_VECTORS on, if graph + raw vectors fit the budget
+      - IVFFlat while full-precision vectors fit INDEX_MEMORY_BUDGET
+      - IVFSQ8 (4× smaller) next, IVFPQ (~50× smaller) as the last resort
+    """
+    if n_vectors < IVFFLAT_THRESHOLD:
+        return "Flat"
+
+    if INDEX_MODE != "auto":
+        if INDEX_MODE not in INDEX_TYPES:
+            raise ValueError(f"INDEX_MODE must be 'auto' or one of {INDEX_TYPES}, got {INDEX_MODE!r}")
+        index_type = INDEX_MODE
+    elif n_vectors >= HNSW_MIN_VECTORS and n_vectors * _bytes_per_vector("HNSW") <= INDEX_MEMORY_BUDGET:
+        index_type = "HNSW"
+    elif n_vectors * _bytes_per_vector("IVFFlat") <= INDEX_MEMORY_BUDGET:
+        index_type = "IVFFlat"
+    elif n_vectors * _bytes_per_vector("IVFSQ8") <= INDEX_MEMORY_BUDGET:
+        index_type = "IVFSQ8"
+    else:
+        index_type = "IVFPQ"
+
+    # PQ codebooks need enough training points per centroid
+    if index_type == "IVFPQ" and n_vectors < PQ_MIN_TRAIN_VECTORS:
+        index_type = "IVFSQ8"
+    return index_type
+
+
+def _build_index(vectors: np.ndarray, ids: np.ndarray) -> Tuple[faiss.Index, Dict]:
+    """
+    Build an ID-mapped FAISS index from vectors.
+    Index type comes from _select_index_type (vector count + INDEX_MODE).
     
     - Flat: exact search, O(n), best for small collections
     - IVFFlat: approximate search, sub-linear, best for larger collections
+    - IVFSQ8 / IVFPQ: IVF with 8-bit scalar / product-quantized codes,
+      for collections whose full-precision vectors don't fit the budget
+    - HNSW: graph search, lowest latency at large sizes (no in-place deletes)
+
+    Vectors are added with their stable IDs (faiss_idx), so later uploads
+    can append with add_with_ids() instead of rebuilding.
+
+    Returns:
+        (index, index_info) — index_info records what the retrain policy needs,
+        plus recall@k against exact search measured on the fresh index
     """
     n_vectors, dim = vectors.shape
+    index_type = _select_index_type(n_vectors)
 
-    if n_vectors < IVFFLAT_THRESHOLD:
-        # Flat index — exact inner product search
-        index = faiss.IndexFlatIP(dim)
-        index.add(vectors)
-        return index
+    if index_type == "Flat":
+        # Flat index — exact inner product search, wrapped to carry our IDs
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+        index.add_with_ids(vectors, ids)
+        return index, {
+            "type": "Flat", "trained_ntotal": 0, "recall_at_k": 1.0, "recall_k": RECALL_K,
+            "recall_measured_at_ntotal": n_vectors, "built_at": time.time(),
+        }
+
+    if index_type == "HNSW":
+        # HNSW — no training; IDMap2 carries our IDs
+        hnsw = faiss.IndexHNSWFlat(dim, HNSW_M, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        hnsw.hnsw.efSearch = HNSW_EF_SEARCH
+        index = faiss.IndexIDMap2(hnsw)
+        index.add_with_ids(vectors, ids)
+        info = {"type": "HNSW", "M": HNSW_M, "ef_search": HNSW_EF_SEARCH}
     else:
-        # IVFFlat — partitioned search
+        # IVF family — partitioned search (supports add_with_ids natively)
         nlist = max(2, n_vectors // NLIST_FACTOR)  # Number of Voronoi cells
         
         quantizer = faiss.IndexFlatIP(dim)
-        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        if index_type == "IVFSQ8":
+            index = faiss.IndexIVFScalarQuantizer(
+                quantizer, dim, nlist, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT
+            )
+        elif index_type == "IVFPQ":
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, PQ_M, PQ_NBITS, faiss.METRIC_INNER_PRODUCT)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
         
-        # IVFFlat requires training on representative vectors
+        # IVF requires training on representative vectors
         index.train(vectors)
-        index.add(vectors)
+        index.add_with_ids(vectors, ids)
         index.nprobe = NPROBE_DEFAULT
-        
-        return index
+        info = {"type": index_type, "nlist": nlist, "trained_ntotal": n_vectors}
+
+    info["recall_at_k"] = _measure_recall(index, vectors, ids)
+    info["recall_k"] = RECALL_K
+    info["recall_measured_at_ntotal"] = n_vectors
+    info["built_at"] = time.time()
+    return index, info
+
+
+def _measure_recall(index: faiss.Index, vectors: np.ndarray, ids: np.ndarray) -> Optional[float]:
+    """
+    recall@RECALL_K of the index (default search params) against exact search.
+
+    Queries are normalized midpoints of random vector pairs — close to real
+    data without being stored vectors themselves (which every index finds).
+    """
+    n_vectors = len(vectors)
+    if n_vectors < 2:
+        return None
+
+    rng = np.random.default_rng(0)
+    n_queries = min(RECALL_EVAL_QUERIES, n_vectors)
+    queries = vectors[rng.choice(n_vectors, n_queries)] + vectors[rng.choice(n_vectors, n_queries)]
+    queries /= np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+
+    k = min(RECALL_K, n_vectors)
+    _, exact = faiss.knn(queries, np.ascontiguousarray(vectors), k, metric=faiss.METRIC_INNER_PRODUCT)
+    _, approx = index.search(queries, k)
+
+    hits = sum(len(np.intersect1d(ids[exact[i]], approx[i])) for i in range(n_queries))
+    return round(hits / (n_queries * k), 4)
+
+
+def _refresh_recall(info: Dict, index: faiss.Index, metadata: Dict, user_id: str = "default"):
+    """
+    Keep index_info's recall@k current after an in-place append: re-measured
+    once the index has grown RECALL_REMEASURE_GROWTH× since the last
+    measurement (Flat is exact at any size, so only its count moves).
+    """
+    if info.get("type") == "Flat":
+        info["recall_measured_at_ntotal"] = index.ntotal
+        return
+    if index.ntotal < info.get("recall_measured_at_ntotal", 0) * RECALL_REMEASURE_GROWTH:
+        return
+    vectors, ids = _collect_all_embeddings(metadata, user_id)
+    info["recall_at_k"] = _measure_recall(index, vectors, ids)
+    info["recall_measured_at_ntotal"] = index.ntotal
+
+
+def _mean_centroid_similarity(index: faiss.Index, vectors: np.ndarray) -> float:
+    """Average similarity of vectors to their nearest IVF centroid (drift signal)."""
+    quantizer = faiss.downcast_index(index.quantizer)
+    sims, _ = quantizer.search(vectors, 1)
+    return float(sims.mean())
+
+
+def _needs_rebuild(metadata: Dict, index: Optional[faiss.Index], new_vectors: np.ndarray) -> bool:
+    """
+    Retrain policy — decide whether an upload can append in place.
+
+    Rebuild when:
+      - there is no usable ID-mapped index yet (first upload, legacy files)
+      - the collection now calls for another index type (Flat crossing
+        IVFFLAT_THRESHOLD, outgrowing the memory budget, INDEX_MODE changed)
+      - an IVF index grew RETRAIN_GROWTH_FACTOR× past its training size
+        (too few cells for the collection now)
+      - the new vectors fit the trained centroids noticeably worse than the
+        training set did (distribution drift)
+    """
+    if index is None or not metadata.get("id_mapped"):
+        return True
+
+    info = metadata.get("index_info", {})
+    total = len(metadata["chunks"])
+
+    if info.get("type") != _select_index_type(total):
+        return True
+
+    if faiss.try_extract_index_ivf(index) is None:
+        return False  # Flat / HNSW — nothing trained to go stale
+
+    if total >= info.get("trained_ntotal", 0) * RETRAIN_GROWTH_FACTOR:
+        return True
+
+    # Training vectors sit unrealistically close to their own centroids, so the
+    # drift baseline is the first out-of-sample batch appended after training.
+    similarity = _mean_centroid_similarity(index, new_vectors)
+    baseline = info.get("centroid_sim")
+    if baseline is None:
+        info["centroid_sim"] = similarity
+        return False
+
+    return baseline - similarity > RETRAIN_DRIFT_MAX
+
+
+def _read_index(user_id: str = "default") -> Optional[faiss.Index]:
+    """Load a user's index from disk (None if missing). Restores nprobe, which FAISS doesn't persist."""
+    index_file = _index_path(user_id)
+    if not index_file.exists():
+        return None
+    index = faiss.read_index(str(index_file))
+    if hasattr(index, "nprobe"):
+        index.nprobe = NPROBE_DEFAULT
+    return index
+
+
+def _persist(index: Optional[faiss.Index], metadata: Dict, user_id: str = "default"):
+    """
+    Write a user's index (None = already removed), metadata sidecar and
+    stats manifest, then drop the stale cache entry. Callers hold _user_lock.
+    """
+    if index is not None:
+        faiss.write_index(index, str(_index_path(user_id)))
+    _save_metadata(metadata, user_id)
+    _write_manifest(_build_manifest(metadata, index, user_id), user_id)
+    _INDEX_CACHE.invalidate(user_id)
+
+
+def _build_manifest(metadata: Dict, index: Optional[faiss.Index], user_id: str = "default") -> Dict:
+    """Everything get_index_stats reports, computed at write time."""
+    info = metadata.get("index_info", {})
+    index_file = _index_path(user_id)
+    vectors_file = _vectors_path(user_id)
+    metadata_file = _metadata_path(user_id)
+    vector_store_rows = (
+        vectors_file.stat().st_size // (EMBEDDING_DIM * 4) if vectors_file.exists() else 0
+    )
+    return {
+        "total_vectors": len(metadata["chunks"]),
+        "resume_count": len(metadata.get("resume_ids", [])),
+        "resume_ids": metadata.get("resume_ids", []),
+        "index_exists": index_file.exists(),
+        "index_type": info.get(
+            "type", "IVFFlat" if len(metadata["chunks"]) >= IVFFLAT_THRESHOLD else "Flat"
+        ),
+        "index_ntotal": index.ntotal if index is not None else 0,
+        "nlist": info.get("nlist"),
+        "nprobe": NPROBE_DEFAULT,
+        # Measured against exact search at build time, and again whenever
+        # appends grow the index RECALL_REMEASURE_GROWTH× (see _refresh_recall)
+        "recall_at_k": info.get("recall_at_k"),
+        "recall_k": info.get("recall_k", RECALL_K),
+        "recall_measured_at_ntotal": info.get("recall_measured_at_ntotal"),
+        "built_at": info.get("built_at"),
+        "updated_at": time.time(),
+        "vector_store_rows": vector_store_rows,
+        "dead_rows": vector_store_rows - len(metadata["chunks"]),
+        "index_bytes": index_file.stat().st_size if index_file.exists() else 0,
+        "metadata_bytes": metadata_file.stat().st_size if metadata_file.exists() else 0,
+        "vectors_bytes": vectors_file.stat().st_size if vectors_file.exists() else 0,
+    }
+
+
+def _write_manifest(manifest: Dict, user_id: str = "default"):
+    """Atomic replace — readers see the old manifest or the new one, never half of one."""
+    path = _manifest_path(user_id)
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def _read_manifest(user_id: str = "default") -> Optional[Dict]:
+    try:
+        with open(_manifest_path(user_id)) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+# ═══════════════════════════════════════════════════════════════════
+# IN-PROCESS INDEX CACHE
+# ═══════════════════════════════════════════════════════════════════
+
+def _file_signature(user_id: str = "default") -> Optional[Tuple]:
+    """(mtime_ns, size) of the index + metadata files — changes on every write."""
+    try:
+        index_stat = _index_path(user_id).stat()
+        meta_stat = _metadata_path(user_id).stat()
+    except FileNotFoundError:
+        return None
+    return (index_stat.st_mtime_ns, index_stat.st_size, meta_stat.st_mtime_ns, meta_stat.st_size)
+
+
+class _IndexCache:
+    """
+    Bounded per-process cache of loaded (index, metadata) per user.
+
+    - LRU eviction by entry count and by an estimated memory budget
+    - Entries are validated against the on-disk file signature on every get,
+      so writes from this or any other worker invalidate them automatically
+    - Cached indexes are shared across requests and must be treated as
+      read-only (search-time knobs go through SearchParameters, not setters)
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, user_id: str = "default") -> Optional[Dict]:
+        """
+        Return {"index", "metadata", "store", "chunks_by_id", "resume_codes"}
+        for a user, loading on miss. A miss loads under the user's write lock,
+        so index, metadata and vector store always come from the same write.
+        """
+        signature = _file_signature(user_id)
+        if signature is None:
+            self.invalidate(user_id)
+            return None
+
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry["signature"] == signature:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                self.invalidations += 1
+            self.misses += 1
+
+        with _user_lock(user_id):
+            signature = _file_signature(user_id)
+            index = _read_index(user_id) if signature is not None else None
+            if index is None:
+                return None
+            metadata = _load_metadata(user_id)
+            store = _open_vectors(user_id)
+        entry = {
+            "index": index,
+            "metadata": metadata,
+            "store": store,
+            "dense_lock": threading.Lock(),
+            "chunks_by_id": _chunks_by_id(metadata),
+            "resume_codes": _resume_codes(metadata),
+            "signature": signature,
+            # In-memory footprint ≈ serialized index + ~3× the JSON it was parsed from
+            "nbytes": signature[1] + 3 * signature[3],
+        }
+
+        with self._lock:
+            self._entries[user_id] = entry
+            self._entries.move_to_end(user_id)
+            self._evict()
+        return entry
+
+    def charge(self, entry: Dict, nbytes: int):
+        """Add memory built lazily on an entry (dense layout) to the budget."""
+        with self._lock:
+            entry["nbytes"] += nbytes
+            self._evict()
+
+    def invalidate(self, user_id: str = "default"):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict(self):
+        """Drop least-recently-used entries until both limits hold (always keep the newest)."""
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries
+            or sum(e["nbytes"] for e in self._entries.values()) > self.max_bytes
+        ):
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(e["nbytes"] for e in self._entries.values()),
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_INDEX_CACHE = _IndexCache(INDEX_CACHE_MAX_USERS, INDEX_CACHE_MAX_BYTES)
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -132,78 +646,81 @@ def add_resume_vectors(
     if len(chunks) != embeddings.shape[0]:
         raise ValueError(f"Chunk count ({len(chunks)}) != embedding count ({embeddings.shape[0]})")
 
-    # Load existing metadata
-    metadata = _load_metadata(user_id)
-    
-    # Track which resume IDs are in the index
-    if resume_id not in metadata.get("resume_ids", []):
-        metadata.setdefault("resume_ids", []).append(resume_id)
-    
-    # Store starting index for this batch
-    start_idx = len(metadata["chunks"])
-    
-    # Add chunk metadata (without the embedding — that goes in FAISS)
-    for i, chunk in enumerate(chunks):
-        metadata["chunks"].append({
+    with _user_lock(user_id):
+        # Load existing metadata
+        metadata = _load_metadata(user_id)
+        
+        # Track which resume IDs are in the index
+        if resume_id not in metadata.get("resume_ids", []):
+            metadata.setdefault("resume_ids", []).append(resume_id)
+        
+        # Stable IDs for this batch — never reused, independent of list position
+        start_id = metadata["next_id"]
+        ids = np.arange(start_id, start_id + len(chunks), dtype=np.int64)
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        
+        # Vectors go to the binary store (kept for future rebuilds/retrains)
+        _write_vectors(embeddings, start_row=start_id, user_id=user_id)
+        
+        # Add chunk metadata (without the embedding)
+        for i, chunk in enumerate(chunks):
+            metadata["chunks"].append({
+                "resume_id": resume_id,
+                "text": chunk["text"],
+                "section": chunk["section"],
+                "weight": chunk["weight"],
+                "chunk_index": chunk.get("chunk_index", i),
+                "faiss_idx": int(ids[i]),
+            })
+        metadata["next_id"] = start_id + len(chunks)
+        metadata.setdefault("resume_ranges", {}).setdefault(resume_id, []).append(
+            [start_id, metadata["next_id"]]
+        )
+        
+        index = _read_index(user_id)
+        if _needs_rebuild(metadata, index, embeddings):
+            # Full rebuild (and IVF training) — only when the policy asks for it
+            all_embeddings, all_ids = _collect_all_embeddings(metadata, user_id)
+            index, metadata["index_info"] = _build_index(all_embeddings, all_ids)
+            metadata["id_mapped"] = True
+            rebuilt = True
+        else:
+            # Incremental path — append this resume only, keep trained centroids
+            index.add_with_ids(embeddings, ids)
+            _refresh_recall(metadata["index_info"], index, metadata, user_id)
+            rebuilt = False
+        
+        # Save to disk
+        _persist(index, metadata, user_id)
+        
+        return {
             "resume_id": resume_id,
-            "text": chunk["text"],
-            "section": chunk["section"],
-            "weight": chunk["weight"],
-            "chunk_index": chunk.get("chunk_index", i),
-            "faiss_idx": start_idx + i,
-        })
-    
-    # Rebuild the full index with all vectors
-    # (For production at scale, you'd do incremental adds.
-    #  At our scale of ~30 chunks per resume, rebuilding is fine.)
-    all_embeddings = _collect_all_embeddings(metadata, embeddings, start_idx)
-    index = _build_index(all_embeddings)
-    
-    # Save to disk
-    faiss.write_index(index, str(_index_path(user_id)))
-    _save_metadata(metadata, user_id)
-    
-    return {
-        "resume_id": resume_id,
-        "chunks_added": len(chunks),
-        "total_vectors": len(metadata["chunks"]),
-        "index_type": "IVFFlat" if len(metadata["chunks"]) >= IVFFLAT_THRESHOLD else "Flat",
-    }
+            "chunks_added": len(chunks),
+            "total_vectors": len(metadata["chunks"]),
+            "index_type": metadata["index_info"]["type"],
+            "rebuilt": rebuilt,
+        }
 
 
 def _collect_all_embeddings(
     metadata: Dict,
-    new_embeddings: np.ndarray,
-    start_idx: int
-) -> np.ndarray:
-    """
-    Collect all embeddings for index rebuild.
-    For existing chunks, we need to re-embed or load from stored embeddings.
-    For simplicity, we store embeddings in the metadata sidecar.
-    """
-    # If this is the first batch, just return the new embeddings
-    if start_idx == 0:
-        # Store embeddings in metadata for future rebuilds
-        for i, chunk in enumerate(metadata["chunks"]):
-            chunk["_embedding"] = new_embeddings[i].tolist()
-        return new_embeddings
-    
-    # Otherwise, collect existing + new
-    existing_vectors = []
-    for chunk in metadata["chunks"][:start_idx]:
-        if "_embedding" in chunk:
-            existing_vectors.append(chunk["_embedding"])
-        else:
-            # This shouldn't happen, but handle gracefully
-            existing_vectors.append(np.zeros(EMBEDDING_DIM).tolist())
+    user_id: str = "default",
+    store: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Collect all live embeddings and their IDs for a full index rebuild.
+    Reads straight from the memory-mapped vector store (`store`, or the file
+    on disk): zero-copy when the live IDs are a contiguous run of rows, a
+    single gather otherwise.
+    """
+    ids = np.array([c["faiss_idx"] for c in metadata["chunks"]], dtype=np.int64)
+    if store is None:
+        store = _open_vectors(user_id)
     
-    # Store new embeddings in metadata
-    for i, chunk in enumerate(metadata["chunks"][start_idx:]):
-        chunk["_embedding"] = new_embeddings[i].tolist()
+    if len(ids) and ids[0] == 0 and ids[-1] == len(ids) - 1 and len(store) >= len(ids):
+        return store[:len(ids)], ids
     
-    existing_array = np.array(existing_vectors, dtype=np.float32)
-    all_vectors = np.vstack([existing_array, new_embeddings])
-    return all_vectors
+    return store[ids], ids
 
 
 def search(
@@ -237,53 +754,52 @@ def search(
             ...
         ]
     """
-    index_file = _index_path(user_id)
-    if not index_file.exists():
+    # Load index (cached per user — see _IndexCache)
+    cached = _INDEX_CACHE.get(user_id)
+    if cached is None:
         return []
-    
-    # Load index
-    index = faiss.read_index(str(index_file))
-    metadata = _load_metadata(user_id)
-    
-    # Set nprobe if IVFFlat
-    if nprobe and hasattr(index, 'nprobe'):
-        index.nprobe = nprobe
+    index = cached["index"]
+    metadata = cached["metadata"]
     
     # Reshape query for FAISS (needs 2D array)
     if query_embedding.ndim == 1:
         query_embedding = query_embedding.reshape(1, -1)
     
-    # Search — returns distances (= inner product = cosine sim for normalized vectors)
-    # Fetch extra results if we need to filter by resume_id
-    fetch_k = top_k * 3 if resume_id_filter else top_k
-    fetch_k = min(fetch_k, len(metadata["chunks"]))  # Can't fetch more than we have
-    
-    if fetch_k == 0:
-        return []
+    if resume_id_filter:
+        # Pre-filter: restrict the search to this resume's ID runs instead of
+        # over-fetching globally and discarding other resumes' hits
+        runs = metadata.get("resume_ranges", {}).get(resume_id_filter, [])
+        fetch_k = min(top_k, sum(end - start for start, end in runs))
+        if fetch_k == 0:
+            return []
+        if _is_hnsw(index):
+            # A filtered graph walk can run out of beam before it finds k of
+            # one resume's chunks — score that resume's rows exactly instead
+            scores, indices = _exact_search_runs(
+                cached["store"], runs, query_embedding, fetch_k, cached["chunks_by_id"],
+            )
+        else:
+            params = _search_params(index, nprobe, _id_selector(runs))
+            scores, indices = index.search(query_embedding, fetch_k, params=params)
+    else:
+        fetch_k = min(top_k, len(metadata["chunks"]))  # Can't fetch more than we have
+        if fetch_k == 0:
+            return []
+        params = _search_params(index, nprobe)
+        # Search — returns distances (= inner product = cosine sim for normalized vectors)
+        scores, indices = index.search(query_embedding, fetch_k, params=params)
     
-    scores, indices = index.search(query_embedding, fetch_k)
+    # FAISS returns stable IDs, not list positions
+    chunks_by_id = cached["chunks_by_id"]
     
     # Build results
     results = []
     for score, idx in zip(scores[0], indices[0]):
-        if idx < 0 or idx >= len(metadata["chunks"]):
+        chunk_meta = chunks_by_id.get(int(idx))
+        if chunk_meta is None:
             continue  # FAISS returns -1 for missing results
         
-        chunk_meta = metadata["chunks"][idx]
-        
-        # Apply resume filter if specified
-        if resume_id_filter and chunk_meta["resume_id"] != resume_id_filter:
-            continue
-        
-        results.append({
-            "text": chunk_meta["text"],
-            "section": chunk_meta["section"],
-            "weight": chunk_meta["weight"],
-            "resume_id": chunk_meta["resume_id"],
-            "chunk_index": chunk_meta.get("chunk_index", 0),
-            "score": float(score),  # cosine similarity
-            "faiss_idx": int(idx),
-        })
+        results.append(_result_dict(chunk_meta, score, idx))
         
         if len(results) >= top_k:
             break
@@ -291,70 +807,430 @@ def search(
     return results
 
 
-def remove_resume_vectors(resume_id: str, user_id: str = "default") -> bool:
+def search_batch(
+    query_matrix: np.ndarray,
+    top_k: int = 20,
+    user_id: str = "default",
+    nprobe: Optional[int] = None,
+) -> List[Dict[str, List[Dict]]]:
     """
-    Remove all vectors for a specific resume and rebuild the index.
-    
-    Returns True if successful.
+    Search many queries (e.g., one embedded JD per job) in one FAISS call.
+
+    FAISS runs the whole (n_queries × 384) matrix through a single BLAS-backed
+    search, so 100 job queries cost about as much as a handful of single ones.
+    Results are grouped by resume with one vectorized pass per batch.
+
+    Args:
+        query_matrix: np.ndarray of shape (n_queries, 384)
+        top_k: Chunks retrieved per query (across all resumes)
+        user_id: User identifier
+        nprobe: Override default nprobe (accuracy/speed tradeoff)
+
+    Returns:
+        One dict per query row, resume_id → result dicts (same shape as
+        search() results), each list sorted by score descending:
+        [
+            {"abc123": [{...}, {...}], "def456": [{...}]},
+            ...
+        ]
+    """
+    query_matrix = np.ascontiguousarray(query_matrix, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+    n_queries = query_matrix.shape[0]
+
+    cached = _INDEX_CACHE.get(user_id)
+    if cached is None or n_queries == 0:
+        return [{} for _ in range(n_queries)]
+    index = cached["index"]
+
+    fetch_k = min(top_k, len(cached["metadata"]["chunks"]))
+    if fetch_k == 0:
+        return [{} for _ in range(n_queries)]
+
+    params = _search_params(index, nprobe)
+
+    scores, indices = index.search(query_matrix, fetch_k, params=params)
+
+    # ── Vectorized grouping: ID → resume code, then a stable sort per row ──
+    # Stable argsort on the codes keeps each resume's hits in score order.
+    resume_codes = cached["resume_codes"]
+    valid = (indices >= 0) & (indices < len(resume_codes))
+    codes = np.where(valid, resume_codes[np.where(valid, indices, 0)], -1)
+    order = np.argsort(codes, axis=1, kind="stable")
+    sorted_codes = np.take_along_axis(codes, order, axis=1)
+    sorted_scores = np.take_along_axis(scores, order, axis=1)
+    sorted_ids = np.take_along_axis(indices, order, axis=1)
+
+    resume_ids = cached["metadata"].get("resume_ids", [])
+    chunks_by_id = cached["chunks_by_id"]
+    grouped = []
+    for row in range(n_queries):
+        row_codes = sorted_codes[row]
+        # Boundaries where the resume code changes along the sorted row
+        starts = np.flatnonzero(np.r_[True, row_codes[1:] != row_codes[:-1]])
+        ends = np.r_[starts[1:], len(row_codes)]
+        by_resume = {}
+        for start, end in zip(starts, ends):
+            code = row_codes[start]
+            if code < 0:
+                continue  # -1 padding or IDs without a live chunk
+            by_resume[resume_ids[code]] = [
+                _result_dict(chunks_by_id[int(idx)], score, idx)
+                for score, idx in zip(sorted_scores[row, start:end], sorted_ids[row, start:end])
+            ]
+        grouped.append(by_resume)
+
+    return grouped
+
+
+def dense_search_by_resume(
+    query_matrix: np.ndarray,
+    top_k_per_resume: int = 5,
+    user_id: str = "default",
+) -> List[Dict[str, List[Dict]]]:
+    """
+    Exact per-resume search: score every chunk with one (queries × chunks)
+    matmul and keep each resume's top-k, instead of a global ANN top-k.
+
+    Meant for small collections (≤ DENSE_EXACT_MAX_VECTORS), where the
+    matmul is cheaper than a FAISS round trip and every resume gets a
+    semantic score — not only those that made the global top-k.
+
+    Args:
+        query_matrix: np.ndarray of shape (384,) or (n_queries, 384)
+        top_k_per_resume: Chunks kept per resume per query
+        user_id: User identifier
+
+    Returns:
+        Same shape as search_batch(): one dict per query row,
+        resume_id → result dicts sorted by score descending.
+    """
+    query_matrix = np.ascontiguousarray(query_matrix, dtype=np.float32).reshape(-1, EMBEDDING_DIM)
+    n_queries = query_matrix.shape[0]
+
+    cached = _INDEX_CACHE.get(user_id)
+    if cached is None or n_queries == 0:
+        return [{} for _ in range(n_queries)]
+
+    dense = _cached_dense(cached, user_id)
+    if len(dense["ids"]) == 0:
+        return [{} for _ in range(n_queries)]
+
+    # ── One matmul, then a segmented sort: columns are grouped by resume,
+    #    so sorting (code, -score) ranks chunks within each resume ──
+    sims = query_matrix @ dense["vectors"].T
+    order = np.argsort(dense["codes"] * 4.0 - sims, axis=1, kind="stable")
+    ranks = np.arange(sims.shape[1]) - dense["starts"][dense["codes"]]
+    keep = ranks < top_k_per_resume  # rank of sorted position within its resume
+
+    resume_ids = cached["metadata"].get("resume_ids", [])
+    chunks_by_id = cached["chunks_by_id"]
+    grouped = []
+    for row in range(n_queries):
+        cols = order[row][keep]
+        by_resume: Dict[str, List[Dict]] = {}
+        for col in cols:
+            idx = int(dense["ids"][col])
+            by_resume.setdefault(resume_ids[dense["codes"][col]], []).append(
+                _result_dict(chunks_by_id[idx], sims[row, col], idx)
+            )
+        grouped.append(by_resume)
+
+    return grouped
+
+
+def get_resume_vectors(user_id: str = "default") -> Dict[str, np.ndarray]:
+    """
+    Live chunk vectors per resume: resume_id → (n_chunks, 384) float32.
+    Views into the cached dense layout — treat as read-only.
+    """
+    cached = _INDEX_CACHE.get(user_id)
+    if cached is None:
+        return {}
+    dense = _cached_dense(cached, user_id)
+    resume_ids = cached["metadata"].get("resume_ids", [])
+    starts = dense["starts"]
+    return {
+        resume_id: dense["vectors"][starts[code]:starts[code + 1]]
+        for code, resume_id in enumerate(resume_ids)
+        if starts[code + 1] > starts[code]
+    }
+
+
+def _cached_dense(cached: Dict, user_id: str = "default") -> Dict:
+    """
+    Build the dense layout once per cached index (counted against the cache
+    budget). Built under the entry's own lock and published in one
+    assignment — concurrent callers wait for it instead of building twice
+    or seeing it half-initialised.
+    """
+    dense = cached.get("dense")
+    if dense is not None:
+        return dense
+    with cached["dense_lock"]:
+        dense = cached.get("dense")
+        if dense is None:
+            dense = _dense_matrix(cached["metadata"], cached["store"])
+            _INDEX_CACHE.charge(cached, dense["vectors"].nbytes)
+            cached["dense"] = dense
+    return dense
+
+
+def _dense_matrix(metadata: Dict, store: np.ndarray) -> Dict:
+    """
+    Live vectors laid out for dense_search_by_resume: columns grouped by
+    resume (codes ascending), plus each group's start column. `store` is the
+    vector memmap loaded with `metadata` (cache entry), not the file as it
+    is now.
+    """
+    resume_codes = _resume_codes(metadata)
+    vectors, ids = _collect_all_embeddings(metadata, store=store)
+    codes = resume_codes[ids] if len(ids) else np.zeros(0, dtype=np.int64)
+    live = codes >= 0
+    by_code = np.argsort(codes[live], kind="stable")
+    ids = ids[live][by_code]
+    codes = codes[live][by_code]
+    starts = np.zeros(len(metadata.get("resume_ids", [])) + 1, dtype=np.int64)
+    starts[1:] = np.cumsum(np.bincount(codes, minlength=len(starts) - 1))
+    return {
+        "vectors": np.ascontiguousarray(np.asarray(vectors)[live][by_code], dtype=np.float32),
+        "ids": ids,
+        "codes": codes,
+        "starts": starts,
+    }
+
+
+def _id_selector(runs: List[List[int]]) -> faiss.IDSelector:
+    """FAISS selector over [start, end) ID runs — a range check when there is one run."""
+    if len(runs) == 1:
+        return faiss.IDSelectorRange(runs[0][0], runs[0][1])
+    ids = np.concatenate([np.arange(start, end, dtype=np.int64) for start, end in runs])
+    return faiss.IDSelectorBatch(ids)
+
+
+def _search_params(index: faiss.Index, nprobe: Optional[int] = None,
+                   selector: Optional[faiss.IDSelector] = None):
+    """
+    Per-call search parameters (the cached index itself is shared, never mutated).
+
+    With a selector on IVF, every cell is probed: the selector already limits
+    the scan to one resume's vectors, and probing all lists guarantees we get
+    min(top_k, resume chunk count) hits rather than whatever the nearest
+    nprobe cells happen to hold. (HNSW can't make that guarantee at any beam
+    width, so filtered HNSW searches go through _exact_search_runs instead.)
+    """
+    ivf = faiss.try_extract_index_ivf(index)
+    if selector is None:
+        if nprobe and ivf is not None:
+            return faiss.SearchParametersIVF(nprobe=nprobe)
+        return None
+    if ivf is not None:
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nlist)
+    return faiss.SearchParameters(sel=selector)
+
+
+def _is_hnsw(index: faiss.Index) -> bool:
+    return isinstance(index, faiss.IndexIDMap2) and isinstance(faiss.downcast_index(index.index), faiss.IndexHNSW)
+
+
+def _exact_search_runs(
+    store: np.ndarray,
+    runs: List[List[int]],
+    query: np.ndarray,
+    k: int,
+    chunks_by_id: Dict[int, Dict],
+) -> Tuple[np.ndarray, np.ndarray]:
     """
-    metadata = _load_metadata(user_id)
+    Exact top-k over [start, end) ID runs, scored straight from the vector
+    store (row = faiss_idx). Same (scores, ids) shape as index.search for
+    one query; always min(k, live chunks in the runs) hits.
+    """
+    ids = np.concatenate([np.arange(start, end, dtype=np.int64) for start, end in runs])
+    ids = ids[np.fromiter((int(i) in chunks_by_id for i in ids), dtype=bool, count=len(ids))]
+    sims = np.asarray(store[ids], dtype=np.float32) @ query[0]
+    order = np.argsort(-sims, kind="stable")[:k]
+    return sims[order][None, :], ids[order][None, :]
+
+
+def _result_dict(chunk_meta: Dict, score: float, idx: int) -> Dict:
+    """Shape a search hit the way hybrid_scorer expects it."""
+    return {
+        "text": chunk_meta["text"],
+        "section": chunk_meta["section"],
+        "weight": chunk_meta["weight"],
+        "resume_id": chunk_meta["resume_id"],
+        "chunk_index": chunk_meta.get("chunk_index", 0),
+        "score": float(score),  # cosine similarity
+        "faiss_idx": int(idx),
+    }
+
+
+def _chunks_by_id(metadata: Dict) -> Dict[int, Dict]:
+    """Map stable FAISS IDs → chunk metadata."""
+    return {c["faiss_idx"]: c for c in metadata["chunks"]}
+
+
+def _resume_codes(metadata: Dict) -> np.ndarray:
+    """
+    Lookup array for vectorized grouping: faiss_idx → position in
+    metadata["resume_ids"] (-1 for IDs with no live chunk).
+    """
+    positions = {rid: i for i, rid in enumerate(metadata.get("resume_ids", []))}
+    codes = np.full(metadata.get("next_id", 0), -1, dtype=np.int64)
+    for chunk in metadata["chunks"]:
+        if chunk["faiss_idx"] < len(codes):
+            codes[chunk["faiss_idx"]] = positions.get(chunk["resume_id"], -1)
+    return codes
+
+
+def remove_resume_vectors(
+    resume_id: str,
+    user_id: str = "default",
+    background_compact: bool = True,
+) -> bool:
+    """
+    Remove all vectors for a specific resume, in place.
     
-    # Filter out chunks belonging to this resume
-    remaining_chunks = [c for c in metadata["chunks"] if c["resume_id"] != resume_id]
+    Only this resume's IDs are dropped from the index (remove_ids) — no
+    re-embedding, no retraining, and every other chunk keeps its faiss_idx.
+    Its rows in the vector store become dead space until compact_index()
+    reclaims them (scheduled in the background past COMPACT_DEAD_RATIO).
     
-    if len(remaining_chunks) == len(metadata["chunks"]):
-        return False  # Resume not found in index
+    Returns True if successful.
+    """
+    with _user_lock(user_id):
+        metadata = _load_metadata(user_id)
+        
+        # Split chunks belonging to this resume from the rest
+        removed_ids = [c["faiss_idx"] for c in metadata["chunks"] if c["resume_id"] == resume_id]
+        
+        if not removed_ids:
+            return False  # Resume not found in index
+        
+        # Update metadata
+        metadata["chunks"] = [c for c in metadata["chunks"] if c["resume_id"] != resume_id]
+        metadata["resume_ids"] = [rid for rid in metadata.get("resume_ids", []) if rid != resume_id]
+        metadata.get("resume_ranges", {}).pop(resume_id, None)
+        
+        if not metadata["chunks"]:
+            # No chunks left — clean up files, nothing left that could reuse an ID
+            for path in (_index_path(user_id), _vectors_path(user_id)):
+                if path.exists():
+                    os.remove(str(path))
+            metadata["next_id"] = 0
+            metadata.pop("index_info", None)
+            _persist(None, metadata, user_id)
+            return True
+        
+        index = _read_index(user_id)
+        if not (metadata.get("id_mapped") and _remove_ids(index, removed_ids)):
+            # Legacy (position-addressed) index — one full rebuild, IDs still stable
+            vectors, ids = _collect_all_embeddings(metadata, user_id)
+            index, metadata["index_info"] = _build_index(vectors, ids)
+            metadata["id_mapped"] = True
+        
+        _persist(index, metadata, user_id)
+        
+        dead_ratio = 1 - len(metadata["chunks"]) / max(1, metadata["next_id"])
     
-    # Update metadata
-    metadata["chunks"] = remaining_chunks
-    metadata["resume_ids"] = [rid for rid in metadata.get("resume_ids", []) if rid != resume_id]
+    if background_compact and dead_ratio > COMPACT_DEAD_RATIO:
+        threading.Thread(target=compact_index, args=(user_id,), daemon=True).start()
     
-    # Re-index remaining vectors
-    if remaining_chunks:
-        vectors = np.array(
-            [c["_embedding"] for c in remaining_chunks if "_embedding" in c],
-            dtype=np.float32
-        )
-        
-        if vectors.shape[0] > 0:
-            # Update faiss_idx for remaining chunks
-            for i, chunk in enumerate(remaining_chunks):
-                chunk["faiss_idx"] = i
-            
-            index = _build_index(vectors)
-            faiss.write_index(index, str(_index_path(user_id)))
-        else:
-            # No vectors left — remove index file
-            index_path = _index_path(user_id)
-            if index_path.exists():
-                os.remove(str(index_path))
+    return True
+
+
+def _remove_ids(index: Optional[faiss.Index], ids: List[int]) -> bool:
+    """
+    Drop IDs from an index in place. Returns False when the index can't do
+    removals (missing, or a graph index like HNSW) so the caller rebuilds.
+    """
+    if index is None:
+        return False
+    ids = np.sort(np.asarray(ids, dtype=np.int64))
+    # A resume's chunks are added as one contiguous ID run → cheap range selector
+    if ids[-1] - ids[0] + 1 == len(ids):
+        selector = faiss.IDSelectorRange(int(ids[0]), int(ids[-1]) + 1)
     else:
-        # No chunks left — clean up files
-        index_path = _index_path(user_id)
-        if index_path.exists():
-            os.remove(str(index_path))
-    
-    _save_metadata(metadata, user_id)
+        selector = faiss.IDSelectorBatch(ids)
+    try:
+        index.remove_ids(selector)
+    except RuntimeError:
+        return False
     return True
 
 
-def get_index_stats(user_id: str = "default") -> Dict:
-    """Return stats about the current FAISS index."""
-    metadata = _load_metadata(user_id)
-    index_file = _index_path(user_id)
-    
-    stats = {
-        "total_vectors": len(metadata["chunks"]),
-        "resume_count": len(metadata.get("resume_ids", [])),
-        "resume_ids": metadata.get("resume_ids", []),
-        "index_exists": index_file.exists(),
-        "index_type": "IVFFlat" if len(metadata["chunks"]) >= IVFFLAT_THRESHOLD else "Flat",
-        "embedding_dim": EMBEDDING_DIM,
-        "nprobe": NPROBE_DEFAULT,
-    }
+def compact_index(user_id: str = "default") -> Dict:
+    """
+    Reclaim dead rows left by deletes: rewrite the vector store with live rows
+    only, renumber faiss_idx densely, and rebuild the index (re-running the
+    Flat/IVFFlat choice and training for the current size).
     
-    if index_file.exists():
-        index = faiss.read_index(str(index_file))
-        stats["index_ntotal"] = index.ntotal
+    Safe to run in a background thread — it holds the user's write lock, and
+    the cache picks up the new files on the next lookup.
+    """
+    with _user_lock(user_id):
+        metadata = _load_metadata(user_id)
+        dead_rows = metadata.get("next_id", 0) - len(metadata["chunks"])
+        if dead_rows <= 0:
+            return {"compacted": False, "dead_rows": 0}
+        
+        vectors, _ = _collect_all_embeddings(metadata, user_id)
+        vectors = np.array(vectors)  # detach from the memmap before rewriting the file
+        ids = np.arange(len(vectors), dtype=np.int64)
+        
+        for new_id, chunk in enumerate(metadata["chunks"]):
+            chunk["faiss_idx"] = new_id
+        metadata["next_id"] = len(ids)
+        _rebuild_resume_ranges(metadata)
+        
+        index, metadata["index_info"] = _build_index(vectors, ids)
+        metadata["id_mapped"] = True
+        # Vectors, index, metadata and manifest are swapped while the lock is
+        # held; cache loads take the same lock, so none sees a mix of old and new
+        _replace_vectors(vectors, user_id)
+        _persist(index, metadata, user_id)
     
-    return stats
\ No newline at end of file
+    logger.info(f"[faiss_store] Compacted {user_id}: reclaimed {dead_rows} dead rows, {len(ids)} live")
+    return {"compacted": True, "dead_rows": dead_rows, "total_vectors": len(ids)}
+
+
+def get_index_stats(user_id: str = "default") -> Dict:
+    """
+    Return stats about the current FAISS index.
+
+    Reads only the small stats manifest written alongside every index write —
+    no metadata parse, no index deserialization. Users indexed before the
+    manifest existed get one built (from the full files) on first call.
+    """
+    manifest = _read_manifest(user_id)
+    if manifest is None:
+        if not _metadata_path(user_id).exists():
+            manifest = _build_manifest(_load_metadata(user_id), None, user_id)
+        else:
+            with _user_lock(user_id):
+                metadata = _load_metadata(user_id)
+                manifest = _build_manifest(metadata, _read_index(user_id), user_id)
+                _write_manifest(manifest, user_id)
+
+    manifest["index_mode"] = INDEX_MODE
+    manifest["embedding_dim"] = EMBEDDING_DIM
+    return manifest
+
+
+def preload_indexes(limit: int) -> List[str]:
+    """
+    Load the `limit` most recently written user indexes into the cache
+    (startup warm-up). Returns the user ids loaded.
+    """
+    if limit <= 0 or not FAISS_DIR.exists():
+        return []
+    index_files = sorted(FAISS_DIR.glob("*.index"), key=lambda p: p.stat().st_mtime, reverse=True)
+    loaded = []
+    for path in index_files[:min(limit, INDEX_CACHE_MAX_USERS)]:
+        if _INDEX_CACHE.get(path.stem) is not None:
+            loaded.append(path.stem)
+    return loaded
+
+
+def get_cache_stats() -> Dict:
+    """Hit/miss/eviction counters for the in-process index cache."""
+    return _INDEX_CACHE.stats()
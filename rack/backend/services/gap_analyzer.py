@@ -16,12 +16,12 @@ import os
 import re
 import json
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 
 logger = logging.getLogger(__name__)
 
 # Import LLM Pass 3 from hybrid_scorer (single source of truth)
-from services.hybrid_scorer import _llm_skill_match
+from services.hybrid_scorer import _llm_skill_match, resolve_pass3
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -82,10 +82,14 @@ def analyze_gaps(
     resume_structured: Dict,
     resume_chunks: List[Dict] = None,
     use_llm: bool = True,
+    llm_matched_skills: Optional[Set[str]] = None,
 ) -> Dict:
     """
     Compute skill gaps between JD and resume.
     Uses 3-pass matching: canonical → text fallback → LLM semantic.
+
+    llm_matched_skills: Pass 3 verdicts from hybrid_scorer.resolve_pass3() —
+    the same set the scorer used, so no second LLM call is made.
     """
     resume_skills = set(s.lower() for s in resume_structured.get("skills", []))
     jd_required = set(s.lower() for s in parsed_jd.get("required_skills", []))
@@ -113,11 +117,14 @@ def analyze_gaps(
     # Pass 3: LLM semantic matching for remaining unmatched skills
     if use_llm and (missing_required or missing_preferred):
         all_unmatched = missing_required | missing_preferred
-        llm_matched = _llm_skill_match(
-            unmatched_skills=all_unmatched,
-            resume_text=resume_text,
-            resume_skills=list(resume_structured.get("skills", [])),
-        )
+        if llm_matched_skills is not None:
+            llm_matched = all_unmatched & llm_matched_skills
+        else:
+            llm_matched = _llm_skill_match(
+                unmatched_skills=all_unmatched,
+                resume_text=resume_text,
+                resume_skills=list(resume_structured.get("skills", [])),
+            )
         missing_required -= llm_matched
         missing_preferred -= llm_matched
 
@@ -230,7 +237,12 @@ Return ONLY valid JSON (no markdown, no backticks):
 
 async def analyze_gaps_with_llm(parsed_jd, resume_structured, resume_chunks=None):
     """Full gap analysis: deterministic + LLM advice."""
-    gaps = analyze_gaps(parsed_jd, resume_structured, resume_chunks)
+    verdicts = await resolve_pass3(
+        parsed_jd, [{"id": "resume", "structured": resume_structured, "chunks": resume_chunks or []}],
+    )
+    gaps = analyze_gaps(
+        parsed_jd, resume_structured, resume_chunks, llm_matched_skills=verdicts["resume"],
+    )
 
     if gaps["gap_count"] > 0:
         llm_advice = await _get_llm_gap_advice(
@@ -251,7 +263,7 @@ async def _get_llm_gap_advice(missing_skills, resume_skills, jd_title):
         return None
 
     try:
-        import httpx
+        from services.llm_client import chat_completion
 
         user_msg = (
             f"Role: {jd_title}\n"
@@ -259,34 +271,22 @@ async def _get_llm_gap_advice(missing_skills, resume_skills, jd_title):
             f"Missing skills to analyze: {', '.join(missing_skills[:10])}"
         )
 
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "gpt-4o-mini",
-                    "messages": [
-                        {"role": "system", "content": _GAP_LLM_PROMPT},
-                        {"role": "user", "content": user_msg},
-                    ],
-                    "temperature": 0.3,
-                    "max_tokens": 600,
-                },
-            )
-
-            if response.status_code != 200:
-                return None
-
-            data = response.json()
-            content = data["choices"][0]["message"]["content"].strip()
-            content = re.sub(r'^```(?:json)?\s*', '', content)
-            content = re.sub(r'\s*```$', '', content)
+        content = await chat_completion(
+            [
+                {"role": "system", "content": _GAP_LLM_PROMPT},
+                {"role": "user", "content": user_msg},
+            ],
+            model="gpt-4o-mini",
+            temperature=0.3,
+            max_tokens=600,
+            timeout=15.0,
+            caller="gap_analyzer",
+        )
+        content = re.sub(r'^```(?:json)?\s*', '', content)
+        content = re.sub(r'\s*```$', '', content)
 
-            parsed = json.loads(content)
-            return parsed.get("gap_advice", [])
+        parsed = json.loads(content)
+        return parsed.get("gap_advice", [])
 
     except Exception as e:
         print(f"[gap_analyzer] LLM advice failed: {e}")
@@ -0,0 +1,147 @@
+"""
+services/http_clients.py — Application-lifetime HTTP clients for outbound calls.
+
+Every outbound caller (OpenAI via llm_client, Greenhouse/Lever/Remotive
+fetchers, Supabase Storage) used to open its own httpx client per call,
+paying DNS + TCP + TLS setup each time and never reusing a connection.
+This module keeps one pooled client of each kind for the process:
+
+  - get_async_client() — httpx.AsyncClient for the event loop
+  - get_sync_client()  — httpx.Client for blocking call sites / worker threads
+
+httpx keeps a separate connection pool per origin inside a client, so one
+client serves every host; HTTP_MAX_CONNECTIONS / HTTP_MAX_KEEPALIVE bound the
+total. HTTP/2 (multiplexing many requests over one connection — useful for
+the bursty OpenAI traffic) is enabled when the optional `h2` package is
+installed and HTTP2_ENABLED is on.
+
+main.py's lifespan calls start() / stop(). Outside the app (scripts, the
+warm-up CLI) the clients are created lazily on first use; an async client is
+tied to the event loop that created it, so a new loop gets a new client. The
+old one is closed on its own loop — when that loop shuts down (asyncio.run
+cancels the parked closer task), or right away if it is still running in
+another thread. Per-request timeouts are still passed by callers.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# ═══════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════
+
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))    # Total open connections per client
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))         # Idle connections kept warm
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30")) # Seconds an idle connection lives
+HTTP_CONNECT_TIMEOUT = 5.0         # Default connect timeout
+HTTP_DEFAULT_TIMEOUT = 30.0        # Default read/write/pool timeout (callers usually override)
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "1") == "1"
+
+
+def _http2_available() -> bool:
+    if not HTTP2_ENABLED:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _client_options() -> Dict:
+    return {
+        "http2": _http2_available(),
+        "limits": httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(HTTP_DEFAULT_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+    }
+
+
+_lock = threading.Lock()
+_async_client: Optional[httpx.AsyncClient] = None
+_async_loop: Optional[asyncio.AbstractEventLoop] = None
+_async_closer: Optional[asyncio.Task] = None
+_sync_client: Optional[httpx.Client] = None
+
+
+async def _close_on_loop_exit(client: httpx.AsyncClient):
+    """Parked until its loop shuts down and cancels it, then closes the client on that loop."""
+    try:
+        await asyncio.get_running_loop().create_future()
+    finally:
+        await client.aclose()
+
+
+def _discard_async_client(client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop, closer: asyncio.Task):
+    """Close a client left behind by another event loop, on that loop (via its closer task)."""
+    if client.is_closed:
+        return
+    if loop.is_closed():
+        # Closed without cancelling its tasks — the connections' transports
+        # can't be closed without the loop; they go with the client object
+        logger.debug("[http_clients] Dropping AsyncClient of a closed event loop")
+        return
+    loop.call_soon_threadsafe(closer.cancel)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PUBLIC API
+# ═══════════════════════════════════════════════════════════════════
+
+def get_async_client() -> httpx.AsyncClient:
+    """Shared AsyncClient for the running event loop (must be called from async code)."""
+    global _async_client, _async_loop, _async_closer
+    loop = asyncio.get_running_loop()
+    if _async_client is not None and _async_loop is not loop:
+        _discard_async_client(_async_client, _async_loop, _async_closer)
+        _async_client = None
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(**_client_options())
+        _async_loop = loop
+        _async_closer = loop.create_task(_close_on_loop_exit(_async_client))
+    return _async_client
+
+
+def get_sync_client() -> httpx.Client:
+    """Shared blocking Client (httpx.Client is thread-safe)."""
+    global _sync_client
+    with _lock:
+        if _sync_client is None or _sync_client.is_closed:
+            _sync_client = httpx.Client(**_client_options())
+        return _sync_client
+
+
+async def start():
+    """Create the clients up front (FastAPI lifespan startup)."""
+    get_async_client()
+    get_sync_client()
+    options = _client_options()
+    logger.info(
+        f"[http_clients] Started: http2={options['http2']}, "
+        f"max_connections={HTTP_MAX_CONNECTIONS}, keepalive={HTTP_MAX_KEEPALIVE}"
+    )
+
+
+async def stop():
+    """Close the clients and their pooled connections (FastAPI lifespan shutdown)."""
+    global _async_client, _async_loop, _async_closer, _sync_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        if _async_closer is not None and _async_loop is asyncio.get_running_loop():
+            _async_closer.cancel()
+        _async_client, _async_loop, _async_closer = None, None, None
+    with _lock:
+        if _sync_client is not None:
+            _sync_client.close()
+            _sync_client = None
+    logger.info("[http_clients] Stopped")
@@ -22,14 +22,19 @@ Design decisions:
   - Skill matching uses normalized canonical names (from shared SKILL_ALIASES)
   - For LLM-extracted skills not in SKILL_ALIASES, falls back to text search
     in resume raw text/chunks to avoid false negatives
+  - LLM Pass 3 is async and batched per JD (resolve_pass3), with verdicts
+    cached per (skill, resume content hash)
 """
 
+import asyncio
 import json
 import logging
 import os
 import re
 from typing import Dict, List, Optional, Set
 
+from services.cache_store import SqliteCache, make_key
+
 logger = logging.getLogger(__name__)
 
 # ═══════════════════════════════════════════════════════════════════
@@ -43,6 +48,9 @@ WEIGHTS = {
     "keyword":    0.10,    # Section-weighted keyword hits
 }
 
+# Chunks averaged into the semantic score (matcher's dense mode keeps this many per resume)
+SEMANTIC_TOP_K = 5
+
 # Section weights for keyword_position scoring
 SECTION_WEIGHTS = {
     "summary": 1.0,
@@ -58,7 +66,7 @@ SECTION_WEIGHTS = {
 # COMPONENT 1: SEMANTIC SCORE (FAISS cosine similarity)
 # ═══════════════════════════════════════════════════════════════════
 
-def _compute_semantic_score(faiss_results: List[Dict], top_k: int = 5) -> float:
+def _compute_semantic_score(faiss_results: List[Dict], top_k: int = SEMANTIC_TOP_K) -> float:
     """
     Average cosine similarity of top-K FAISS results for this resume.
 
@@ -95,6 +103,7 @@ def _compute_skill_overlap(
     resume_chunks: List[Dict] = None,
     resume_structured: Dict = None,
     use_llm: bool = True,
+    llm_matched_skills: Optional[Set[str]] = None,
 ) -> Dict:
     """
     Compute skill overlap between JD requirements and resume skills.
@@ -107,48 +116,29 @@ def _compute_skill_overlap(
 
     This 3-pass approach is domain-agnostic: works for AI, biomedical,
     mechanical engineering, or any field without hardcoding domain knowledge.
-    """
-    resume_set = set(s.lower() for s in resume_skills)
-    required_set = set(s.lower() for s in jd_required)
-    preferred_set = set(s.lower() for s in jd_preferred)
-
-    # Pass 1: Direct canonical matching
-    required_matched = required_set & resume_set
-    required_missing = required_set - resume_set
-    preferred_matched = preferred_set & resume_set
-    preferred_missing = preferred_set - resume_set
 
-    # Pass 2: Text-based fallback for still-missing skills
-    resume_full_text = ""
-    if resume_chunks or resume_structured:
-        resume_full_text = _build_resume_text(resume_chunks, resume_structured)
-        
-        text_matched_required = set()
-        for skill in list(required_missing):
-            if _skill_in_text(skill, resume_full_text):
-                text_matched_required.add(skill)
-        
-        required_matched |= text_matched_required
-        required_missing -= text_matched_required
-
-        text_matched_preferred = set()
-        for skill in list(preferred_missing):
-            if _skill_in_text(skill, resume_full_text):
-                text_matched_preferred.add(skill)
-
-        preferred_matched |= text_matched_preferred
-        preferred_missing -= text_matched_preferred
+    llm_matched_skills: Pass 3 verdicts already resolved for this resume
+    (resolve_pass3) — used instead of a blocking per-resume LLM call.
+    """
+    (required_set, required_matched, required_missing,
+     preferred_set, preferred_matched, preferred_missing,
+     resume_full_text) = _text_match_passes(
+        jd_required, jd_preferred, resume_skills, resume_chunks, resume_structured,
+    )
 
     # Pass 3: LLM semantic matching for remaining unmatched skills
-    llm_matched_skills = set()
     if use_llm and (required_missing or preferred_missing):
         all_unmatched = required_missing | preferred_missing
-        if resume_full_text:
+        if llm_matched_skills is not None:
+            llm_matched_skills = all_unmatched & llm_matched_skills
+        elif resume_full_text:
             llm_matched_skills = _llm_skill_match(
                 unmatched_skills=all_unmatched,
                 resume_text=resume_full_text,
                 resume_skills=resume_skills,
             )
+        else:
+            llm_matched_skills = set()
 
         llm_matched_req = required_missing & llm_matched_skills
         required_matched |= llm_matched_req
@@ -183,6 +173,54 @@ def _compute_skill_overlap(
     }
 
 
+def _text_match_passes(
+    jd_required: List[str],
+    jd_preferred: List[str],
+    resume_skills: List[str],
+    resume_chunks: List[Dict] = None,
+    resume_structured: Dict = None,
+):
+    """
+    Passes 1 + 2 (canonical names, then resume text search).
+    Returns (required_set, required_matched, required_missing, preferred_set,
+    preferred_matched, preferred_missing, resume_full_text), all lowercased.
+    """
+    resume_set = set(s.lower() for s in resume_skills)
+    required_set = set(s.lower() for s in jd_required)
+    preferred_set = set(s.lower() for s in jd_preferred)
+
+    # Pass 1: Direct canonical matching
+    required_matched = required_set & resume_set
+    required_missing = required_set - resume_set
+    preferred_matched = preferred_set & resume_set
+    preferred_missing = preferred_set - resume_set
+
+    # Pass 2: Text-based fallback for still-missing skills
+    resume_full_text = ""
+    if resume_chunks or resume_structured:
+        resume_full_text = _build_resume_text(resume_chunks, resume_structured)
+        
+        text_matched_required = set()
+        for skill in list(required_missing):
+            if _skill_in_text(skill, resume_full_text):
+                text_matched_required.add(skill)
+        
+        required_matched |= text_matched_required
+        required_missing -= text_matched_required
+
+        text_matched_preferred = set()
+        for skill in list(preferred_missing):
+            if _skill_in_text(skill, resume_full_text):
+                text_matched_preferred.add(skill)
+
+        preferred_matched |= text_matched_preferred
+        preferred_missing -= text_matched_preferred
+
+    return (required_set, required_matched, required_missing,
+            preferred_set, preferred_matched, preferred_missing,
+            resume_full_text)
+
+
 def _build_resume_text(chunks: List[Dict] = None, structured: Dict = None) -> str:
     """Build full resume text from chunks and structured data for text search."""
     parts = []
@@ -253,6 +291,91 @@ def _skill_in_text(skill: str, text: str) -> bool:
 # ═══════════════════════════════════════════════════════════════════
 # PASS 3: LLM SEMANTIC SKILL MATCHING
 # ═══════════════════════════════════════════════════════════════════
+#
+# Pass 3 runs once per JD for all resumes (resolve_pass3): every resume's
+# still-unmatched skills go into one request, and the verdicts are handed to
+# both score_resume and analyze_gaps. Verdicts are cached per
+# (skill, resume content hash) — a resume matched against a new JD only asks
+# about skills it has never been checked for.
+
+PASS3_MODEL = "gpt-4o-mini"
+PASS3_VERSION = "2"                # Bump to invalidate cached verdicts
+PASS3_RESUME_CHARS = 4000          # Resume text sent per resume
+PASS3_MAX_PROMPT_CHARS = 24_000    # Larger resume groups are split across requests
+PASS3_TIMEOUT = 10.0               # Per-attempt timeout (seconds)
+PASS3_DEADLINE = 20.0              # Total budget per request, incl. rate-limit waits
+PASS3_CACHE_TTL_SECONDS = 30 * 24 * 3600
+PASS3_CACHE_MAX_ENTRIES = 200_000
+
+_PASS3_SYSTEM_PROMPT = "You are a precise skill matching system. Return only valid JSON."
+
+_PASS3_GUIDELINES = """RULES:
+1. A skill is MATCHED if the resume shows clear evidence of that competency, even using different terminology.
+2. Be STRICT — the evidence must be strong, not a vague stretch.
+3. Return ONLY skills that have clear supporting evidence.
+
+Examples of valid inference:
+- "instruction-tuning pipeline for StarCoder2" → demonstrates "Fine-tuning" ✓
+- "cross-validation, hyperparameter tuning, precision/recall tracking, evaluation workflows" → demonstrates "A/B Testing" ✓
+- "MLflow, drift monitoring, model deployment pipelines, CI/CD for models" → demonstrates "MLOps" ✓
+- "data processing, feature engineering, cleaning pipelines" → demonstrates "Data Preprocessing" ✓
+- "deployed inference using vLLM on GPU instances" → demonstrates "Model Deployment" ✓
+
+Examples of INVALID inference (too much of a stretch):
+- "used Python" → demonstrates "Machine Learning" ✗ (Python alone doesn't prove ML)
+- "built a website" → demonstrates "React" ✗ (could be any framework)"""
+
+_PASS3_PROMPT_HASH = make_key(_PASS3_SYSTEM_PROMPT, _PASS3_GUIDELINES)
+
+_verdict_cache = SqliteCache(
+    "skill_verdicts", max_entries=PASS3_CACHE_MAX_ENTRIES, ttl_seconds=PASS3_CACHE_TTL_SECONDS,
+)
+
+
+def _resume_content_hash(resume_text: str, resume_skills: List[str]) -> str:
+    """Hash of the resume content Pass 3 actually sees."""
+    return make_key(resume_text[:PASS3_RESUME_CHARS], ", ".join(resume_skills[:20]))
+
+
+def _verdict_key(resume_hash: str, skill: str) -> str:
+    return make_key(PASS3_VERSION, PASS3_MODEL, _PASS3_PROMPT_HASH, resume_hash, skill)
+
+
+def _cached_verdicts(resume_hash: str, skills: Set[str]):
+    """Split skills into (cached matches, skills with no cached verdict)."""
+    keys = {skill: _verdict_key(resume_hash, skill) for skill in skills}
+    cached = _verdict_cache.get_many(keys.values())
+    matched = {skill for skill, key in keys.items() if cached.get(key) == b"1"}
+    unknown = {skill for skill, key in keys.items() if key not in cached}
+    return matched, unknown
+
+
+def _store_verdicts(resume_hash: str, asked: Set[str], matched: Set[str]):
+    _verdict_cache.set_many({
+        _verdict_key(resume_hash, skill): b"1" if skill in matched else b"0"
+        for skill in asked
+    })
+
+
+def _parse_llm_json(content: str):
+    content = re.sub(r'^```(?:json)?\s*', '', content.strip())
+    content = re.sub(r'\s*```$', '', content)
+    return json.loads(content)
+
+
+def _matched_from_items(items, asked: Set[str], label: str = "") -> Set[str]:
+    """Lowercased skills from a "matched" list, restricted to the skills asked about."""
+    matched = set()
+    for item in items or []:
+        skill_name = item.get("skill", "") if isinstance(item, dict) else str(item)
+        skill = skill_name.lower().strip()
+        if skill not in asked:
+            continue
+        matched.add(skill)
+        evidence = item.get("evidence", "") if isinstance(item, dict) else ""
+        logger.info(f"Pass 3 LLM matched{label}: '{skill_name}' — {evidence}")
+    return matched
+
 
 def _llm_skill_match(
     unmatched_skills: Set[str],
@@ -260,57 +383,39 @@ def _llm_skill_match(
     resume_skills: List[str],
 ) -> Set[str]:
     """
-    Pass 3: Use GPT-4o-mini to determine if the resume demonstrates skills
-    that Pass 1 (canonical) and Pass 2 (text search) missed.
+    Pass 3 for a single resume, blocking — kept for callers outside the
+    matcher that have no batched verdicts; call it from a worker thread, on
+    the event loop only cached verdicts are returned. The matcher uses
+    resolve_pass3().
 
-    This is the key to domain-agnostic matching. The LLM understands that:
+    Uses GPT-4o-mini to determine if the resume demonstrates skills that
+    Pass 1 (canonical) and Pass 2 (text search) missed. The LLM understands that:
       - "instruction-tuning pipeline for StarCoder2" → Fine-tuning
       - "cross-validation, precision/recall tracking" → A/B Testing / Experimentation
       - "MLflow, drift monitoring, deployed inference" → MLOps
       - "gel electrophoresis, PCR" → wet lab experience (for biomedical JDs)
 
-    Only fires for skills still unmatched after Pass 1+2 (typically 2-5 skills).
-    One LLM call per match request. Cost: ~$0.0001-0.0002.
-
     Returns: set of skill names (lowercased) that the LLM confirmed are present.
     """
     if not unmatched_skills:
         return set()
 
-    api_key = os.environ.get("OPENAI_API_KEY")
-    if not api_key:
-        return set()
-
-    # Truncate resume text to fit context (keep most relevant parts)
-    truncated_resume = resume_text[:4000]
-
-    skills_list = sorted(unmatched_skills)
+    resume_hash = _resume_content_hash(resume_text, resume_skills)
+    matched, unknown = _cached_verdicts(resume_hash, set(unmatched_skills))
+    if not unknown or not os.environ.get("OPENAI_API_KEY"):
+        return matched
 
     prompt = f"""You are a precise resume skill matcher. Given a resume and a list of skills from a job description that were NOT found by keyword matching, determine which skills the candidate actually demonstrates through their work experience, projects, or education — even if they never use the exact term.
 
-RULES:
-1. A skill is MATCHED if the resume shows clear evidence of that competency, even using different terminology.
-2. Be STRICT — the evidence must be strong, not a vague stretch.
-3. Return ONLY skills that have clear supporting evidence.
-
-Examples of valid inference:
-- "instruction-tuning pipeline for StarCoder2" → demonstrates "Fine-tuning" ✓
-- "cross-validation, hyperparameter tuning, precision/recall tracking, evaluation workflows" → demonstrates "A/B Testing" ✓
-- "MLflow, drift monitoring, model deployment pipelines, CI/CD for models" → demonstrates "MLOps" ✓
-- "data processing, feature engineering, cleaning pipelines" → demonstrates "Data Preprocessing" ✓
-- "deployed inference using vLLM on GPU instances" → demonstrates "Model Deployment" ✓
-
-Examples of INVALID inference (too much of a stretch):
-- "used Python" → demonstrates "Machine Learning" ✗ (Python alone doesn't prove ML)
-- "built a website" → demonstrates "React" ✗ (could be any framework)
+{_PASS3_GUIDELINES}
 
 RESUME TEXT:
-{truncated_resume}
+{resume_text[:PASS3_RESUME_CHARS]}
 
 CANDIDATE'S KNOWN SKILLS: {', '.join(resume_skills[:20])}
 
 UNMATCHED SKILLS TO CHECK:
-{json.dumps(skills_list)}
+{json.dumps(sorted(unknown))}
 
 Return ONLY valid JSON (no markdown, no backticks):
 {{
@@ -321,53 +426,195 @@ Return ONLY valid JSON (no markdown, no backticks):
 }}"""
 
     try:
-        import httpx
+        from services.llm_client import chat_completion_sync
+
+        content = chat_completion_sync(
+            [
+                {"role": "system", "content": _PASS3_SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            model=PASS3_MODEL,
+            temperature=0.1,
+            max_tokens=500,
+            timeout=PASS3_TIMEOUT,
+            deadline=PASS3_DEADLINE,
+            caller="hybrid_scorer",
+        )
+        fresh = _matched_from_items(_parse_llm_json(content).get("matched"), unknown)
+    except json.JSONDecodeError as e:
+        logger.warning(f"LLM skill match returned invalid JSON: {e}")
+        return matched
+    except Exception as e:
+        logger.warning(f"LLM skill match failed: {e}")
+        return matched
+
+    _store_verdicts(resume_hash, unknown, fresh)
+    logger.info(f"Pass 3 LLM: {len(fresh)} matched out of {len(unknown)} checked")
+    return matched | fresh
+
+
+def _group_pass3_requests(pending: List[Dict]) -> List[List[Dict]]:
+    """Pack resumes into requests that stay under PASS3_MAX_PROMPT_CHARS."""
+    groups, current, size = [], [], 0
+    for entry in pending:
+        entry_size = len(entry["resume_text"]) + 40 * len(entry["skills"]) + 400
+        if current and size + entry_size > PASS3_MAX_PROMPT_CHARS:
+            groups.append(current)
+            current, size = [], 0
+        current.append(entry)
+        size += entry_size
+    if current:
+        groups.append(current)
+    return groups
+
+
+async def _llm_skill_match_group(group: List[Dict]) -> Dict[str, Set[str]]:
+    """One request for several resumes. Returns key → matched skills for the resumes answered."""
+    from services.llm_client import chat_completion
+
+    sections = []
+    for i, entry in enumerate(group, start=1):
+        sections.append(
+            f"=== RESUME R{i} ===\n"
+            f"{entry['resume_text']}\n\n"
+            f"CANDIDATE'S KNOWN SKILLS: {', '.join(entry['resume_skills'][:20])}\n"
+            f"UNMATCHED SKILLS TO CHECK: {json.dumps(sorted(entry['skills']))}"
+        )
 
-        response = httpx.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": "gpt-4o-mini",
-                "messages": [
-                    {"role": "system", "content": "You are a precise skill matching system. Return only valid JSON."},
-                    {"role": "user", "content": prompt},
-                ],
-                "temperature": 0.1,
-                "max_tokens": 500,
-            },
-            timeout=10.0,
+    prompt = f"""You are a precise resume skill matcher. Below are {len(group)} resumes, each with a list of skills from a job description that were NOT found by keyword matching. For each resume separately, determine which of ITS listed skills the candidate actually demonstrates through their work experience, projects, or education — even if they never use the exact term.
+
+{_PASS3_GUIDELINES}
+
+{chr(10).join(sections)}
+
+Return ONLY valid JSON (no markdown, no backticks), one entry per resume id:
+{{
+  "resumes": [
+    {{"id": "R1", "matched": [{{"skill": "Fine-tuning", "evidence": "built instruction-tuning pipeline for StarCoder2-15B"}}]}},
+    {{"id": "R2", "matched": []}}
+  ]
+}}"""
+
+    n_skills = sum(len(entry["skills"]) for entry in group)
+    content = await chat_completion(
+        [
+            {"role": "system", "content": _PASS3_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        model=PASS3_MODEL,
+        temperature=0.1,
+        max_tokens=min(4000, 200 + 60 * n_skills),
+        timeout=PASS3_TIMEOUT,
+        deadline=PASS3_DEADLINE,
+        caller="hybrid_scorer",
+        extra={"response_format": {"type": "json_object"}},
+    )
+
+    by_label = {f"R{i}": entry for i, entry in enumerate(group, start=1)}
+    answered: Dict[str, Set[str]] = {}
+    for item in _parse_llm_json(content).get("resumes", []):
+        if not isinstance(item, dict):
+            continue
+        entry = by_label.get(str(item.get("id", "")).strip())
+        if entry is None:
+            continue
+        answered[entry["key"]] = _matched_from_items(
+            item.get("matched"), entry["skills"], label=f" [{entry['key']}]",
         )
+    return answered
+
+
+async def llm_skill_match_batch(requests: List[Dict]) -> Dict[str, Set[str]]:
+    """
+    Async Pass 3 for many resumes at once.
+
+    Args:
+        requests: [{"key", "unmatched_skills", "resume_text", "resume_skills"}, ...]
 
-        if response.status_code != 200:
-            logger.warning(f"LLM skill match API error: {response.status_code}")
-            return set()
+    Returns:
+        key → lowercased skills the LLM confirmed (cached verdicts included).
+        Skills that could not be checked (no API key, failed request) count as
+        unmatched and are not cached, so the next match retries them.
+    """
+    verdicts: Dict[str, Set[str]] = {}
+    pending: List[Dict] = []
+    for request in requests:
+        skills = {s.lower() for s in request["unmatched_skills"]}
+        resume_hash = _resume_content_hash(request["resume_text"], request["resume_skills"])
+        matched, unknown = _cached_verdicts(resume_hash, skills)
+        verdicts[request["key"]] = matched
+        if unknown:
+            pending.append({
+                "key": request["key"],
+                "skills": unknown,
+                "resume_hash": resume_hash,
+                "resume_text": request["resume_text"][:PASS3_RESUME_CHARS],
+                "resume_skills": request["resume_skills"],
+            })
+
+    if not pending or not os.environ.get("OPENAI_API_KEY"):
+        return verdicts
+
+    groups = _group_pass3_requests(pending)
+    outcomes = await asyncio.gather(
+        *[_llm_skill_match_group(group) for group in groups], return_exceptions=True,
+    )
 
-        content = response.json()["choices"][0]["message"]["content"].strip()
-        content = re.sub(r'^```(?:json)?\s*', '', content)
-        content = re.sub(r'\s*```$', '', content)
+    checked = 0
+    for group, outcome in zip(groups, outcomes):
+        if isinstance(outcome, json.JSONDecodeError):
+            logger.warning(f"Pass 3 batch returned invalid JSON: {outcome}")
+            continue
+        if isinstance(outcome, Exception):
+            logger.warning(f"Pass 3 batch failed: {outcome}")
+            continue
+        for entry in group:
+            if entry["key"] not in outcome:
+                continue
+            fresh = outcome[entry["key"]]
+            _store_verdicts(entry["resume_hash"], entry["skills"], fresh)
+            verdicts[entry["key"]] |= fresh
+            checked += len(entry["skills"])
+
+    logger.info(
+        f"Pass 3 LLM batch: {len(pending)} resumes in {len(groups)} request(s), "
+        f"{checked} skills checked, {sum(len(v) for v in verdicts.values())} matched"
+    )
+    return verdicts
 
-        result = json.loads(content)
-        matched_skills = set()
-        for item in result.get("matched", []):
-            skill_name = item.get("skill", "") if isinstance(item, dict) else str(item)
-            matched_skills.add(skill_name.lower().strip())
-            evidence = item.get("evidence", "") if isinstance(item, dict) else ""
-            logger.info(f"Pass 3 LLM matched: '{skill_name}' — {evidence}")
 
-        logger.info(
-            f"Pass 3 LLM: {len(matched_skills)} matched out of {len(unmatched_skills)} checked"
+async def resolve_pass3(parsed_jd: Dict, resumes: List[Dict]) -> Dict[str, Set[str]]:
+    """
+    Pass 3 verdicts for one JD against loaded resume records (ingestion
+    metadata with "id", "structured", "chunks"), from at most a few requests.
+
+    Returns resume_id → lowercased skills matched by the LLM; pass them as
+    llm_matched_skills to score_resume() and analyze_gaps().
+    """
+    jd_required = parsed_jd.get("required_skills", [])
+    jd_preferred = parsed_jd.get("preferred_skills", [])
+
+    requests = []
+    verdicts: Dict[str, Set[str]] = {}
+    for resume in resumes:
+        structured = resume.get("structured", {})
+        resume_skills = structured.get("skills", [])
+        _, _, required_missing, _, _, preferred_missing, resume_text = _text_match_passes(
+            jd_required, jd_preferred, resume_skills, resume.get("chunks", []), structured,
         )
-        return matched_skills
+        verdicts[resume["id"]] = set()
+        unmatched = required_missing | preferred_missing
+        if unmatched and resume_text:
+            requests.append({
+                "key": resume["id"],
+                "unmatched_skills": unmatched,
+                "resume_text": resume_text,
+                "resume_skills": resume_skills,
+            })
 
-    except json.JSONDecodeError as e:
-        logger.warning(f"LLM skill match returned invalid JSON: {e}")
-        return set()
-    except Exception as e:
-        logger.warning(f"LLM skill match failed: {e}")
-        return set()
+    if requests:
+        verdicts.update(await llm_skill_match_batch(requests))
+    return verdicts
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -504,6 +751,7 @@ def score_resume(
     resume_chunks: List[Dict] = None,
     weights: Optional[Dict] = None,
     use_llm: bool = True,
+    llm_matched_skills: Optional[Set[str]] = None,
 ) -> Dict:
     """
     Compute the hybrid match score for a single resume against a parsed JD.
@@ -515,6 +763,8 @@ def score_resume(
         resume_chunks: Resume chunk dicts (for text-based skill fallback)
         weights: Optional custom weights (defaults to WEIGHTS)
         use_llm: Whether to use LLM Pass 3 for semantic skill matching
+        llm_matched_skills: Pass 3 verdicts from resolve_pass3() for this resume;
+            None makes Pass 3 call the LLM itself (blocking)
 
     Returns:
         {
@@ -539,6 +789,7 @@ def score_resume(
         resume_chunks=resume_chunks,
         resume_structured=resume_structured,
         use_llm=use_llm,
+        llm_matched_skills=llm_matched_skills,
     )
 
     # Component 3: Experience
@@ -20,6 +20,7 @@ Pipeline timing (typical, single resume on CPU):
 
 import json
 import os
+import threading
 import uuid
 from datetime import datetime, timezone
 from pathlib import Path
@@ -41,6 +42,9 @@ METADATA_FILE = BASE_DIR / "uploads" / "resumes_metadata.json"
 # Ensure dirs exist
 UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
 
+# Uploads run in worker threads — metadata read-modify-writes go through this lock
+_metadata_lock = threading.Lock()
+
 
 def _load_metadata() -> Dict:
     """Load the metadata JSON file."""
@@ -51,9 +55,11 @@ def _load_metadata() -> Dict:
 
 
 def _save_metadata(data: Dict):
-    """Save the metadata JSON file."""
-    with open(METADATA_FILE, "w") as f:
+    """Save the metadata JSON file (tmp + os.replace — readers never see a partial file)."""
+    tmp_path = METADATA_FILE.with_name(f"{METADATA_FILE.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w") as f:
         json.dump(data, f, indent=2, default=str)
+    os.replace(tmp_path, METADATA_FILE)
 
 
 def ingest_resume(file_path: str, original_filename: str, session_id: str = "default") -> Dict:
@@ -145,9 +151,10 @@ def ingest_resume(file_path: str, original_filename: str, session_id: str = "def
     }
 
     # Step 8: Persist metadata
-    metadata = _load_metadata()
-    metadata["resumes"].append(resume_record)
-    _save_metadata(metadata)
+    with _metadata_lock:
+        metadata = _load_metadata()
+        metadata["resumes"].append(resume_record)
+        _save_metadata(metadata)
 
     return resume_record
 
@@ -193,31 +200,45 @@ def get_resume_by_id(resume_id: str) -> Optional[Dict]:
     return None
 
 
-def delete_resume(resume_id: str, session_id: str = "default") -> bool:
-    """Delete resume file, FAISS vectors, and metadata."""
+def get_resumes_full(session_id: str = "default") -> list:
+    """
+    Full metadata (chunks + structured data) for every resume of a session,
+    from one metadata read — instead of get_all_resumes() + get_resume_by_id()
+    per resume.
+    """
     metadata = _load_metadata()
-    resume = None
-    for r in metadata["resumes"]:
-        if r["id"] == resume_id:
-            resume = r
-            break
-
-    if not resume:
-        return False
+    return [
+        r for r in metadata["resumes"]
+        if r.get("session_id", "default") == session_id
+    ]
 
-    # Delete file from disk
-    file_path = resume.get("file_path")
-    if file_path and os.path.exists(file_path):
-        os.remove(file_path)
 
-    # Remove vectors from FAISS index — use stored session_id if available
-    effective_session = resume.get("session_id", session_id)
-    remove_resume_vectors(resume_id, user_id=effective_session)
-
-    # Remove from metadata
-    metadata["resumes"] = [r for r in metadata["resumes"] if r["id"] != resume_id]
-    _save_metadata(metadata)
-    return True
+def delete_resume(resume_id: str, session_id: str = "default") -> bool:
+    """Delete resume file, FAISS vectors, and metadata."""
+    with _metadata_lock:
+        metadata = _load_metadata()
+        resume = None
+        for r in metadata["resumes"]:
+            if r["id"] == resume_id:
+                resume = r
+                break
+
+        if not resume:
+            return False
+
+        # Delete file from disk
+        file_path = resume.get("file_path")
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
+
+        # Remove vectors from FAISS index — use stored session_id if available
+        effective_session = resume.get("session_id", session_id)
+        remove_resume_vectors(resume_id, user_id=effective_session)
+
+        # Remove from metadata
+        metadata["resumes"] = [r for r in metadata["resumes"] if r["id"] != resume_id]
+        _save_metadata(metadata)
+        return True
 
 
 def ingest_resume_bytes(content: bytes, original_filename: str, session_id: str = "default") -> dict:
@@ -11,6 +11,11 @@ Design decisions:
   - Merge step normalizes ALL LLM skills through SKILL_LOOKUP, and only keeps
     unknown skills if they pass a relevance filter (no vague compound phrases)
   - Graceful degradation: if LLM call fails, rule-based results still returned
+  - Parsed results are cached on disk, keyed by hash(JD text, parser version,
+    use_llm, skill vocabulary, LLM prompt + model) — shared by /api/match,
+    auto-match and watchlist, so a posting is parsed (and LLM-refined) once,
+    not once per refresh. Vocabulary/prompt edits change the key; entries age
+    out after JD_CACHE_TTL_SECONDS; failed LLM parses are never cached
 """
 
 import os
@@ -26,7 +31,9 @@ from services.structured_extractor import (
     _SKILL_LOOKUP,
     _DOMAIN_SIGNALS,
     _TITLE_KEYWORDS,
+    _extract_skills,
 )
+from services.cache_store import SqliteCache, make_key
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -87,21 +94,8 @@ def _split_jd_sections(text: str) -> Dict[str, str]:
 # ═══════════════════════════════════════════════════════════════════
 
 def _extract_skills_from_text(text: str) -> List[str]:
-    """Extract and normalize skills using SKILL_ALIASES vocabulary."""
-    found = set()
-    text_lower = text.lower()
-
-    for alias, canonical in _SKILL_LOOKUP.items():
-        if len(alias) <= 2:
-            pattern = r'(?<![a-zA-Z])' + re.escape(alias) + r'(?![a-zA-Z])'
-            if re.search(pattern, text, re.IGNORECASE):
-                found.add(canonical)
-        else:
-            pattern = r'\b' + re.escape(alias) + r'\b'
-            if re.search(pattern, text_lower):
-                found.add(canonical)
-
-    return sorted(found)
+    """Extract and normalize skills using SKILL_ALIASES vocabulary (shared compiled matcher)."""
+    return _extract_skills(text)
 
 
 def _extract_years_required(text: str) -> Optional[int]:
@@ -213,6 +207,8 @@ def _rule_based_parse(jd_text: str) -> Dict:
 # LAYER 2: LLM REFINEMENT (GPT-4o-mini)
 # ═══════════════════════════════════════════════════════════════════
 
+JD_LLM_MODEL = "gpt-4o-mini"
+
 _LLM_SYSTEM_PROMPT = """You are a job description parser that extracts SPECIFIC, CONCRETE technologies, tools, frameworks, and technical concepts.
 
 CRITICAL RULES:
@@ -283,38 +279,25 @@ async def _llm_parse(jd_text: str) -> Optional[Dict]:
         return None
 
     try:
-        import httpx
-
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": "gpt-4o-mini",
-                    "messages": [
-                        {"role": "system", "content": _LLM_SYSTEM_PROMPT},
-                        {"role": "user", "content": f"Parse this job description:\n\n{jd_text[:4000]}"},
-                    ],
-                    "temperature": 0.1,
-                    "max_tokens": 800,
-                },
-            )
-
-            if response.status_code != 200:
-                print(f"[jd_parser] LLM API error: {response.status_code}")
-                return None
-
-            data = response.json()
-            content = data["choices"][0]["message"]["content"].strip()
-
-            content = re.sub(r'^```(?:json)?\s*', '', content)
-            content = re.sub(r'\s*```$', '', content)
-
-            parsed = json.loads(content)
-            return parsed
+        from services.llm_client import chat_completion
+
+        content = await chat_completion(
+            [
+                {"role": "system", "content": _LLM_SYSTEM_PROMPT},
+                {"role": "user", "content": f"Parse this job description:\n\n{jd_text[:4000]}"},
+            ],
+            model=JD_LLM_MODEL,
+            temperature=0.1,
+            max_tokens=800,
+            timeout=15.0,
+            caller="jd_parser",
+        )
+
+        content = re.sub(r'^```(?:json)?\s*', '', content)
+        content = re.sub(r'\s*```$', '', content)
+
+        parsed = json.loads(content)
+        return parsed
 
     except Exception as e:
         print(f"[jd_parser] LLM parsing failed: {e}")
@@ -437,6 +420,32 @@ def _merge_results(rule_based: Dict, llm_result: Optional[Dict]) -> Dict:
     }
 
 
+# ═══════════════════════════════════════════════════════════════════
+# PARSED-JD CACHE
+# ═══════════════════════════════════════════════════════════════════
+
+JD_PARSER_VERSION = 1                    # Bump when parsing/merge logic changes
+JD_CACHE_TTL_SECONDS = 14 * 24 * 3600   # Postings rarely live longer; re-parse after that
+JD_CACHE_MAX_ENTRIES = 50_000
+
+_jd_cache = SqliteCache("parsed_jd", max_entries=JD_CACHE_MAX_ENTRIES, ttl_seconds=JD_CACHE_TTL_SECONDS)
+
+# Everything besides the text that shapes a parse — any edit here is a new key
+_VOCABULARY_HASH = make_key(json.dumps([SKILL_ALIASES, _DOMAIN_SIGNALS, _TITLE_KEYWORDS], sort_keys=True, default=str))
+_PROMPT_HASH = make_key(JD_LLM_MODEL, _LLM_SYSTEM_PROMPT)
+
+
+def _jd_cache_key(jd_text: str, use_llm: bool) -> str:
+    return make_key(
+        JD_PARSER_VERSION, use_llm, _VOCABULARY_HASH, _PROMPT_HASH if use_llm else "", jd_text,
+    )
+
+
+def get_jd_cache_stats() -> Dict:
+    """Hit/miss counters for the parsed-JD cache."""
+    return _jd_cache.stats()
+
+
 # ═══════════════════════════════════════════════════════════════════
 # PUBLIC API
 # ═══════════════════════════════════════════════════════════════════
@@ -456,6 +465,13 @@ async def parse_jd(jd_text: str, use_llm: bool = True) -> Dict:
             "sections_detected": [],
         }
 
+    cache_key = _jd_cache_key(jd_text, use_llm)
+    cached = _jd_cache.get_json(cache_key)
+    if cached is not None:
+        print(f"[jd_parser] Cache hit: {len(cached['required_skills'])} required skills, "
+              f"method={cached['extraction_method']}")
+        return cached
+
     # Layer 1: Rule-based (always runs)
     rule_based = _rule_based_parse(jd_text)
 
@@ -471,6 +487,10 @@ async def parse_jd(jd_text: str, use_llm: bool = True) -> Dict:
           f"{len(result['preferred_skills'])} preferred skills, "
           f"min_years={result['min_years']}, method={result['extraction_method']}")
 
+    # Cache — unless the LLM layer was wanted but failed (retry it next time)
+    if not use_llm or llm_result is not None:
+        _jd_cache.set_json(cache_key, result)
+
     return result
 
 
@@ -487,8 +507,15 @@ def parse_jd_sync(jd_text: str) -> Dict:
             "sections_detected": [],
         }
 
+    cache_key = _jd_cache_key(jd_text, use_llm=False)
+    cached = _jd_cache.get_json(cache_key)
+    if cached is not None:
+        return cached
+
     rule_based = _rule_based_parse(jd_text)
-    return {
+    result = {
         **rule_based,
         "extraction_method": "rule_based",
-    }
\ No newline at end of file
+    }
+    _jd_cache.set_json(cache_key, result)
+    return result
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+services/job_enricher.py — Parse-on-ingest stage for the job pools.
+
+Runs once at fetch time (auto_match pool refresh, watchlist fetch) so the
+scoring path only scores. Each job gains:
+  - parsed_jd        — rule-based jd_parser output (same as Phase 1's use_llm=False)
+  - semantic_query   — matcher._build_semantic_query(parsed_jd, description)
+  - content_hash     — hash of title + description_text
+  - features_version — parser/vocabulary/model fingerprint the features came from
+
+The query embedding does NOT go into the JSON pool (384 floats per job would
+triple its size); it lives in a sidecar .npz next to the pool (job_id → row),
+read back with load_job_vectors().
+
+Incremental:
+  A job whose content_hash and features_version match the previous pool (and
+  whose vector is in the previous sidecar) is carried over untouched — only
+  new or edited postings are parsed and embedded. A parser, vocabulary or
+  embedding model change alters features_version, which re-enriches everything.
+
+Batched + parallel:
+  - Rule-based parses run off the event loop in one worker thread (they hit
+    the parsed-JD cache first); with ENRICH_USE_LLM the parses fan out
+    concurrently under ENRICH_PARSE_CONCURRENCY
+  - All semantic queries are embedded in one embed_texts() call (length-
+    bucketed batches, embedding cache in front of the model)
+"""
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.cache_store import make_key
+
+logger = logging.getLogger(__name__)
+
+# ── Tunables ─────────────────────────────────────────────────────────
+ENRICH_USE_LLM            = os.getenv("ENRICH_USE_LLM", "0") == "1"   # Phase 1 scores with use_llm=False
+ENRICH_PARSE_CONCURRENCY  = 8     # Parallel LLM parses when ENRICH_USE_LLM is on
+
+ENRICHED_FIELDS = ("parsed_jd", "semantic_query", "content_hash", "features_version", "enriched_at")
+
+
+def vectors_path_for(pool_path) -> str:
+    """Sidecar path holding the query embeddings for a pool JSON file."""
+    root, _ = os.path.splitext(str(pool_path))
+    return f"{root}.vectors.npz"
+
+
+def job_content_hash(job: Dict) -> str:
+    """Hash of everything in a job that feeds its features."""
+    return make_key(job.get("title", ""), job.get("description_text", ""))[:16]
+
+
+def features_version() -> str:
+    """Fingerprint of the parser, skill vocabulary and embedding model in use."""
+    from services.jd_parser import JD_PARSER_VERSION, _VOCABULARY_HASH, _PROMPT_HASH
+    from services.embedder import MODEL_NAME, EMBED_BACKEND
+    return make_key(
+        JD_PARSER_VERSION, _VOCABULARY_HASH, _PROMPT_HASH if ENRICH_USE_LLM else "",
+        MODEL_NAME, EMBED_BACKEND,
+    )[:16]
+
+
+# ── Sidecar vectors ───────────────────────────────────────────────────
+def load_job_vectors(path) -> Dict[str, np.ndarray]:
+    """job_id → float32 query embedding. Empty dict if the sidecar is missing/unreadable."""
+    try:
+        with np.load(str(path), allow_pickle=False) as data:
+            ids = data["ids"].tolist()
+            vectors = data["vectors"].astype(np.float32, copy=False)
+    except (OSError, KeyError, ValueError):
+        return {}
+    return {job_id: vectors[row] for row, job_id in enumerate(ids)}
+
+
+def _save_job_vectors(path, vectors: Dict[str, np.ndarray]):
+    """Atomic write (tmp + os.replace) so readers never see a half-written sidecar."""
+    path = str(path)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    ids = list(vectors)
+    matrix = (
+        np.vstack([vectors[job_id] for job_id in ids]).astype(np.float32)
+        if ids else np.zeros((0, 0), dtype=np.float32)
+    )
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, ids=np.array(ids, dtype=str), vectors=matrix)
+    os.replace(tmp_path, path)
+
+
+# ── Parsing ───────────────────────────────────────────────────────────
+def _parse_all_rule_based(texts: List[str]) -> List[Dict]:
+    from services.jd_parser import parse_jd_sync
+    return [parse_jd_sync(text) for text in texts]
+
+
+async def _parse_all(texts: List[str]) -> List[Dict]:
+    if not ENRICH_USE_LLM:
+        return await asyncio.to_thread(_parse_all_rule_based, texts)
+
+    from services.jd_parser import parse_jd
+    semaphore = asyncio.Semaphore(ENRICH_PARSE_CONCURRENCY)
+
+    async def _parse_one(text: str) -> Dict:
+        async with semaphore:
+            return await parse_jd(text, use_llm=True)
+
+    return await asyncio.gather(*[_parse_one(text) for text in texts])
+
+
+# ── Public API ────────────────────────────────────────────────────────
+async def enrich_jobs(
+    jobs: List[Dict],
+    previous_jobs: Optional[List[Dict]] = None,
+    vectors_path: Optional[str] = None,
+) -> Dict:
+    """
+    Attach parsed_jd / semantic_query / content_hash to every job (in place)
+    and write the query embeddings to vectors_path.
+
+    Args:
+        jobs:          freshly fetched pool (mutated in place)
+        previous_jobs: the pool this one replaces — unchanged jobs reuse its features
+        vectors_path:  sidecar to read previous vectors from and write the new set to
+
+    Returns:
+        stats dict: total, reused, enriched, skipped, elapsed_ms
+    """
+    from services.matcher import _build_semantic_query
+    from services.embedder import embed_texts
+
+    start = time.time()
+    version = features_version()
+    previous_by_id = {j["job_id"]: j for j in previous_jobs or [] if j.get("content_hash")}
+    previous_vectors = load_job_vectors(vectors_path) if vectors_path else {}
+
+    vectors: Dict[str, np.ndarray] = {}
+    todo: List[Dict] = []
+    skipped = 0
+    for job in jobs:
+        if not (job.get("description_text") or "").strip():
+            skipped += 1
+            continue
+        content_hash = job_content_hash(job)
+        previous = previous_by_id.get(job["job_id"])
+        if (
+            previous
+            and previous.get("content_hash") == content_hash
+            and previous.get("features_version") == version
+            and job["job_id"] in previous_vectors
+        ):
+            for field in ENRICHED_FIELDS:
+                job[field] = previous.get(field)
+            vectors[job["job_id"]] = previous_vectors[job["job_id"]]
+            continue
+        job["content_hash"] = content_hash
+        todo.append(job)
+
+    if todo:
+        texts = [job["description_text"] for job in todo]
+        parsed = await _parse_all(texts)
+        queries = [_build_semantic_query(p, text) for p, text in zip(parsed, texts)]
+        embeddings = await asyncio.to_thread(embed_texts, queries)
+
+        enriched_at = datetime.now(timezone.utc).isoformat()
+        for job, parsed_jd, query, embedding in zip(todo, parsed, queries, embeddings):
+            job["parsed_jd"] = parsed_jd
+            job["semantic_query"] = query
+            job["features_version"] = version
+            job["enriched_at"] = enriched_at
+            vectors[job["job_id"]] = embedding
+
+    if vectors_path:
+        _save_job_vectors(vectors_path, vectors)
+
+    stats = {
+        "total": len(jobs),
+        "reused": len(vectors) - len(todo),
+        "enriched": len(todo),
+        "skipped": skipped,
+        "elapsed_ms": round((time.time() - start) * 1000),
+    }
+    logger.info(
+        f"[Enricher] {stats['enriched']} jobs enriched, {stats['reused']} unchanged, "
+        f"{stats['skipped']} without description in {stats['elapsed_ms']}ms"
+    )
+    return stats
@@ -15,6 +15,8 @@ import hashlib
 from datetime import datetime, timezone
 from typing import Optional
 
+from services.http_clients import get_async_client
+
 logger = logging.getLogger(__name__)
 
 # ── Timeout & limits ────────────────────────────────────────────────
@@ -78,10 +80,9 @@ async def fetch_greenhouse(board_token: str) -> list[dict]:
     logger.info(f"[Greenhouse] Fetching jobs from: {board_token}")
 
     try:
-        async with httpx.AsyncClient(timeout=FETCH_TIMEOUT) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await get_async_client().get(url, timeout=FETCH_TIMEOUT)
+        resp.raise_for_status()
+        data = resp.json()
 
         jobs_raw = data.get("jobs", [])[:MAX_JOBS_PER_SOURCE]
         jobs = []
@@ -132,10 +133,9 @@ async def fetch_lever(company: str) -> list[dict]:
     logger.info(f"[Lever] Fetching jobs from: {company}")
 
     try:
-        async with httpx.AsyncClient(timeout=FETCH_TIMEOUT) as client:
-            resp = await client.get(url)
-            resp.raise_for_status()
-            jobs_raw = resp.json()
+        resp = await get_async_client().get(url, timeout=FETCH_TIMEOUT)
+        resp.raise_for_status()
+        jobs_raw = resp.json()
 
         if not isinstance(jobs_raw, list):
             logger.warning(f"[Lever] {company}: unexpected response format")
@@ -202,10 +202,9 @@ async def fetch_remotive(category: str = "", search: str = "", limit: int = 50)
     logger.info(f"[Remotive] Fetching jobs (category={category}, search={search})")
 
     try:
-        async with httpx.AsyncClient(timeout=FETCH_TIMEOUT) as client:
-            resp = await client.get(url, params=params)
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await get_async_client().get(url, params=params, timeout=FETCH_TIMEOUT)
+        resp.raise_for_status()
+        data = resp.json()
 
         jobs_raw = data.get("jobs", [])[:MAX_JOBS_PER_SOURCE]
         jobs = []
@@ -0,0 +1,194 @@
+"""
+services/job_index.py — Job-side vector index for reverse retrieval (resume → jobs).
+
+Phase 1 used to run the full match pipeline once per job and, to bound that,
+only looked at the PHASE1_JOB_CAP most recent jobs. With every pool job
+already embedded at fetch time (job_enricher), the direction can flip:
+
+  1. Index the pool's semantic-query vectors (sidecar .npz) in FAISS
+  2. Query with each resume's chunk vectors from faiss_store
+  3. A job's score for a resume = best cosine over that resume's chunks
+     (JOB_INDEX_QUERY="centroid" uses one mean vector per resume instead)
+  4. Keep each resume's top-N jobs; the union is what goes through hybrid
+     scoring — one search per resume instead of one pipeline run per job
+
+Index choice:
+  - Exact inner product (IndexFlatIP) up to JOB_INDEX_HNSW_MIN jobs — the
+    whole ~80-board pool is a few thousand vectors, a brute-force scan is
+    milliseconds and has perfect recall
+  - HNSW above that
+  Eligibility (role/location filter, seen, archived) is applied with a FAISS
+  IDSelector, so one index per pool file serves every filter combination.
+  The built index is cached in-process and rebuilt when the sidecar changes.
+"""
+
+import logging
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from services.job_enricher import load_job_vectors
+
+logger = logging.getLogger(__name__)
+
+# ── Tunables ─────────────────────────────────────────────────────────
+JOB_INDEX_TOP_N          = 40      # Candidate jobs kept per resume
+JOB_INDEX_MIN_SIMILARITY = 0.20    # Below this cosine a job is never a candidate
+JOB_INDEX_QUERY          = "chunks"  # "chunks" (max over chunk vectors) or "centroid"
+JOB_INDEX_HNSW_MIN       = 50_000  # Switch from exact scan to HNSW at this pool size
+JOB_INDEX_HNSW_M         = 32
+JOB_INDEX_HNSW_EF_SEARCH = 128
+
+_cache: Dict[str, Dict] = {}       # vectors_path → {"signature", "index", "job_ids"}
+_cache_lock = threading.Lock()
+
+
+# ── Index build / cache ──────────────────────────────────────────────
+def _signature(path: str) -> Optional[Tuple[float, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime, stat.st_size)
+
+
+def _build(vectors: Dict[str, np.ndarray]) -> Tuple[faiss.Index, List[str]]:
+    job_ids = list(vectors)
+    matrix = np.ascontiguousarray(np.vstack([vectors[j] for j in job_ids]), dtype=np.float32)
+    faiss.normalize_L2(matrix)
+    if len(job_ids) >= JOB_INDEX_HNSW_MIN:
+        index = faiss.IndexHNSWFlat(matrix.shape[1], JOB_INDEX_HNSW_M, faiss.METRIC_INNER_PRODUCT)
+    else:
+        index = faiss.IndexFlatIP(matrix.shape[1])
+    index.add(matrix)
+    return index, job_ids
+
+
+def _load(vectors_path: str) -> Optional[Dict]:
+    """Cached (index, job_ids) for a pool sidecar; None if it has no vectors."""
+    vectors_path = str(vectors_path)
+    signature = _signature(vectors_path)
+    if signature is None:
+        return None
+    with _cache_lock:
+        entry = _cache.get(vectors_path)
+        if entry is not None and entry["signature"] == signature:
+            return entry
+        vectors = load_job_vectors(vectors_path)
+        if not vectors:
+            _cache.pop(vectors_path, None)
+            return None
+        index, job_ids = _build(vectors)
+        entry = {"signature": signature, "index": index, "job_ids": job_ids}
+        _cache[vectors_path] = entry
+        logger.info(f"[JobIndex] Built {type(index).__name__} over {len(job_ids)} jobs")
+        return entry
+
+
+def _search_params(index: faiss.Index, selector: faiss.IDSelector, k: int):
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=max(JOB_INDEX_HNSW_EF_SEARCH, 2 * k))
+    return faiss.SearchParameters(sel=selector)
+
+
+# ── Public API ────────────────────────────────────────────────────────
+def candidate_jobs_by_resume(
+    vectors_path: str,
+    resume_vectors: Dict[str, np.ndarray],
+    job_ids: Optional[Iterable[str]] = None,
+    top_n: int = JOB_INDEX_TOP_N,
+    min_similarity: float = JOB_INDEX_MIN_SIMILARITY,
+) -> Optional[Dict[str, List[Tuple[str, float]]]]:
+    """
+    Top-N jobs per resume from the pool index.
+
+    Args:
+        vectors_path:   job_enricher sidecar of the pool
+        resume_vectors: resume_id → (n_chunks, 384) vectors (faiss_store.get_resume_vectors)
+        job_ids:        restrict to these jobs (None = whole pool)
+        top_n:          jobs kept per resume
+        min_similarity: cosine floor
+
+    Returns:
+        resume_id → [(job_id, similarity), ...] best first, or None when the
+        pool has no vectors yet (caller falls back to its old selection).
+    """
+    entry = _load(vectors_path)
+    if entry is None:
+        return None
+
+    index, pool_ids = entry["index"], entry["job_ids"]
+    if job_ids is None:
+        selector = None
+        eligible = len(pool_ids)
+    else:
+        wanted = set(job_ids)
+        positions = np.array([i for i, j in enumerate(pool_ids) if j in wanted], dtype=np.int64)
+        if len(positions) == 0:
+            return {resume_id: [] for resume_id in resume_vectors}
+        selector = faiss.IDSelectorBatch(positions)
+        eligible = len(positions)
+
+    k = min(top_n, eligible)
+    candidates: Dict[str, List[Tuple[str, float]]] = {}
+    for resume_id, chunk_vectors in resume_vectors.items():
+        queries = np.asarray(chunk_vectors, dtype=np.float32).reshape(-1, index.d)
+        if JOB_INDEX_QUERY == "centroid":
+            queries = queries.mean(axis=0, keepdims=True)
+        queries = np.ascontiguousarray(queries)
+        faiss.normalize_L2(queries)
+
+        params = _search_params(index, selector, k) if selector is not None else None
+        sims, rows = index.search(queries, k, params=params)
+
+        # Best similarity per job across this resume's query vectors
+        best: Dict[int, float] = {}
+        for row, sim in zip(rows.ravel(), sims.ravel()):
+            if row >= 0 and sim >= min_similarity and sim > best.get(row, -1.0):
+                best[int(row)] = float(sim)
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)[:top_n]
+        candidates[resume_id] = [(pool_ids[row], round(sim, 4)) for row, sim in ranked]
+
+    return candidates
+
+
+def select_candidate_jobs(
+    jobs: List[Dict],
+    vectors_path: str,
+    user_id: str = "default",
+    top_n: int = JOB_INDEX_TOP_N,
+) -> Optional[List[Dict]]:
+    """
+    The subset of `jobs` that is in some resume's top-N, each annotated with
+    retrieval_score (best similarity over resumes). None if the pool has no
+    vectors or the user has no indexed resumes — callers keep their fallback.
+    """
+    from services.faiss_store import get_resume_vectors
+
+    resume_vectors = get_resume_vectors(user_id)
+    if not resume_vectors:
+        return None
+
+    candidates = candidate_jobs_by_resume(
+        vectors_path, resume_vectors, job_ids=[j["job_id"] for j in jobs], top_n=top_n,
+    )
+    if candidates is None:
+        return None
+
+    retrieval_score: Dict[str, float] = {}
+    for ranked in candidates.values():
+        for job_id, sim in ranked:
+            retrieval_score[job_id] = max(sim, retrieval_score.get(job_id, -1.0))
+
+    selected = []
+    for job in jobs:
+        if job["job_id"] in retrieval_score:
+            selected.append({**job, "retrieval_score": retrieval_score[job["job_id"]]})
+    logger.info(
+        f"[JobIndex] {len(selected)} candidate jobs from {len(jobs)} eligible "
+        f"({len(resume_vectors)} resumes × top {top_n})"
+    )
+    return selected
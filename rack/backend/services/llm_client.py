@@ -0,0 +1,523 @@
+"""
+services/llm_client.py — Shared, rate-limited client for every OpenAI chat call.
+
+Callers: jd_parser (LLM parse layer), llm_scorer (Phase 2), hybrid_scorer
+(Pass 3 skill match), gap_analyzer (gap advice), structured_extractor
+(resume LLM extraction). They used to POST independently — llm_scorer behind
+a fixed Semaphore(8), the rest unlimited — and treated any non-200 as
+"fall back", so a burst of 429s silently downgraded results.
+
+Layers, applied to every request (async and sync paths share all state):
+  1. Token buckets — requests/min (LLM_RPM_LIMIT) and tokens/min
+     (LLM_TPM_LIMIT), split evenly across WEB_CONCURRENCY processes. Callers
+     reserve up front (prompt chars / 4 + max_tokens) and sleep off any
+     debt; a reservation the deadline can't wait out is refunded. The
+     estimate is corrected with the response's usage.total_tokens
+  2. AIMD concurrency — in-flight limit grows by ~1 per window of fast
+     successes while saturated, halves on a 429 (at most once per
+     LLM_DECREASE_COOLDOWN_S) and shrinks gently when latency exceeds
+     LLM_LATENCY_TARGET_S
+  3. Retry-After — a 429/503 with Retry-After / retry-after-ms pauses ALL
+     callers until then, not just the one that got it
+  4. Retries — 408/409/429/5xx and transport errors are retried with full
+     jitter backoff while the per-request deadline allows; each attempt's
+     timeout is capped by the time left
+
+Failures surface as LLMRequestError; callers keep their existing
+catch-and-degrade behaviour.
+"""
+
+import asyncio
+import collections
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from services.http_clients import get_async_client, get_sync_client
+
+logger = logging.getLogger(__name__)
+
+# ═══════════════════════════════════════════════════════════════════
+# CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════
+
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+DEFAULT_MODEL = "gpt-4o-mini"
+
+# The account-tier limits are shared by every server process, but each process
+# keeps its own buckets and AIMD state — so each gets an equal share.
+# gunicorn.conf.py exports WEB_CONCURRENCY (its worker count) for this.
+LLM_WORKER_PROCESSES = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+LLM_RPM_LIMIT = max(1, int(os.getenv("LLM_RPM_LIMIT", "500")) // LLM_WORKER_PROCESSES)      # Requests/min, this process's share
+LLM_TPM_LIMIT = max(1, int(os.getenv("LLM_TPM_LIMIT", "200000")) // LLM_WORKER_PROCESSES)   # Tokens/min, this process's share
+LLM_INITIAL_CONCURRENCY = 8        # Starting in-flight limit (the old llm_scorer semaphore)
+LLM_MIN_CONCURRENCY = 1
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "32"))
+LLM_LATENCY_TARGET_S = 10.0        # Successes slower than this count as congestion
+LLM_DECREASE_COOLDOWN_S = 2.0      # One multiplicative decrease per burst of 429s
+LLM_DEFAULT_DEADLINE_S = 60.0      # Total time budget per request, retries included
+LLM_BACKOFF_BASE_S = 0.5
+LLM_BACKOFF_MAX_S = 20.0
+CHARS_PER_TOKEN = 4                # Prompt token estimate for the TPM bucket
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class LLMRequestError(Exception):
+    """An LLM request that failed for good (non-retryable status, or deadline spent)."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+# ═══════════════════════════════════════════════════════════════════
+# TOKEN BUCKETS
+# ═══════════════════════════════════════════════════════════════════
+
+class _TokenBucket:
+    """
+    Per-minute bucket that goes into debt: reserve() always succeeds and
+    returns how long the caller must wait, so waiters are served in order.
+    """
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.level = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float, now: float) -> float:
+        self._refill(now)
+        self.level -= amount
+        return max(0.0, -self.level / self.rate)
+
+    def adjust(self, delta: float, now: float):
+        """Correct a reservation once the real cost is known (+delta = refund)."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level + delta)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# ADAPTIVE CONCURRENCY (AIMD)
+# ═══════════════════════════════════════════════════════════════════
+
+class _AdaptiveConcurrency:
+    """
+    In-flight limiter usable from the event loop and from worker threads at
+    once. Waiters queue FIFO; release() or a limit increase wakes as many as
+    there are free slots.
+    """
+
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self._lock = threading.Lock()
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.in_flight = 0
+        self._last_decrease = 0.0
+        self._waiters: collections.deque = collections.deque()
+
+    # ── Acquire / release ───────────────────────────────────────────
+
+    def _try_acquire_locked(self) -> bool:
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    def _wake_locked(self):
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if isinstance(waiter, threading.Event):
+                waiter.set()
+            else:
+                loop, future = waiter
+                loop.call_soon_threadsafe(_resolve, future)
+            free -= 1
+
+    async def acquire(self, deadline_at: float) -> bool:
+        """Event-loop acquire; False if deadline_at (monotonic) passes first."""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                if self._try_acquire_locked():
+                    return True
+                future = loop.create_future()
+                waiter = (loop, future)
+                self._waiters.append(waiter)
+            try:
+                done, _ = await asyncio.wait({future}, timeout=max(0.0, deadline_at - time.monotonic()))
+            except asyncio.CancelledError:
+                self._abandon(waiter)
+                raise
+            if not done:
+                self._abandon(waiter)
+                return False
+
+    def _abandon(self, waiter):
+        """Drop a waiter that stopped waiting; if it was already woken, hand the slot on."""
+        with self._lock:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            else:
+                self._wake_locked()
+
+    def acquire_sync(self, deadline_at: float) -> bool:
+        """Blocking acquire for worker threads; False if deadline_at (monotonic) passes first."""
+        while True:
+            with self._lock:
+                if self._try_acquire_locked():
+                    return True
+                event = threading.Event()
+                self._waiters.append(event)
+            if not event.wait(max(0.0, deadline_at - time.monotonic())):
+                self._abandon(event)
+                return False
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+            self._wake_locked()
+
+    # ── AIMD ────────────────────────────────────────────────────────
+
+    def on_success(self, latency: float):
+        with self._lock:
+            if latency > LLM_LATENCY_TARGET_S:
+                self.limit = max(self.minimum, self.limit * 0.9)
+            elif self.in_flight >= int(self.limit):
+                # Grow only while the limit is what's holding callers back
+                self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+            self._wake_locked()
+
+    def on_throttle(self, now: float):
+        with self._lock:
+            if now - self._last_decrease >= LLM_DECREASE_COOLDOWN_S:
+                self.limit = max(self.minimum, self.limit / 2)
+                self._last_decrease = now
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _resolve(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SHARED STATE
+# ═══════════════════════════════════════════════════════════════════
+
+_state_lock = threading.Lock()
+_rpm_bucket = _TokenBucket(LLM_RPM_LIMIT)
+_tpm_bucket = _TokenBucket(LLM_TPM_LIMIT)
+_concurrency = _AdaptiveConcurrency(LLM_INITIAL_CONCURRENCY, LLM_MIN_CONCURRENCY, LLM_MAX_CONCURRENCY)
+_paused_until = 0.0     # monotonic time before which no request is sent (Retry-After)
+_metrics = {
+    "requests": 0, "succeeded": 0, "failed": 0, "retries": 0,
+    "throttled": 0, "server_errors": 0, "transport_errors": 0,
+    "tokens_used": 0, "rate_wait_s": 0.0,
+}
+
+
+def _estimate_tokens(messages: List[Dict], max_tokens: int) -> int:
+    chars = sum(len(m.get("content") or "") for m in messages)
+    return chars // CHARS_PER_TOKEN + max_tokens
+
+
+def _reserve(estimated_tokens: int, deadline_at: float) -> Optional[float]:
+    """
+    Take one request + estimated tokens from the buckets; returns seconds to
+    wait, or None (reservation refunded) if the wait would outlast deadline_at.
+    """
+    now = time.monotonic()
+    with _state_lock:
+        wait = max(
+            _rpm_bucket.reserve(1, now),
+            _tpm_bucket.reserve(estimated_tokens, now),
+            _paused_until - now,
+            0.0,
+        )
+        if now + wait >= deadline_at:
+            _rpm_bucket.adjust(1, now)
+            _tpm_bucket.adjust(estimated_tokens, now)
+            return None
+        _metrics["rate_wait_s"] += wait
+    return wait
+
+
+def _retry_after_seconds(response: httpx.Response) -> Optional[float]:
+    """Retry-After (seconds or HTTP date) or OpenAI's retry-after-ms, if present."""
+    value = response.headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+    value = response.headers.get("retry-after")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            from email.utils import parsedate_to_datetime
+            try:
+                return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def _backoff(attempt: int) -> float:
+    """Full jitter exponential backoff."""
+    return random.uniform(0, min(LLM_BACKOFF_MAX_S, LLM_BACKOFF_BASE_S * 2 ** attempt))
+
+
+def _handle_response(response: httpx.Response, latency: float, estimated_tokens: int):
+    """
+    Returns ("ok", content) | ("retry", delay_or_None) | ("fail", LLMRequestError),
+    updating limiter state and metrics.
+    """
+    global _paused_until
+    now = time.monotonic()
+    status = response.status_code
+
+    if status == 200:
+        try:
+            data = response.json()
+            content = data["choices"][0]["message"]["content"]
+            if not isinstance(content, str):
+                raise TypeError(f"content is {type(content).__name__}")
+            content = content.strip()
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            return "fail", LLMRequestError(f"malformed response: {e}", status)
+        used = (data.get("usage") or {}).get("total_tokens")
+        with _state_lock:
+            if used:
+                _tpm_bucket.adjust(estimated_tokens - used, now)
+                _metrics["tokens_used"] += used
+            _metrics["succeeded"] += 1
+        _concurrency.on_success(latency)
+        return "ok", content
+
+    retry_after = _retry_after_seconds(response)
+    if status == 429:
+        _concurrency.on_throttle(now)
+        with _state_lock:
+            _metrics["throttled"] += 1
+            if retry_after:
+                _paused_until = max(_paused_until, now + retry_after)
+    elif status >= 500:
+        with _state_lock:
+            _metrics["server_errors"] += 1
+            if retry_after:
+                _paused_until = max(_paused_until, now + retry_after)
+
+    if status in RETRYABLE_STATUS:
+        return "retry", retry_after
+    return "fail", LLMRequestError(f"API {status}: {response.text[:200]}", status)
+
+
+def _request_body(messages, model, temperature, max_tokens, extra) -> Dict:
+    body = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+    }
+    body.update(extra or {})
+    return body
+
+
+def _headers() -> Dict:
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise LLMRequestError("No OPENAI_API_KEY")
+    return {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+
+
+def _next_delay(attempt: int, retry_after: Optional[float], deadline_at: float, caller: str, reason: str):
+    """Delay before the next attempt, or None if the deadline doesn't allow one."""
+    delay = retry_after + random.uniform(0, LLM_BACKOFF_BASE_S) if retry_after else _backoff(attempt)
+    if time.monotonic() + delay >= deadline_at:
+        return None
+    with _state_lock:
+        _metrics["retries"] += 1
+    logger.info(f"[LLMClient] {caller}: {reason} — retry {attempt + 1} in {delay:.1f}s")
+    return delay
+
+
+def _give_up(caller: str, error: Exception) -> LLMRequestError:
+    with _state_lock:
+        _metrics["failed"] += 1
+    logger.warning(f"[LLMClient] {caller}: giving up — {error}")
+    if isinstance(error, LLMRequestError):
+        return error
+    return LLMRequestError(str(error))
+
+
+# ═══════════════════════════════════════════════════════════════════
+# PUBLIC API
+# ═══════════════════════════════════════════════════════════════════
+
+async def chat_completion(
+    messages: List[Dict],
+    model: str = DEFAULT_MODEL,
+    temperature: float = 0.1,
+    max_tokens: int = 500,
+    timeout: float = 20.0,
+    deadline: float = LLM_DEFAULT_DEADLINE_S,
+    client: Optional[httpx.AsyncClient] = None,
+    caller: str = "llm",
+    extra: Optional[Dict] = None,
+) -> str:
+    """
+    Rate-limited, retried chat completion. Returns the message content.
+
+    Args:
+        timeout:  per-attempt timeout (capped by the time left)
+        deadline: total budget in seconds, including waits and retries
+        client:   httpx.AsyncClient to use; the shared pooled one by default
+        caller:   tag for logs
+
+    Raises:
+        LLMRequestError when the request fails for good.
+    """
+    headers = _headers()
+    body = _request_body(messages, model, temperature, max_tokens, extra)
+    estimated = _estimate_tokens(messages, max_tokens)
+    deadline_at = time.monotonic() + deadline
+
+    client = client or get_async_client()
+    attempt = 0
+    while True:
+        wait = _reserve(estimated, deadline_at)
+        if wait is None:
+            raise _give_up(caller, LLMRequestError("deadline exceeded waiting for rate limit"))
+        if wait:
+            await asyncio.sleep(wait)
+
+        if not await _concurrency.acquire(deadline_at):
+            raise _give_up(caller, LLMRequestError("deadline exceeded waiting for a concurrency slot"))
+        started = time.monotonic()
+        try:
+            with _state_lock:
+                _metrics["requests"] += 1
+            response = await client.post(
+                OPENAI_CHAT_URL, headers=headers, json=body,
+                timeout=max(1.0, min(timeout, deadline_at - started)),
+            )
+            outcome, value = _handle_response(response, time.monotonic() - started, estimated)
+            reason = f"API {response.status_code}"
+        except httpx.TransportError as e:
+            with _state_lock:
+                _metrics["transport_errors"] += 1
+            outcome, value, reason = "retry", None, f"{type(e).__name__}"
+        finally:
+            _concurrency.release()
+
+        if outcome == "ok":
+            return value
+        if outcome == "fail":
+            raise _give_up(caller, value)
+        delay = _next_delay(attempt, value, deadline_at, caller, reason)
+        if delay is None:
+            raise _give_up(caller, LLMRequestError(f"{reason}, deadline exceeded"))
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def chat_completion_sync(
+    messages: List[Dict],
+    model: str = DEFAULT_MODEL,
+    temperature: float = 0.1,
+    max_tokens: int = 500,
+    timeout: float = 20.0,
+    deadline: float = LLM_DEFAULT_DEADLINE_S,
+    client: Optional[httpx.Client] = None,
+    caller: str = "llm",
+    extra: Optional[Dict] = None,
+) -> str:
+    """
+    Blocking chat_completion() for sync call sites — same limiter, same retries.
+
+    Must run in a worker thread (asyncio.to_thread / run_in_threadpool). On an
+    event-loop thread it raises LLMRequestError right away instead of waiting:
+    the slot it would wait for can only be released by that same loop.
+    """
+    if _on_event_loop():
+        raise _give_up(caller, LLMRequestError("chat_completion_sync called on the event loop thread"))
+    headers = _headers()
+    body = _request_body(messages, model, temperature, max_tokens, extra)
+    estimated = _estimate_tokens(messages, max_tokens)
+    deadline_at = time.monotonic() + deadline
+
+    client = client or get_sync_client()
+    attempt = 0
+    while True:
+        wait = _reserve(estimated, deadline_at)
+        if wait is None:
+            raise _give_up(caller, LLMRequestError("deadline exceeded waiting for rate limit"))
+        if wait:
+            time.sleep(wait)
+
+        if not _concurrency.acquire_sync(deadline_at):
+            raise _give_up(caller, LLMRequestError("deadline exceeded waiting for a concurrency slot"))
+        started = time.monotonic()
+        try:
+            with _state_lock:
+                _metrics["requests"] += 1
+            response = client.post(
+                OPENAI_CHAT_URL, headers=headers, json=body,
+                timeout=max(1.0, min(timeout, deadline_at - started)),
+            )
+            outcome, value = _handle_response(response, time.monotonic() - started, estimated)
+            reason = f"API {response.status_code}"
+        except httpx.TransportError as e:
+            with _state_lock:
+                _metrics["transport_errors"] += 1
+            outcome, value, reason = "retry", None, f"{type(e).__name__}"
+        finally:
+            _concurrency.release()
+
+        if outcome == "ok":
+            return value
+        if outcome == "fail":
+            raise _give_up(caller, value)
+        delay = _next_delay(attempt, value, deadline_at, caller, reason)
+        if delay is None:
+            raise _give_up(caller, LLMRequestError(f"{reason}, deadline exceeded"))
+        time.sleep(delay)
+        attempt += 1
+
+
+def get_llm_client_stats() -> Dict:
+    """Limiter state and request counters."""
+    now = time.monotonic()
+    with _state_lock:
+        return {
+            **_metrics,
+            "rate_wait_s": round(_metrics["rate_wait_s"], 2),
+            "concurrency_limit": round(_concurrency.limit, 2),
+            "in_flight": _concurrency.in_flight,
+            "paused_for_s": round(max(0.0, _paused_until - now), 2),
+            "worker_processes": LLM_WORKER_PROCESSES,
+            "rpm_limit": LLM_RPM_LIMIT,
+            "tpm_limit": LLM_TPM_LIMIT,
+        }
@@ -6,12 +6,19 @@ Architecture:
   Phase 2 (this file): LLM holistic scorer → re-rank shortlist with full reasoning
 
 Design decisions:
-  - One LLM call per (job × resume) pair — NOT per skill
+  - Grouped mode (default): one LLM call per job scores all of its resumes
+    (split above LLM_GROUP_MAX_RESUMES), returning the same per-pair schema;
+    resumes missing or malformed in the reply fall back to one call per
+    (job × resume) pair — NOT per skill
   - Condensed context: signal-dense JD summary + resume summary (~1200 tokens per call)
   - Structured JSON response: score + 3 components + reasoning + recommendation
   - Hybrid score passed as context anchor to reduce LLM score hallucination
-  - Concurrent calls with semaphore (max 8 at a time) for speed
+  - Concurrent calls through llm_client (token buckets + adaptive concurrency,
+    429/5xx retries) — throughput tracks the provider limit
   - Graceful fallback: if LLM call fails, hybrid score is kept as-is
+  - Persistent score cache keyed by (model, prompt hash, JD summary, resume
+    summary, hybrid anchor) — repeat pairs across refreshes skip the LLM;
+    grouped and single-pair results share the same per-pair keys
 
 Output fields added to each match entry:
   llm_score          int 0-100   — primary display score
@@ -31,15 +38,23 @@ import os
 import re
 from typing import Dict, List, Optional, Tuple
 
-import httpx
+from services.cache_store import SqliteCache, make_key
+from services.llm_client import LLMRequestError, chat_completion
 
 logger = logging.getLogger(__name__)
 
 # ── Concurrency control ─────────────────────────────────────────────
-LLM_CONCURRENCY = 8       # max parallel LLM calls
-LLM_TIMEOUT     = 20.0    # seconds per call
+LLM_TIMEOUT     = 20.0    # seconds per attempt
+LLM_DEADLINE    = 60.0    # seconds per pair, retries included (parallelism: llm_client AIMD)
 LLM_MODEL       = "gpt-4o-mini"
 
+# ── Grouped mode — one request per job for all its resumes ─────────
+LLM_GROUPED_SCORING        = os.getenv("LLM_GROUPED_SCORING", "1") == "1"
+LLM_GROUP_MAX_RESUMES      = 6       # Resumes per request; larger groups are split
+LLM_GROUP_MAX_CHARS        = 12_000  # Resume summaries per request (~3k tokens)
+LLM_GROUP_TOKENS_PER_RESUME = 600    # max_tokens budget per resume in the response
+LLM_GROUP_TIMEOUT          = 45.0    # seconds per attempt (longer output than a pair)
+
 # ── Phase 2 threshold — only pairs above this go to LLM ────────────
 PHASE2_THRESHOLD = 75     # hybrid score % — keep in sync with auto_match.py
                           # At 45%: ~2500 pairs on first run (too many)
@@ -209,97 +224,280 @@ Return ONLY valid JSON (no markdown, no backticks):
 }"""
 
 
+def _build_user_message(job: Dict, resume: Dict, parsed_jd: Dict, hybrid_score: int) -> str:
+    """Per-pair user message — everything besides the system prompt the LLM sees."""
+    jd_summary = _build_jd_summary(job, parsed_jd)
+    resume_summary = _build_resume_summary(resume)
+
+    return f"""INITIAL HYBRID SCORE (keyword/semantic match): {hybrid_score}%
+Use this as a rough anchor — your holistic assessment may differ.
+
+JOB DESCRIPTION:
+{jd_summary}
+
+---
+
+CANDIDATE RESUME:
+{resume_summary}
+
+Score this match."""
+
+
+# ═══════════════════════════════════════════════════════════════════
+# SCORE CACHE — repeat (JD, resume) pairs skip the LLM
+# ═══════════════════════════════════════════════════════════════════
+
+LLM_CACHE_TTL_SECONDS = 30 * 24 * 3600   # Re-score after a month even if nothing changed
+LLM_CACHE_MAX_ENTRIES = 20_000
+
+_score_cache = SqliteCache("llm_scores", max_entries=LLM_CACHE_MAX_ENTRIES, ttl_seconds=LLM_CACHE_TTL_SECONDS)
+
+_PROMPT_HASH = make_key(_SCORER_SYSTEM_PROMPT)
+
+
+def _scoring_mode() -> str:
+    """Cache namespace for the scoring mode; grouped scores also depend on the group prompt."""
+    return f"grouped:{_GROUP_PROMPT_HASH}" if LLM_GROUPED_SCORING else "single"
+
+
+def _score_cache_key(pair: Dict) -> str:
+    """
+    Key = model + system prompt hash + scoring mode (grouped includes its
+    prompt hash) + the exact user message, i.e. the condensed JD summary,
+    the resume summary (name, structured fields, experience excerpts —
+    changes whenever the resume is re-uploaded with different content) and
+    the hybrid-score anchor.
+    """
+    user_message = _build_user_message(
+        pair["job"], pair["resume"], pair["parsed_jd"], pair.get("hybrid_score", 0),
+    )
+    return make_key(LLM_MODEL, _PROMPT_HASH, _scoring_mode(), user_message)
+
+
+def get_llm_cache_stats() -> Dict:
+    """Hit/miss counters for the LLM score cache."""
+    return _score_cache.stats()
+
+
 # ═══════════════════════════════════════════════════════════════════
 # SINGLE PAIR SCORER
 # ═══════════════════════════════════════════════════════════════════
 
+def _clean_result(result) -> Optional[Dict]:
+    """Validate one scorer result and clamp its scores to 0-100; None if malformed."""
+    # Validate required fields
+    if not isinstance(result, dict) or "llm_score" not in result:
+        return None
+    try:
+        # Clamp score to 0-100
+        result["llm_score"] = max(0, min(100, int(result["llm_score"])))
+
+        # Clamp component scores
+        components = result.get("components", {})
+        for key in ["skills_fit", "experience_fit", "trajectory_fit"]:
+            if key in components:
+                components[key] = max(0, min(100, int(components[key])))
+    except (TypeError, ValueError, AttributeError):
+        return None
+    return result
+
+
 async def _score_single_pair(
     job: Dict,
     resume: Dict,
     parsed_jd: Dict,
     hybrid_score: int,
-    client: httpx.AsyncClient,
-    semaphore: asyncio.Semaphore,
 ) -> Optional[Dict]:
     """
     Score a single (job × resume) pair with the LLM.
     Returns the LLM result dict, or None if the call failed.
+    Rate limiting, concurrency and retries are handled by llm_client.
     """
-    async with semaphore:
-        jd_summary = _build_jd_summary(job, parsed_jd)
-        resume_summary = _build_resume_summary(resume)
+    user_message = _build_user_message(job, resume, parsed_jd, hybrid_score)
+
+    try:
+        content = await chat_completion(
+            [
+                {"role": "system", "content": _SCORER_SYSTEM_PROMPT},
+                {"role": "user", "content": user_message},
+            ],
+            model=LLM_MODEL,
+            temperature=0.1,
+            max_tokens=600,
+            timeout=LLM_TIMEOUT,
+            deadline=LLM_DEADLINE,
+            caller="llm_scorer",
+        )
+
+        content = re.sub(r'^```(?:json)?\s*', '', content)
+        content = re.sub(r'\s*```$', '', content)
+
+        result = _clean_result(json.loads(content))
+        if result is None:
+            return None
 
-        user_message = f"""INITIAL HYBRID SCORE (keyword/semantic match): {hybrid_score}%
-Use this as a rough anchor — your holistic assessment may differ.
+        logger.info(
+            f"[LLMScorer] {resume.get('name')} × {job.get('job_title', job.get('title'))}: "
+            f"hybrid={hybrid_score} → llm={result['llm_score']} ({result.get('recommendation', '?')})"
+        )
+        return result
+
+    except json.JSONDecodeError as e:
+        logger.warning(f"[LLMScorer] Invalid JSON response: {e}")
+        return None
+    except Exception as e:
+        logger.warning(f"[LLMScorer] Call failed for {resume.get('name')}: {e}")
+        return None
+
+
+# ═══════════════════════════════════════════════════════════════════
+# GROUPED SCORER — one request scores every resume for a job
+# ═══════════════════════════════════════════════════════════════════
+
+_GROUP_INSTRUCTIONS = """You will receive ONE job and SEVERAL candidates (C1, C2, ...).
+Score EACH candidate against the job independently, exactly as you would score
+them alone — do not rank candidates against each other or spread their scores.
+
+Return ONLY valid JSON (no markdown, no backticks), one object per candidate in
+the same schema as above plus its "candidate_id":
+{"results": [{"candidate_id": "C1", "llm_score": 72, "components": {...}, "reasoning": "...",
+  "recommendation": "...", "key_strengths": [...], "key_gaps": [...]}, ...]}"""
+
+_GROUP_PROMPT_HASH = make_key(_GROUP_INSTRUCTIONS)
+
+
+def _build_group_message(job: Dict, parsed_jd: Dict, members: List[Tuple[Dict, int]]) -> str:
+    """User message for one job and several (resume, hybrid_score) members."""
+    sections = []
+    for i, (resume, hybrid_score) in enumerate(members, start=1):
+        sections.append(
+            f"=== CANDIDATE C{i} ===\n"
+            f"INITIAL HYBRID SCORE (keyword/semantic match): {hybrid_score}%\n"
+            f"{_build_resume_summary(resume)}"
+        )
+    candidates = "\n\n".join(sections)
+
+    return f"""{_GROUP_INSTRUCTIONS}
+
+Each INITIAL HYBRID SCORE is a rough anchor — your holistic assessment may differ.
 
 JOB DESCRIPTION:
-{jd_summary}
+{_build_jd_summary(job, parsed_jd)}
 
 ---
 
-CANDIDATE RESUME:
-{resume_summary}
+{candidates}
 
-Score this match."""
+Score all {len(members)} candidates."""
 
-        try:
-            api_key = os.environ.get("OPENAI_API_KEY")
-            if not api_key:
-                return None
-
-            response = await client.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": LLM_MODEL,
-                    "messages": [
-                        {"role": "system", "content": _SCORER_SYSTEM_PROMPT},
-                        {"role": "user", "content": user_message},
-                    ],
-                    "temperature": 0.1,
-                    "max_tokens": 600,
-                },
-                timeout=LLM_TIMEOUT,
-            )
-
-            if response.status_code != 200:
-                logger.warning(f"[LLMScorer] API {response.status_code} for {resume.get('name')} × {job.get('job_title')}")
-                return None
-
-            content = response.json()["choices"][0]["message"]["content"].strip()
-            content = re.sub(r'^```(?:json)?\s*', '', content)
-            content = re.sub(r'\s*```$', '', content)
-
-            result = json.loads(content)
-
-            # Validate required fields
-            if "llm_score" not in result:
-                return None
-
-            # Clamp score to 0-100
-            result["llm_score"] = max(0, min(100, int(result["llm_score"])))
-
-            # Clamp component scores
-            components = result.get("components", {})
-            for key in ["skills_fit", "experience_fit", "trajectory_fit"]:
-                if key in components:
-                    components[key] = max(0, min(100, int(components[key])))
-
-            logger.info(
-                f"[LLMScorer] {resume.get('name')} × {job.get('job_title', job.get('title'))}: "
-                f"hybrid={hybrid_score} → llm={result['llm_score']} ({result.get('recommendation', '?')})"
-            )
-            return result
-
-        except json.JSONDecodeError as e:
-            logger.warning(f"[LLMScorer] Invalid JSON response: {e}")
-            return None
-        except Exception as e:
-            logger.warning(f"[LLMScorer] Call failed for {resume.get('name')}: {e}")
-            return None
+
+def _split_group(members: List[Tuple[Dict, int]]) -> List[List[Tuple[Dict, int]]]:
+    """Split one job's resumes into requests under LLM_GROUP_MAX_RESUMES / LLM_GROUP_MAX_CHARS."""
+    groups, current, size = [], [], 0
+    for member in members:
+        member_size = len(_build_resume_summary(member[0]))
+        if current and (
+            len(current) >= LLM_GROUP_MAX_RESUMES or size + member_size > LLM_GROUP_MAX_CHARS
+        ):
+            groups.append(current)
+            current, size = [], 0
+        current.append(member)
+        size += member_size
+    if current:
+        groups.append(current)
+    return groups
+
+
+async def _score_group(
+    job: Dict,
+    parsed_jd: Dict,
+    members: List[Tuple[Dict, int]],
+) -> List[Optional[Dict]]:
+    """
+    Score several resumes for one job in a single request.
+    Returns one result per member (None where scoring failed). Members the
+    response leaves out or garbles are re-scored with _score_single_pair.
+    """
+    if len(members) == 1:
+        resume, hybrid_score = members[0]
+        return [await _score_single_pair(job, resume, parsed_jd, hybrid_score)]
+
+    results: List[Optional[Dict]] = [None] * len(members)
+    try:
+        content = await chat_completion(
+            [
+                {"role": "system", "content": _SCORER_SYSTEM_PROMPT},
+                {"role": "user", "content": _build_group_message(job, parsed_jd, members)},
+            ],
+            model=LLM_MODEL,
+            temperature=0.1,
+            max_tokens=LLM_GROUP_TOKENS_PER_RESUME * len(members),
+            timeout=LLM_GROUP_TIMEOUT,
+            deadline=LLM_DEADLINE,
+            caller="llm_scorer",
+            extra={"response_format": {"type": "json_object"}},
+        )
+        content = re.sub(r'^```(?:json)?\s*', '', content)
+        content = re.sub(r'\s*```$', '', content)
+
+        items = json.loads(content).get("results", [])
+        if not isinstance(items, list):
+            raise TypeError(f'"results" is {type(items).__name__}, not a list')
+        by_id = {
+            str(item.get("candidate_id", "")).strip(): item
+            for item in items if isinstance(item, dict)
+        }
+        title = job.get("job_title", job.get("title"))
+        for i, (resume, hybrid_score) in enumerate(members):
+            results[i] = _clean_result(by_id.get(f"C{i + 1}"))
+            if results[i] is not None:
+                logger.info(
+                    f"[LLMScorer] {resume.get('name')} × {title}: hybrid={hybrid_score} "
+                    f"→ llm={results[i]['llm_score']} ({results[i].get('recommendation', '?')}, grouped)"
+                )
+
+    except LLMRequestError as e:
+        logger.warning(f"[LLMScorer] Grouped call failed for {len(members)} resumes: {e}")
+        return results
+    except (json.JSONDecodeError, AttributeError, TypeError) as e:
+        logger.warning(f"[LLMScorer] Grouped call returned malformed JSON: {e}")
+
+    retry = [i for i, result in enumerate(results) if result is None]
+    if retry:
+        logger.info(f"[LLMScorer] Grouped fallback: {len(retry)}/{len(members)} resumes re-scored singly")
+        singles = await asyncio.gather(*[
+            _score_single_pair(job, members[i][0], parsed_jd, members[i][1]) for i in retry
+        ])
+        for i, result in zip(retry, singles):
+            results[i] = result
+    return results
+
+
+async def _score_misses_grouped(pairs: List[Dict]) -> List[Optional[Dict]]:
+    """Score pairs with one request per job (split when large). Results align with pairs."""
+    by_job: Dict[str, List[int]] = {}
+    for i, pair in enumerate(pairs):
+        by_job.setdefault(_build_jd_summary(pair["job"], pair["parsed_jd"]), []).append(i)
+
+    tasks, task_indices = [], []
+    for indices in by_job.values():
+        first = pairs[indices[0]]
+        members = [(pairs[i]["resume"], pairs[i].get("hybrid_score", 0)) for i in indices]
+        offset = 0
+        for group in _split_group(members):
+            tasks.append(_score_group(first["job"], first["parsed_jd"], group))
+            task_indices.append(indices[offset:offset + len(group)])
+            offset += len(group)
+
+    logger.info(f"[LLMScorer] Grouped mode: {len(pairs)} pairs in {len(tasks)} requests")
+    results: List[Optional[Dict]] = [None] * len(pairs)
+    for indices, group_results in zip(task_indices, await asyncio.gather(*tasks, return_exceptions=True)):
+        if isinstance(group_results, Exception):
+            logger.warning(f"[LLMScorer] Grouped scoring failed: {group_results}")
+            continue
+        for i, result in zip(indices, group_results):
+            results[i] = result
+    return results
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -333,22 +531,43 @@ async def llm_score_batch(
             pair["llm_score"] = pair.get("hybrid_score", pair.get("score", 0))
         return pairs
 
-    semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
-
-    async with httpx.AsyncClient() as client:
-        tasks = []
-        for pair in pairs:
-            task = _score_single_pair(
-                job=pair["job"],
-                resume=pair["resume"],
-                parsed_jd=pair["parsed_jd"],
-                hybrid_score=pair.get("hybrid_score", 0),
-                client=client,
-                semaphore=semaphore,
-            )
-            tasks.append(task)
-
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+    # ── Cache lookup: only misses go to the LLM ──
+    cache_keys = [_score_cache_key(pair) for pair in pairs]
+    cached = _score_cache.get_many(cache_keys)
+    results: List = [
+        json.loads(cached[key]) if key in cached else None
+        for key in cache_keys
+    ]
+    misses = [i for i, key in enumerate(cache_keys) if key not in cached]
+    logger.info(
+        f"[LLMScorer] Cache: {len(pairs) - len(misses)} hits, {len(misses)} misses "
+        f"({len(pairs)} pairs)"
+    )
+
+    if misses:
+        if LLM_GROUPED_SCORING:
+            miss_results = await _score_misses_grouped([pairs[i] for i in misses])
+        else:
+            tasks = []
+            for i in misses:
+                pair = pairs[i]
+                task = _score_single_pair(
+                    job=pair["job"],
+                    resume=pair["resume"],
+                    parsed_jd=pair["parsed_jd"],
+                    hybrid_score=pair.get("hybrid_score", 0),
+                )
+                tasks.append(task)
+
+            miss_results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Cache successful scores only — failures are retried next time
+        fresh = {}
+        for i, llm_result in zip(misses, miss_results):
+            results[i] = llm_result
+            if isinstance(llm_result, dict):
+                fresh[cache_keys[i]] = json.dumps(llm_result).encode("utf-8")
+        _score_cache.set_many(fresh)
 
     # Merge LLM results back into pairs
     enriched = []
@@ -380,7 +599,10 @@ async def llm_score_batch(
 
         enriched.append(entry)
 
-    logger.info(f"[LLMScorer] Batch complete: {llm_success} LLM scored, {llm_failed} hybrid fallback")
+    logger.info(
+        f"[LLMScorer] Batch complete: {llm_success} LLM scored "
+        f"({len(pairs) - len(misses)} from cache), {llm_failed} hybrid fallback"
+    )
     return enriched
 
 
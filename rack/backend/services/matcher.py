@@ -7,18 +7,37 @@ Key fixes in this version:
   2. JD embedding uses a focused query (skills + title + key requirements)
      instead of the full JD text, staying within all-MiniLM-L6-v2's 256 token limit
   3. This dramatically improves semantic similarity scores
+  4. Small indexes (≤ DENSE_EXACT_MAX_VECTORS) skip ANN: every chunk is scored
+     with one matmul and each resume keeps its own top-K, so no resume gets a
+     0 semantic score just for missing the global top-20
+  5. match_resumes_batch() scores many JDs in one pass (one resume load,
+     one embedding batch, one vector search) for auto-match / watchlist
+  6. LLM Pass 3 is awaited once per JD for all resumes (resolve_pass3) and
+     its verdicts are shared by score_resume and analyze_gaps — no blocking
+     per-resume LLM calls inside the event loop
 """
 
+import asyncio
 import time
 from typing import Dict, List, Optional
 
+import numpy as np
+
 from services.jd_parser import parse_jd, _split_jd_sections
-from services.embedder import embed_single
-from services.faiss_store import search as faiss_search, get_index_stats
-from services.ingestion import get_all_resumes, get_resume_by_id
-from services.hybrid_scorer import score_resume
+from services.embedder import aembed_single, aembed_texts
+from services.faiss_store import (
+    search as faiss_search,
+    search_batch as faiss_search_batch,
+    dense_search_by_resume,
+    get_index_stats,
+    DENSE_EXACT_MAX_VECTORS,
+)
+from services.ingestion import get_resumes_full
+from services.hybrid_scorer import score_resume, resolve_pass3, SEMANTIC_TOP_K
 from services.gap_analyzer import analyze_gaps
 
+BATCH_PARSE_CONCURRENCY = 8   # match_resumes_batch: JD parses in flight (LLM layer)
+
 
 def _build_semantic_query(parsed_jd: Dict, jd_text: str) -> str:
     """
@@ -73,14 +92,20 @@ async def match_resumes(
     user_id: str = "default",
     top_k_chunks: int = 20,
     use_llm: bool = True,
+    parsed_jd: Optional[Dict] = None,
+    jd_embedding: Optional[np.ndarray] = None,
 ) -> Dict:
     """
     Full matching pipeline: JD → parsed → scored → ranked results.
+
+    parsed_jd / jd_embedding: features precomputed at ingest (job_enricher);
+    when given, the parse and embed steps are skipped.
     """
     start_time = time.time()
 
     # ── Step 1: Parse JD ──
-    parsed_jd = await parse_jd(jd_text, use_llm=use_llm)
+    if parsed_jd is None:
+        parsed_jd = await parse_jd(jd_text, use_llm=use_llm)
     print(f"[matcher] JD parsed: {len(parsed_jd.get('required_skills', []))} required skills, "
           f"method={parsed_jd.get('extraction_method')}")
 
@@ -98,21 +123,37 @@ async def match_resumes(
         }
 
     # ── Step 3: Build focused semantic query and embed ──
-    semantic_query = _build_semantic_query(parsed_jd, jd_text)
-    jd_embedding = embed_single(semantic_query)
-    print(f"[matcher] Semantic query: {len(semantic_query.split())} words")
-
-    # ── Step 4: FAISS search — scoped to this session/user ──
-    faiss_results = faiss_search(
-        query_embedding=jd_embedding,
-        top_k=top_k_chunks,
-        user_id=user_id,
-    )
-    print(f"[matcher] FAISS returned {len(faiss_results)} chunks")
+    if jd_embedding is None:
+        semantic_query = _build_semantic_query(parsed_jd, jd_text)
+        jd_embedding = await aembed_single(semantic_query)
+        print(f"[matcher] Semantic query: {len(semantic_query.split())} words")
+
+    # ── Step 4: Vector search — scoped to this session/user ──
+    # Dense exact mode for small indexes (per-resume top-K over every chunk),
+    # ANN top-K across the whole index above DENSE_EXACT_MAX_VECTORS
+    if index_stats["total_vectors"] <= DENSE_EXACT_MAX_VECTORS:
+        search_mode = "dense_exact"
+        results_by_resume = dense_search_by_resume(
+            jd_embedding,
+            top_k_per_resume=SEMANTIC_TOP_K,
+            user_id=user_id,
+        )[0]
+        chunks_searched = index_stats["total_vectors"]
+    else:
+        search_mode = "ann"
+        faiss_results = faiss_search(
+            query_embedding=jd_embedding,
+            top_k=top_k_chunks,
+            user_id=user_id,
+        )
+        results_by_resume = _group_by_resume(faiss_results)
+        chunks_searched = len(faiss_results)
+    print(f"[matcher] {search_mode} search: {chunks_searched} chunks, "
+          f"{len(results_by_resume)} resumes with hits")
 
     # ── Step 5: Load resume metadata — scoped to this session/user ──
-    all_resumes = get_all_resumes(session_id=user_id)
-    if not all_resumes:
+    resumes = get_resumes_full(session_id=user_id)
+    if not resumes:
         return {
             "results": [],
             "jd_parsed": parsed_jd,
@@ -123,28 +164,223 @@ async def match_resumes(
             },
         }
 
-    # ── Step 6: Group FAISS results by resume ──
-    results_by_resume = {}
-    for result in faiss_results:
-        rid = result["resume_id"]
-        if rid not in results_by_resume:
-            results_by_resume[rid] = []
-        results_by_resume[rid].append(result)
+    # ── Step 6: Score each resume (LLM Pass 3 resolved once for all of them) ──
+    pass3 = await resolve_pass3(parsed_jd, resumes) if use_llm else None
+    scored_results = _score_resumes(parsed_jd, resumes, results_by_resume, use_llm, pass3)
 
-    # ── Step 7: Score each resume ──
-    scored_results = []
-    for resume in all_resumes:
-        resume_id = resume["id"]
+    pipeline_time = _elapsed_ms(start_time)
+    print(f"[matcher] Pipeline complete: {len(scored_results)} resumes scored in {pipeline_time}ms")
+
+    return {
+        "results": scored_results,
+        "jd_parsed": parsed_jd,
+        "meta": {
+            "total_resumes": len(scored_results),
+            "pipeline_time_ms": pipeline_time,
+            "faiss_chunks_searched": chunks_searched,
+            "search_mode": search_mode,
+            "index_stats": index_stats,
+        },
+    }
+
+
+async def match_resumes_batch(
+    jd_texts: List[str],
+    user_id: str = "default",
+    top_k_chunks: int = 20,
+    use_llm: bool = True,
+    parsed_jds: Optional[List[Optional[Dict]]] = None,
+    jd_embeddings: Optional[List[Optional[np.ndarray]]] = None,
+) -> List[Dict]:
+    """
+    Match many JDs against one user's resumes in a single pass.
+
+    Per-call work is done once for the whole batch: resume metadata is read
+    once, JDs are parsed concurrently, every semantic query goes through one
+    embedding batch and one vector search (search_batch / dense matmul), then
+    the full JDs × resumes grid is scored.
+
+    parsed_jds / jd_embeddings: optional precomputed features (job_enricher),
+    aligned with jd_texts; None entries are computed here.
+
+    Errors are isolated per JD: a JD whose parse, Pass 3 or scoring fails
+    gets an empty result with meta["error"] set, the others are unaffected.
+    If a shared step (embedding / vector search) fails, every JD is retried
+    on its own through match_resumes().
+
+    Returns:
+        One match_resumes()-shaped dict per JD, in input order.
+    """
+    start_time = time.time()
+    n_jds = len(jd_texts)
+    if n_jds == 0:
+        return []
+    parsed_jds = list(parsed_jds) if parsed_jds is not None else [None] * n_jds
+    jd_embeddings = list(jd_embeddings) if jd_embeddings is not None else [None] * n_jds
+
+    # ── Step 1: Parse JDs (concurrently; cached ones return immediately) ──
+    semaphore = asyncio.Semaphore(BATCH_PARSE_CONCURRENCY)
+
+    async def _parse(i: int) -> Dict:
+        if parsed_jds[i] is not None:
+            return parsed_jds[i]
+        async with semaphore:
+            return await parse_jd(jd_texts[i], use_llm=use_llm)
+
+    parsed_jds = await asyncio.gather(*[_parse(i) for i in range(n_jds)], return_exceptions=True)
+    failed: Dict[int, Exception] = {
+        i: parsed for i, parsed in enumerate(parsed_jds) if isinstance(parsed, Exception)
+    }
+    for i, error in failed.items():
+        print(f"[matcher] Batch JD {i} parse failed: {error}")
+        parsed_jds[i] = {}
+
+    # ── Step 2: Load resumes once ──
+    index_stats = get_index_stats(user_id)
+    resumes = get_resumes_full(session_id=user_id) if index_stats["total_vectors"] else []
+    if not resumes:
+        message = ("No resumes indexed. Upload resumes first."
+                   if index_stats["total_vectors"] == 0 else "No resume metadata found.")
+        return [
+            {
+                "results": [],
+                "jd_parsed": parsed,
+                "meta": {
+                    "total_resumes": 0,
+                    "pipeline_time_ms": _elapsed_ms(start_time),
+                    "message": message,
+                },
+            }
+            for parsed in parsed_jds
+        ]
+
+    ok = [i for i in range(n_jds) if i not in failed]
+    search_mode = "dense_exact" if index_stats["total_vectors"] <= DENSE_EXACT_MAX_VECTORS else "ann"
+    try:
+        # ── Step 3: Embed every missing semantic query in one batch ──
+        missing = [i for i in ok if jd_embeddings[i] is None]
+        if missing:
+            queries = [_build_semantic_query(parsed_jds[i], jd_texts[i]) for i in missing]
+            for i, embedding in zip(missing, await aembed_texts(queries)):
+                jd_embeddings[i] = embedding
 
-        full_resume = get_resume_by_id(resume_id)
-        if not full_resume:
+        # ── Step 4: One vector search for all JDs ──
+        grouped: List[Dict[str, List[Dict]]] = [{}] * n_jds
+        if ok:
+            query_matrix = np.vstack([jd_embeddings[i] for i in ok]).astype(np.float32)
+            if search_mode == "dense_exact":
+                hits = dense_search_by_resume(query_matrix, top_k_per_resume=SEMANTIC_TOP_K, user_id=user_id)
+            else:
+                hits = faiss_search_batch(query_matrix, top_k=top_k_chunks, user_id=user_id)
+            for i, results_by_resume in zip(ok, hits):
+                grouped[i] = results_by_resume
+    except Exception as e:
+        print(f"[matcher] Batch embed/search failed ({e}) — matching {len(ok)} JDs one by one")
+        return await _match_each(jd_texts, parsed_jds, jd_embeddings, failed, user_id, top_k_chunks, use_llm)
+
+    # ── Step 5: LLM Pass 3 — one request per JD, all JDs concurrently ──
+    pass3_by_jd: List = [None] * n_jds
+    if use_llm and ok:
+        verdicts = await asyncio.gather(
+            *[resolve_pass3(parsed_jds[i], resumes) for i in ok], return_exceptions=True,
+        )
+        for i, pass3 in zip(ok, verdicts):
+            if isinstance(pass3, Exception):
+                failed[i] = pass3
+            else:
+                pass3_by_jd[i] = pass3
+
+    # ── Step 6: Score the JDs × resumes grid ──
+    outputs = []
+    for i in range(n_jds):
+        if i not in failed:
+            try:
+                scored_results = _score_resumes(parsed_jds[i], resumes, grouped[i], use_llm, pass3_by_jd[i])
+            except Exception as e:
+                failed[i] = e
+        if i in failed:
+            print(f"[matcher] Batch JD {i} failed: {failed[i]}")
+            outputs.append(_error_result(parsed_jds[i], failed[i], start_time))
+            continue
+        outputs.append({
+            "results": scored_results,
+            "jd_parsed": parsed_jds[i],
+            "meta": {
+                "total_resumes": len(scored_results),
+                "pipeline_time_ms": _elapsed_ms(start_time),
+                "faiss_chunks_searched": sum(len(hits) for hits in grouped[i].values()),
+                "search_mode": search_mode,
+                "index_stats": index_stats,
+                "batch_size": n_jds,
+            },
+        })
+
+    pipeline_time = _elapsed_ms(start_time)
+    print(f"[matcher] Batch complete: {n_jds} JDs × {len(resumes)} resumes "
+          f"({len(missing)} embedded, {len(failed)} failed) in {pipeline_time}ms")
+    return outputs
+
+
+async def _match_each(
+    jd_texts: List[str],
+    parsed_jds: List[Dict],
+    jd_embeddings: List[Optional[np.ndarray]],
+    failed: Dict[int, Exception],
+    user_id: str,
+    top_k_chunks: int,
+    use_llm: bool,
+) -> List[Dict]:
+    """match_resumes_batch fallback: one match_resumes() per JD, errors kept per JD."""
+    start_time = time.time()
+    outputs = []
+    for i, jd_text in enumerate(jd_texts):
+        if i in failed:
+            outputs.append(_error_result(parsed_jds[i], failed[i], start_time))
             continue
+        try:
+            outputs.append(await match_resumes(
+                jd_text, user_id=user_id, top_k_chunks=top_k_chunks, use_llm=use_llm,
+                parsed_jd=parsed_jds[i], jd_embedding=jd_embeddings[i],
+            ))
+        except Exception as e:
+            print(f"[matcher] Batch JD {i} failed: {e}")
+            outputs.append(_error_result(parsed_jds[i], e, start_time))
+    return outputs
+
+
+def _error_result(parsed_jd: Dict, error: Exception, start: float) -> Dict:
+    """match_resumes()-shaped result for a JD that failed inside a batch."""
+    return {
+        "results": [],
+        "jd_parsed": parsed_jd,
+        "meta": {
+            "total_resumes": 0,
+            "pipeline_time_ms": _elapsed_ms(start),
+            "error": str(error) or type(error).__name__,
+        },
+    }
 
-        structured = full_resume.get("structured", {})
-        resume_chunks = full_resume.get("chunks", [])
+
+def _score_resumes(
+    parsed_jd: Dict,
+    resumes: List[Dict],
+    results_by_resume: Dict[str, List[Dict]],
+    use_llm: bool,
+    pass3: Optional[Dict[str, set]] = None,
+) -> List[Dict]:
+    """
+    Hybrid score + gap analysis for one JD against loaded resumes, best first.
+    pass3: resolve_pass3() verdicts, shared by the scorer and the gap analyzer.
+    """
+    scored_results = []
+    for resume in resumes:
+        resume_id = resume["id"]
+        structured = resume.get("structured", {})
+        resume_chunks = resume.get("chunks", [])
 
         # FAISS results for this resume
         resume_faiss = results_by_resume.get(resume_id, [])
+        llm_matched = pass3.get(resume_id, set()) if pass3 is not None else None
 
         # Hybrid scoring — passes chunks for text-based skill matching
         score_result = score_resume(
@@ -153,10 +389,14 @@ async def match_resumes(
             faiss_results=resume_faiss,
             resume_chunks=resume_chunks,
             use_llm=use_llm,
+            llm_matched_skills=llm_matched,
         )
 
-        # Gap analysis — same 3-pass matching for consistency
-        gaps = analyze_gaps(parsed_jd, structured, resume_chunks=resume_chunks, use_llm=use_llm)
+        # Gap analysis — same 3-pass matching and Pass 3 verdicts for consistency
+        gaps = analyze_gaps(
+            parsed_jd, structured, resume_chunks=resume_chunks,
+            use_llm=use_llm, llm_matched_skills=llm_matched,
+        )
 
         scored_results.append({
             "resume_id": resume_id,
@@ -176,22 +416,17 @@ async def match_resumes(
             "chunk_count": resume.get("chunk_count", 0),
         })
 
-    # ── Step 8: Sort by score descending ──
+    # Sort by score descending
     scored_results.sort(key=lambda x: x["raw_score"], reverse=True)
+    return scored_results
 
-    pipeline_time = _elapsed_ms(start_time)
-    print(f"[matcher] Pipeline complete: {len(scored_results)} resumes scored in {pipeline_time}ms")
 
-    return {
-        "results": scored_results,
-        "jd_parsed": parsed_jd,
-        "meta": {
-            "total_resumes": len(scored_results),
-            "pipeline_time_ms": pipeline_time,
-            "faiss_chunks_searched": len(faiss_results),
-            "index_stats": index_stats,
-        },
-    }
+def _group_by_resume(faiss_results: List[Dict]) -> Dict[str, List[Dict]]:
+    """Group ANN hits by resume_id (order within each resume preserved)."""
+    results_by_resume = {}
+    for result in faiss_results:
+        results_by_resume.setdefault(result["resume_id"], []).append(result)
+    return results_by_resume
 
 
 def _elapsed_ms(start: float) -> int:
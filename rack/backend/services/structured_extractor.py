@@ -18,7 +18,8 @@ Two-stage architecture:
 
 Design decisions:
   - Pattern-based over list-based for roles/companies (resumes have infinite variation)
-  - Case-insensitive skill matching with alias groups (not just 1:1 normalization)
+  - Case-insensitive skill matching with alias groups (not just 1:1 normalization),
+    compiled once into a single-pass matcher shared with jd_parser
   - Date-range math for years_exp (more accurate than "5+ years" regex alone)
   - Runs once at upload time, NOT on every query
 """
@@ -169,31 +170,102 @@ for group in SKILL_ALIASES:
         _SKILL_LOOKUP[alias.lower()] = canonical
 
 
+# ── Compiled skill matcher ──────────────────────────────────────────
+# Every alias used to be its own re.search over the text (~250 scans per call).
+# Instead, aliases are compiled into two trie-shaped regexes — one per boundary
+# rule — and scanned once as a zero-width lookahead, so every start position
+# is tried and the longest alias matching there is captured. Shorter aliases
+# that also match at that position are always prefixes of the longest one;
+# which of them hold is fixed by the alias text itself, so it's precomputed.
+
+_SHORT_ALIAS_MAX_LEN = 2  # ≤ 2 chars ("R", "Go", "C#", "JS"): letter-boundary rule
+
+
+def _trie_regex(words: List[str], end: str) -> str:
+    """
+    Regex for a set of literals as a trie (shared prefixes factored out),
+    longest match first. `end` is the boundary assertion after each word.
+    """
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}  # terminal
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if "" in node:
+            branches.append(end)  # after every longer continuation
+        return branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+def _alias_matches_at_end(alias: str, next_char: str) -> bool:
+    """Would `alias`'s end boundary hold if followed by next_char?"""
+    if len(alias) <= _SHORT_ALIAS_MAX_LEN:
+        return not re.match(r"[a-zA-Z]", next_char)
+    return bool(re.match(r"\w", alias[-1])) != bool(re.match(r"\w", next_char))
+
+
+class _SkillMatcher:
+    """
+    One-pass skill extraction with the same rules as the original per-alias loop:
+      - aliases > 2 chars: r'\balias\b' on the lowercased text
+      - aliases ≤ 2 chars: not preceded/followed by a letter (case-insensitive)
+    """
+
+    def __init__(self, lookup: Dict[str, str]):
+        self.lookup = dict(lookup)
+        long_aliases = [a for a in lookup if len(a) > _SHORT_ALIAS_MAX_LEN]
+        short_aliases = [a for a in lookup if len(a) <= _SHORT_ALIAS_MAX_LEN]
+        self._long = re.compile(r"(?=\b(" + _trie_regex(long_aliases, r"\b") + "))")
+        self._short = re.compile(
+            r"(?=(?<![a-zA-Z])(" + _trie_regex(short_aliases, r"(?![a-zA-Z])") + "))",
+            re.IGNORECASE,
+        )
+        # alias → canonicals of itself + every same-rule alias that is a proper
+        # prefix of it and whose end boundary holds inside it
+        self._closure: Dict[str, List[str]] = {}
+        for group in (long_aliases, short_aliases):
+            for alias in group:
+                canonicals = {lookup[alias]}
+                for other in group:
+                    if len(other) < len(alias) and alias.startswith(other) \
+                            and _alias_matches_at_end(other, alias[len(other)]):
+                        canonicals.add(lookup[other])
+                self._closure[alias] = sorted(canonicals)
+
+    def extract(self, text: str) -> List[str]:
+        found = set()
+        for match in self._long.finditer(text.lower()):
+            found.update(self._closure[match.group(1)])
+        for match in self._short.finditer(text):
+            found.update(self._closure[match.group(1).lower()])
+        return sorted(found)
+
+
+_skill_matcher: Optional[_SkillMatcher] = None
+
+
+def get_skill_matcher() -> _SkillMatcher:
+    """Compiled matcher over _SKILL_LOOKUP (singleton, built on first use / warm-up)."""
+    global _skill_matcher
+    if _skill_matcher is None:
+        _skill_matcher = _SkillMatcher(_SKILL_LOOKUP)
+    return _skill_matcher
+
+
 def _extract_skills(text: str) -> List[str]:
     """
     Extract and normalize skills from text.
     Uses word-boundary matching to avoid false positives
     (e.g., "React" inside "Reactive" won't match).
+    Short aliases (≤ 2 chars like "R", "Go", "C#", "JS") need non-letter
+    neighbours instead. Single linear scan — see _SkillMatcher.
     """
-    found = set()
-    text_lower = text.lower()
-
-    for alias, canonical in _SKILL_LOOKUP.items():
-        # Word boundary check to prevent substring false positives
-        # For short aliases (≤ 2 chars like "R", "Go", "C#", "JS"),
-        # require stricter context (comma-separated, bullet points, etc.)
-        if len(alias) <= 2:
-            # Match only if surrounded by non-alphanumeric chars
-            pattern = r'(?<![a-zA-Z])' + re.escape(alias) + r'(?![a-zA-Z])'
-            if re.search(pattern, text, re.IGNORECASE):
-                found.add(canonical)
-        else:
-            # Standard word-boundary match for longer aliases
-            pattern = r'\b' + re.escape(alias) + r'\b'
-            if re.search(pattern, text_lower):
-                found.add(canonical)
-
-    return sorted(found)
+    return get_skill_matcher().extract(text)
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -709,31 +781,20 @@ Return ONLY valid JSON (no markdown, no backticks, no explanation):
 }}"""
 
     try:
-        import httpx
-
-        response = httpx.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": "gpt-4o-mini",
-                "messages": [
-                    {"role": "system", "content": "You are a precise resume analysis system. Return only valid JSON."},
-                    {"role": "user", "content": prompt},
-                ],
-                "temperature": 0.1,
-                "max_tokens": 1500,
-            },
+        from services.llm_client import chat_completion_sync
+
+        content = chat_completion_sync(
+            [
+                {"role": "system", "content": "You are a precise resume analysis system. Return only valid JSON."},
+                {"role": "user", "content": prompt},
+            ],
+            model="gpt-4o-mini",
+            temperature=0.1,
+            max_tokens=1500,
             timeout=15.0,
+            deadline=15.0,
+            caller="structured_extractor",
         )
-
-        if response.status_code != 200:
-            logger.warning(f"OpenAI API returned {response.status_code}: {response.text[:200]}")
-            return None
-
-        content = response.json()["choices"][0]["message"]["content"].strip()
         # Strip markdown fences if present
         content = re.sub(r'^```(?:json)?\s*', '', content)
         content = re.sub(r'\s*```$', '', content)
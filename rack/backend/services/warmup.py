@@ -0,0 +1,120 @@
+"""
+warmup.py
+Startup warm-up: everything the first request would otherwise pay for.
+
+Stages (timed and logged individually):
+  1. embedder   — load all-MiniLM-L6-v2 and run one batch through it (required)
+  2. skills     — run resume skill extraction + rule-based JD parsing once, so
+                  the skill vocabulary / compiled matchers are built (required)
+  3. faiss      — optionally pre-load the most recently written user indexes
+                  (WARMUP_PRELOAD_INDEXES, default 0 = off)
+
+main.py runs this in a background thread from the FastAPI lifespan; /health
+reports 503 until it completes, so the load balancer only routes to warm
+workers. If a required stage fails the worker stays not-ready.
+
+Under gunicorn (gunicorn.conf.py, preload_app) the master calls
+preload_shared_assets() before forking: model weights and the read-only
+lookup tables are then shared copy-on-write by every worker, and each
+worker's warm-up only runs its warm-up batch.
+"""
+
+import gc
+import logging
+import os
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+WARMUP_PRELOAD_INDEXES = int(os.getenv("WARMUP_PRELOAD_INDEXES", "0"))
+
+_WARMUP_JD = (
+    "Senior Backend Engineer. Requirements: 4+ years of experience with Python, "
+    "FastAPI, PostgreSQL and Docker. Nice to have: Kubernetes, AWS, RAG and LLM experience. "
+    "Responsibilities: build and operate production ML systems."
+)
+
+# Shared with /health — read-only outside this module
+WARMUP_STATE: Dict = {"ready": False, "stages": {}, "error": None, "total_ms": None}
+
+
+def _stage_embedder() -> Dict:
+    from services.embedder import warm_up
+    return warm_up()
+
+
+def _stage_skills() -> Dict:
+    from services.structured_extractor import _extract_skills
+    from services.jd_parser import parse_jd_sync
+    skills = _extract_skills(_WARMUP_JD)
+    parsed = parse_jd_sync(_WARMUP_JD)
+    return {"skills_found": len(skills), "jd_required_skills": len(parsed.get("required_skills", []))}
+
+
+def _stage_faiss() -> Dict:
+    from services.faiss_store import preload_indexes
+    return {"preloaded_users": len(preload_indexes(WARMUP_PRELOAD_INDEXES))}
+
+
+_STAGES = [
+    ("embedder", _stage_embedder, True),
+    ("skills", _stage_skills, True),
+    ("faiss", _stage_faiss, False),
+]
+
+
+def run_warmup() -> Dict:
+    """Run all warm-up stages in order (blocking). Returns WARMUP_STATE."""
+    start = time.perf_counter()
+    for name, stage, required in _STAGES:
+        stage_start = time.perf_counter()
+        try:
+            detail = stage()
+        except Exception as e:
+            elapsed = round((time.perf_counter() - stage_start) * 1000, 1)
+            WARMUP_STATE["stages"][name] = {"ms": elapsed, "error": str(e)}
+            logger.exception(f"[warmup] {name} failed after {elapsed}ms")
+            if required:
+                WARMUP_STATE["error"] = f"{name}: {e}"
+                return WARMUP_STATE
+            continue
+        elapsed = round((time.perf_counter() - stage_start) * 1000, 1)
+        WARMUP_STATE["stages"][name] = {"ms": elapsed, **(detail or {})}
+        logger.info(f"[warmup] {name} ready in {elapsed}ms {detail or ''}")
+
+    WARMUP_STATE["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    WARMUP_STATE["ready"] = True
+    logger.info(f"[warmup] Worker ready in {WARMUP_STATE['total_ms']}ms")
+    return WARMUP_STATE
+
+
+def preload_shared_assets() -> Dict:
+    """
+    Pre-fork (gunicorn master) load of read-only assets, then gc.freeze() so
+    the collector never writes to those objects' pages in the workers.
+
+    Loads weights only — no inference here: thread pools started before a
+    fork (OpenMP, ONNX Runtime sessions) are not fork-safe, so the warm-up
+    batch stays in the per-worker lifespan. ONNX backends are not preloaded
+    at all for the same reason (the session owns its thread pool).
+    """
+    from services import embedder, structured_extractor, jd_parser, user_profile  # noqa: F401 — import builds the tables
+
+    timings = {}
+    start = time.perf_counter()
+    if embedder.EMBED_BACKEND == "torch":
+        embedder._get_model()
+        timings["embedder_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    else:
+        logger.info(f"[warmup] EMBED_BACKEND={embedder.EMBED_BACKEND}: model loads per worker")
+
+    stage_start = time.perf_counter()
+    structured_extractor._extract_skills(_WARMUP_JD)
+    timings["skills_ms"] = round((time.perf_counter() - stage_start) * 1000, 1)
+
+    gc.collect()
+    gc.freeze()
+    timings["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    logger.info(f"[warmup] Shared assets preloaded in master: {timings}")
+    return timings
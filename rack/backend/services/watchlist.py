@@ -20,7 +20,8 @@ from typing import Optional
 
 from services.job_fetcher import fetch_all_watchlist, fetch_jobs_for_company, fetch_remotive
 from services.jd_parser import parse_jd
-from services.matcher import match_resumes
+from services.matcher import match_resumes_batch
+from services.job_enricher import enrich_jobs, load_job_vectors
 from services.user_profile import filter_jobs_by_profile
 
 logger = logging.getLogger(__name__)
@@ -29,6 +30,7 @@ logger = logging.getLogger(__name__)
 WATCHLIST_DIR = Path("uploads/watchlist")
 WATCHLIST_FILE = WATCHLIST_DIR / "watchlist.json"
 JOBS_FILE = WATCHLIST_DIR / "fetched_jobs.json"
+JOBS_VECTORS_FILE = WATCHLIST_DIR / "fetched_jobs.vectors.npz"  # job_enricher sidecar
 MATCHES_FILE = WATCHLIST_DIR / "match_results.json"
 
 # ── Default data structures ─────────────────────────────────────────
@@ -200,6 +202,10 @@ async def fetch_watchlist_jobs(force: bool = False) -> dict:
 
     jobs = await fetch_all_watchlist(wl["companies"])
 
+    # Parse + embed new/changed postings once, here — refreshes only score
+    previous = _load_json(JOBS_FILE, DEFAULT_JOBS_STORE).get("jobs", [])
+    await enrich_jobs(jobs, previous_jobs=previous, vectors_path=JOBS_VECTORS_FILE)
+
     store = {
         "jobs": jobs,
         "last_updated": datetime.now(timezone.utc).isoformat(),
@@ -346,25 +352,47 @@ async def refresh_pipeline(
 
     # ── Step 5a: Phase 1 — FAISS + Hybrid scoring ────────────────
     # Score ALL resumes per job, collect qualifying pairs for Phase 2
-    from services.ingestion import get_resume_by_id
+    from services.ingestion import get_resumes_full
     from services.llm_scorer import llm_score_batch, PHASE2_THRESHOLD
 
     phase1_pairs = []   # (job × resume) pairs qualifying for Phase 2 LLM scoring
     errors = 0
+    job_vectors = load_job_vectors(JOBS_VECTORS_FILE)
 
+    scorable = []
     for job in new_jobs:
+        jd_text = job.get("description_text", "")
+        if not jd_text or len(jd_text.strip()) < 50:
+            logger.warning(f"[Refresh] Skipping {job['job_id']} — description too short")
+            seen_ids.add(job["job_id"])
+        else:
+            scorable.append(job)
+
+    # Phase 1: always use use_llm=False for hybrid scoring.
+    # Phase 2 (LLM scorer) handles the holistic scoring separately.
+    # Using use_llm=True here triggers hybrid_scorer Pass 3 which has
+    # a known suppression bug and also extracts more skills → lower scores.
+    # All jobs go through one batched pass (resumes loaded once, one
+    # embedding batch, one vector search).
+    try:
+        batch_results = await match_resumes_batch(
+            [job["description_text"] for job in scorable],
+            use_llm=False,
+            parsed_jds=[job.get("parsed_jd") for job in scorable],
+            jd_embeddings=[job_vectors.get(job["job_id"]) for job in scorable],
+        )
+    except Exception as e:
+        # Nothing was scored — leave the jobs unseen so the next refresh retries them
+        logger.error(f"[Refresh] Phase 1 batch scoring error ({len(scorable)} jobs): {e}")
+        errors += len(scorable)
+        batch_results = []
+    resumes_by_id = {r["id"]: r for r in get_resumes_full()}
+
+    for job, result in zip(scorable, batch_results):
         try:
-            jd_text = job.get("description_text", "")
-            if not jd_text or len(jd_text.strip()) < 50:
-                logger.warning(f"[Refresh] Skipping {job['job_id']} — description too short")
-                seen_ids.add(job["job_id"])
-                continue
+            if result["meta"].get("error"):
+                raise RuntimeError(result["meta"]["error"])
 
-            # Phase 1: always use use_llm=False for hybrid scoring.
-            # Phase 2 (LLM scorer) handles the holistic scoring separately.
-            # Using use_llm=True here triggers hybrid_scorer Pass 3 which has
-            # a known suppression bug and also extracts more skills → lower scores.
-            result = await match_resumes(jd_text, use_llm=False)
             matches = result.get("results", [])
             jd_parsed = result.get("jd_parsed", {})
 
@@ -385,7 +413,7 @@ async def refresh_pipeline(
             for resume_match in qualifying:
                 hybrid_score = round(resume_match.get("raw_score", 0) * 100)
                 resume_id = resume_match.get("resume_id", "")
-                full_resume = get_resume_by_id(resume_id)
+                full_resume = resumes_by_id.get(resume_id)
                 if not full_resume:
                     continue
 
@@ -0,0 +1,12 @@
+"""
+Shared pytest setup for the backend services.
+
+Run from rack/backend:  python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
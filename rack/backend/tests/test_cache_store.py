@@ -0,0 +1,85 @@
+"""
+SqliteCache lookups, LRU touch slack and eviction.
+"""
+
+import pytest
+
+import services.cache_store as cache_store
+from services.cache_store import SqliteCache
+
+
+class FakeTime:
+    """Stands in for the `time` module inside cache_store."""
+
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeTime()
+    monkeypatch.setattr(cache_store, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    return SqliteCache("test", max_entries=3, path=tmp_path / "test.sqlite")
+
+
+def _accessed_at(cache, key):
+    row = cache._connect().execute("SELECT accessed_at FROM entries WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def test_get_many_returns_hits_only(cache):
+    cache.set_many({"a": b"1", "b": b"2"})
+    assert cache.get_many(["a", "b", "c", "a"]) == {"a": b"1", "b": b"2"}
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_hits_within_slack_do_not_write(cache, clock):
+    cache.set("a", b"1")
+    conn = cache._connect()
+    writes = conn.total_changes
+    clock.now += cache_store.TOUCH_SLACK_SECONDS / 2
+    for _ in range(5):
+        assert cache.get("a") == b"1"
+    assert conn.total_changes == writes
+    assert _accessed_at(cache, "a") == clock.now - cache_store.TOUCH_SLACK_SECONDS / 2
+
+
+def test_hit_past_slack_touches_once(cache, clock):
+    cache.set_many({"a": b"1", "b": b"2"})
+    clock.now += cache_store.TOUCH_SLACK_SECONDS + 1
+    assert cache.get_many(["a", "b"]) == {"a": b"1", "b": b"2"}
+    assert _accessed_at(cache, "a") == _accessed_at(cache, "b") == clock.now
+
+    conn = cache._connect()
+    writes = conn.total_changes
+    cache.get_many(["a", "b"])
+    assert conn.total_changes == writes
+
+
+def test_lru_eviction_keeps_recently_read_keys(cache, clock):
+    cache.set("old-but-read", b"1")
+    clock.now += 10
+    cache.set("b", b"2")
+    clock.now += 10
+    cache.set("c", b"3")
+    clock.now += cache_store.TOUCH_SLACK_SECONDS + 1
+    cache.get("old-but-read")
+    clock.now += 10
+    cache.set("d", b"4")
+    cache.evict()
+    assert set(cache.get_many(["old-but-read", "b", "c", "d"])) == {"old-but-read", "c", "d"}
+
+
+def test_ttl_expired_rows_are_misses(tmp_path, clock):
+    cache = SqliteCache("ttl", ttl_seconds=60, path=tmp_path / "ttl.sqlite")
+    cache.set("a", b"1")
+    clock.now += 61
+    assert cache.get("a") is None
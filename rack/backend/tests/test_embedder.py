@@ -0,0 +1,167 @@
+"""
+Embedder cache, batch planning and async micro-batching.
+
+The sentence-transformer is replaced by a deterministic fake, so these run
+without model weights; backend parity against the real model is checked
+with `python -m services.embedder parity`.
+"""
+
+import asyncio
+import hashlib
+import os
+
+import numpy as np
+import pytest
+
+import services.embedder as embedder
+from services.cache_store import SqliteCache
+
+
+class FakeModel:
+    """Deterministic stand-in: vector seeded by the text, no tokenizer."""
+
+    max_seq_length = 256
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size, show_progress_bar, normalize_embeddings, convert_to_numpy):
+        self.encoded.extend(texts)
+        rows = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "little")
+            vector = np.random.default_rng(seed).standard_normal(embedder.EMBEDDING_DIM)
+            if normalize_embeddings:
+                vector /= np.linalg.norm(vector)
+            rows.append(vector.astype(np.float32))
+        return np.vstack(rows)
+
+
+@pytest.fixture
+def model(tmp_path, monkeypatch):
+    fake = FakeModel()
+    monkeypatch.setattr(embedder, "_model", fake)
+    monkeypatch.setattr(embedder, "_disk_cache", SqliteCache("embeddings", path=tmp_path / "embeddings.sqlite"))
+    embedder._memory_cache.clear()
+    yield fake
+    embedder._memory_cache.clear()
+
+
+# ── Cache key ───────────────────────────────────────────────────────
+
+def test_cache_key_covers_text_normalize_model_and_backend(monkeypatch):
+    key = embedder._cache_key("Python, FastAPI", True)
+    assert key == embedder._cache_key("Python, FastAPI", True)
+    assert key != embedder._cache_key("Python, FastAPI ", True)
+    assert key != embedder._cache_key("Python, FastAPI", False)
+
+    monkeypatch.setattr(embedder, "EMBED_BACKEND", "onnx-int8")
+    assert key != embedder._cache_key("Python, FastAPI", True)
+    monkeypatch.setattr(embedder, "EMBED_BACKEND", "torch")
+    monkeypatch.setattr(embedder, "MODEL_NAME", "other-model")
+    assert key != embedder._cache_key("Python, FastAPI", True)
+
+
+# ── Cache hits ──────────────────────────────────────────────────────
+
+def test_cache_hit_returns_same_vector_as_fresh_encode(model):
+    texts = ["Built a RAG pipeline with FAISS", "Senior Frontend Engineer. React, TypeScript"]
+    fresh = embedder._encode(texts, True)
+
+    first = embedder.embed_texts(texts)
+    assert len(model.encoded) == 2 + 2
+    np.testing.assert_array_equal(first, fresh)
+
+    memory_hit = embedder.embed_texts(texts)
+    assert len(model.encoded) == 4
+    np.testing.assert_array_equal(memory_hit, fresh)
+
+    embedder._memory_cache.clear()
+    disk_hit = embedder.embed_texts(texts)
+    assert len(model.encoded) == 4
+    np.testing.assert_array_equal(disk_hit, fresh)
+
+
+def test_repeated_texts_are_encoded_once(model):
+    vectors = embedder.embed_texts(["a b c", "d e f", "a b c"])
+    assert model.encoded == ["a b c", "d e f"]
+    np.testing.assert_array_equal(vectors[0], vectors[2])
+
+
+def test_normalize_flag_is_cached_separately(model):
+    normalized = embedder.embed_texts(["Kafka microservices"], normalize=True)
+    raw = embedder.embed_texts(["Kafka microservices"], normalize=False)
+    assert len(model.encoded) == 2
+    assert np.isclose(np.linalg.norm(normalized[0]), 1.0)
+    assert not np.isclose(np.linalg.norm(raw[0]), 1.0)
+
+
+# ── Batch planning ──────────────────────────────────────────────────
+
+@pytest.mark.parametrize("seed", range(5))
+def test_plan_batches_respects_token_budget(seed):
+    lengths = np.random.default_rng(seed).integers(3, 600, size=500).tolist()
+    max_seq_length = 256
+    batches = embedder._plan_batches(lengths, max_seq_length)
+
+    assert sorted(i for batch in batches for i in batch) == list(range(len(lengths)))
+    for batch in batches:
+        padded_to = min(lengths[batch[0]], max_seq_length)
+        assert all(min(lengths[i], max_seq_length) <= padded_to for i in batch)
+        assert len(batch) <= embedder.EMBED_MAX_BATCH_ITEMS
+        assert len(batch) == 1 or len(batch) * padded_to <= embedder.EMBED_TOKEN_BUDGET
+
+
+def test_plan_batches_caps_items_for_short_texts():
+    batches = embedder._plan_batches([4] * 1000, 256)
+    assert max(len(batch) for batch in batches) == embedder.EMBED_MAX_BATCH_ITEMS
+
+
+# ── Async micro-batching ────────────────────────────────────────────
+
+def test_batcher_merges_concurrent_requests(monkeypatch):
+    calls = []
+
+    def fake_embed_texts(texts, normalize=True):
+        calls.append(list(texts))
+        return np.array([[float(len(t))] * embedder.EMBEDDING_DIM for t in texts], dtype=np.float32)
+
+    monkeypatch.setattr(embedder, "embed_texts", fake_embed_texts)
+    batcher = embedder._EmbeddingBatcher(window_ms=50, max_batch=64)
+
+    async def run():
+        return await asyncio.gather(
+            batcher.submit(["a"], True),
+            batcher.submit(["bb", "ccc"], True),
+            batcher.submit(["dddd"], True),
+        )
+
+    first, second, third = asyncio.run(run())
+    assert calls == [["a", "bb", "ccc", "dddd"]]
+    assert first.shape == (1, embedder.EMBEDDING_DIM) and first[0, 0] == 1
+    assert second[:, 0].tolist() == [2, 3]
+    assert third[0, 0] == 4
+    assert batcher.stats()["batches"] == 1
+
+
+def test_batcher_propagates_encode_errors(monkeypatch):
+    def failing_embed_texts(texts, normalize=True):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(embedder, "embed_texts", failing_embed_texts)
+    batcher = embedder._EmbeddingBatcher(window_ms=1, max_batch=64)
+
+    async def run():
+        return await batcher.submit(["a"], True)
+
+    with pytest.raises(RuntimeError, match="model unavailable"):
+        asyncio.run(run())
+
+
+# ── Backend parity (needs model weights; opt-in) ────────────────────
+
+@pytest.mark.skipif(not os.getenv("EMBED_PARITY"), reason="set EMBED_PARITY=1 to load the real model")
+@pytest.mark.parametrize("backend", sorted(embedder.ONNX_MODEL_FILES))
+def test_onnx_backend_parity(backend):
+    report = embedder.check_parity(backend)
+    assert report["passed"], report
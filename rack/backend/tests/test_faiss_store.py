@@ -0,0 +1,174 @@
+"""
+FAISS store storage path against a brute-force numpy reference.
+
+Each test indexes a few synthetic resumes in a temp FAISS_DIR, deletes one
+(leaving dead rows in the vector store), compacts, and checks that filtered
+search, search_batch and dense_search_by_resume return exactly what an
+exhaustive inner-product scan over the live vectors returns.
+"""
+
+import numpy as np
+import pytest
+
+import services.faiss_store as faiss_store
+
+DIM = faiss_store.EMBEDDING_DIM
+USER = "test-user"
+
+
+def _unit(rng, n):
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(faiss_store, "FAISS_DIR", tmp_path)
+    faiss_store._INDEX_CACHE.clear()
+    yield
+    faiss_store._INDEX_CACHE.clear()
+
+
+def _index_resumes(rng, sizes):
+    """Add one resume per size; returns resume_id → (chunk texts, vectors)."""
+    resumes = {}
+    for n, size in enumerate(sizes):
+        resume_id = f"r{n}"
+        texts = [f"{resume_id}-chunk{i}" for i in range(size)]
+        vectors = _unit(rng, size)
+        chunks = [{"text": t, "section": "experience", "weight": 1.0} for t in texts]
+        faiss_store.add_resume_vectors(resume_id, chunks, vectors, user_id=USER)
+        resumes[resume_id] = (texts, vectors)
+    return resumes
+
+
+def _reference_hits(resumes, query, k, only=None):
+    """Exhaustive top-k [(text, score)] over the live vectors (optionally one resume)."""
+    pool = [
+        (text, float(vector @ query))
+        for resume_id, (texts, vectors) in resumes.items()
+        if only is None or resume_id == only
+        for text, vector in zip(texts, vectors)
+    ]
+    return sorted(pool, key=lambda hit: -hit[1])[:k]
+
+
+def _hits(results):
+    return [(r["text"], r["score"]) for r in results]
+
+
+def _assert_same(actual, expected):
+    assert [text for text, _ in actual] == [text for text, _ in expected]
+    np.testing.assert_allclose(
+        [score for _, score in actual], [score for _, score in expected], atol=1e-5,
+    )
+
+
+def _check_against_reference(resumes, queries, nprobe):
+    k = 4
+    for query in queries:
+        for resume_id, (texts, _) in resumes.items():
+            hits = faiss_store.search(query, top_k=k, user_id=USER, resume_id_filter=resume_id)
+            assert len(hits) == min(k, len(texts))
+            _assert_same(_hits(hits), _reference_hits(resumes, query, k, only=resume_id))
+
+    global_k = 12
+    batch = faiss_store.search_batch(queries, top_k=global_k, user_id=USER, nprobe=nprobe)
+    dense = faiss_store.dense_search_by_resume(queries, top_k_per_resume=k, user_id=USER)
+    assert len(batch) == len(dense) == len(queries)
+    for query, batch_row, dense_row in zip(queries, batch, dense):
+        expected_global = _reference_hits(resumes, query, global_k)
+        got_global = sorted(
+            (hit for hits in batch_row.values() for hit in _hits(hits)), key=lambda hit: -hit[1],
+        )
+        _assert_same(got_global, expected_global)
+        for resume_id, hits in batch_row.items():
+            assert all(h["resume_id"] == resume_id for h in hits)
+
+        assert set(dense_row) == set(resumes)
+        for resume_id, hits in dense_row.items():
+            _assert_same(_hits(hits), _reference_hits(resumes, query, k, only=resume_id))
+
+
+@pytest.mark.parametrize("sizes, index_type", [
+    ([3, 9, 5, 12, 2], "Flat"),
+    ([30, 45, 25, 40, 35], "IVFFlat"),
+])
+def test_add_remove_compact_matches_brute_force(store, sizes, index_type):
+    rng = np.random.default_rng(7)
+    resumes = _index_resumes(rng, sizes)
+    queries = _unit(rng, 6)
+    # Probe every cell so IVF search_batch is exhaustive like the reference
+    nprobe = sum(sizes)
+
+    _check_against_reference(resumes, queries, nprobe)
+
+    assert faiss_store.remove_resume_vectors("r1", user_id=USER, background_compact=False)
+    del resumes["r1"]
+    assert faiss_store.search(queries[0], top_k=4, user_id=USER, resume_id_filter="r1") == []
+    _check_against_reference(resumes, queries, nprobe)
+
+    result = faiss_store.compact_index(USER)
+    assert result == {"compacted": True, "dead_rows": sizes[1], "total_vectors": sum(sizes) - sizes[1]}
+    assert faiss_store.get_index_stats(USER)["index_type"] == index_type
+    _check_against_reference(resumes, queries, nprobe)
+
+    vectors = faiss_store.get_resume_vectors(USER)
+    assert set(vectors) == set(resumes)
+    for resume_id, (_, expected) in resumes.items():
+        np.testing.assert_allclose(vectors[resume_id], expected, atol=1e-6)
+
+
+def test_append_after_compaction_keeps_ids_consistent(store):
+    rng = np.random.default_rng(11)
+    resumes = _index_resumes(rng, [4, 6, 3])
+    faiss_store.remove_resume_vectors("r0", user_id=USER, background_compact=False)
+    del resumes["r0"]
+    faiss_store.compact_index(USER)
+
+    texts = [f"late-chunk{i}" for i in range(5)]
+    vectors = _unit(rng, 5)
+    faiss_store.add_resume_vectors(
+        "late", [{"text": t, "section": "skills", "weight": 1.0} for t in texts], vectors, user_id=USER,
+    )
+    resumes["late"] = (texts, vectors)
+
+    _check_against_reference(resumes, _unit(rng, 4), nprobe=None)
+
+
+def test_recall_is_remeasured_as_appends_grow_the_index(store, monkeypatch):
+    monkeypatch.setattr(faiss_store, "RETRAIN_GROWTH_FACTOR", 100.0)   # keep appending in place
+    monkeypatch.setattr(faiss_store, "RETRAIN_DRIFT_MAX", 10.0)
+    rng = np.random.default_rng(3)
+    _index_resumes(rng, [60, 60])
+    stats = faiss_store.get_index_stats(USER)
+    assert stats["index_type"] == "IVFFlat"
+    assert stats["recall_measured_at_ntotal"] == 120
+
+    def append(resume_id, n):
+        chunks = [{"text": f"{resume_id}-{i}", "section": "skills", "weight": 1.0} for i in range(n)]
+        return faiss_store.add_resume_vectors(resume_id, chunks, _unit(rng, n), user_id=USER)
+
+    assert not append("small", 10)["rebuilt"]   # 130 < 120 × RECALL_REMEASURE_GROWTH
+    assert faiss_store.get_index_stats(USER)["recall_measured_at_ntotal"] == 120
+
+    assert not append("large", 30)["rebuilt"]
+    stats = faiss_store.get_index_stats(USER)
+    assert stats["recall_measured_at_ntotal"] == 160
+    assert 0.0 <= stats["recall_at_k"] <= 1.0
+
+
+def test_hnsw_filtered_search_is_exact_and_complete(store, monkeypatch):
+    monkeypatch.setattr(faiss_store, "INDEX_MODE", "HNSW")
+    rng = np.random.default_rng(5)
+    resumes = _index_resumes(rng, [25] * 60)
+    assert faiss_store.get_index_stats(USER)["index_type"] == "HNSW"
+
+    faiss_store.remove_resume_vectors("r7", user_id=USER, background_compact=False)
+    del resumes["r7"]
+    for query in _unit(rng, 5):
+        for resume_id in ("r0", "r31", "r59"):
+            for k in (5, 25, 40):
+                hits = faiss_store.search(query, top_k=k, user_id=USER, resume_id_filter=resume_id)
+                assert len(hits) == min(k, 25)
+                _assert_same(_hits(hits), _reference_hits(resumes, query, k, only=resume_id))
@@ -0,0 +1,224 @@
+"""
+LLM client limiter and retry plumbing.
+
+Limiter state is swapped for fresh objects driven by a fake clock, so these
+run without an API key or network; HTTP responses are built in memory.
+"""
+
+import asyncio
+from email.utils import format_datetime
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import pytest
+
+import services.llm_client as llm_client
+from services.llm_client import LLMRequestError, _AdaptiveConcurrency, _TokenBucket
+
+
+class FakeClock:
+    """Stands in for the `time` module inside llm_client."""
+
+    def __init__(self, start: float = 1000.0):
+        self.now = start
+        self.wall = 1_700_000_000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.wall
+
+    def sleep(self, seconds: float):
+        self.now += seconds
+
+    def advance(self, seconds: float):
+        self.now += seconds
+        self.wall += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(llm_client, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def limiter(clock, monkeypatch):
+    """Fresh buckets (60 req/min, 6000 tok/min) and concurrency state."""
+    rpm, tpm = _TokenBucket(60), _TokenBucket(6000)
+    rpm.updated = tpm.updated = clock.now
+    monkeypatch.setattr(llm_client, "_rpm_bucket", rpm)
+    monkeypatch.setattr(llm_client, "_tpm_bucket", tpm)
+    monkeypatch.setattr(llm_client, "_paused_until", 0.0)
+    monkeypatch.setattr(llm_client, "_concurrency", _AdaptiveConcurrency(2, 1, 8))
+    monkeypatch.setattr(llm_client, "_metrics", dict(llm_client._metrics))
+    return rpm, tpm
+
+
+# ── Token bucket ────────────────────────────────────────────────────
+
+def test_bucket_goes_into_debt_and_reports_wait():
+    bucket = _TokenBucket(60)
+    bucket.updated = 0.0
+    assert bucket.reserve(60, 0.0) == 0.0
+    assert bucket.reserve(3, 0.0) == pytest.approx(3.0)   # 1 token/s refill
+    assert bucket.reserve(1, 2.0) == pytest.approx(2.0)   # 2 s refilled, 1 more queued
+
+
+def test_bucket_adjust_refunds_up_to_capacity():
+    bucket = _TokenBucket(60)
+    bucket.updated = 0.0
+    bucket.reserve(30, 0.0)
+    bucket.adjust(10, 0.0)
+    assert bucket.level == pytest.approx(40)
+    bucket.adjust(1000, 0.0)
+    assert bucket.level == pytest.approx(60)
+
+
+def test_reserve_returns_wait_within_deadline(clock, limiter):
+    rpm, tpm = limiter
+    assert llm_client._reserve(5000, clock.now + 60) == 0.0
+    wait = llm_client._reserve(2000, clock.now + 60)
+    assert wait == pytest.approx(10.0)   # 1000 tokens short at 100 tok/s
+    assert tpm.level == pytest.approx(-1000)
+    assert rpm.level == pytest.approx(58)
+
+
+def test_reserve_refunds_when_deadline_cannot_cover_wait(clock, limiter):
+    rpm, tpm = limiter
+    llm_client._reserve(6000, clock.now + 60)
+    before = (rpm.level, tpm.level)
+    assert llm_client._reserve(500, clock.now + 1.0) is None
+    assert (rpm.level, tpm.level) == pytest.approx(before)
+    assert llm_client._metrics["rate_wait_s"] == 0.0
+
+
+def test_reserve_honours_retry_after_pause(clock, limiter, monkeypatch):
+    monkeypatch.setattr(llm_client, "_paused_until", clock.now + 7.0)
+    assert llm_client._reserve(10, clock.now + 60) == pytest.approx(7.0)
+    assert llm_client._reserve(10, clock.now + 5) is None
+
+
+def test_sync_give_up_leaves_buckets_untouched(clock, limiter, monkeypatch):
+    rpm, tpm = limiter
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    tpm.reserve(12000, clock.now)   # a minute of debt queued ahead of us
+    before = (rpm.level, tpm.level)
+    with pytest.raises(LLMRequestError, match="rate limit"):
+        llm_client.chat_completion_sync([{"role": "user", "content": "hi"}], deadline=5.0)
+    assert (rpm.level, tpm.level) == pytest.approx(before)
+    assert llm_client._metrics["failed"] == 1
+
+
+# ── Retry-After ─────────────────────────────────────────────────────
+
+def test_retry_after_prefers_milliseconds_header():
+    response = httpx.Response(429, headers={"retry-after-ms": "1500", "retry-after": "9"})
+    assert llm_client._retry_after_seconds(response) == pytest.approx(1.5)
+
+
+def test_retry_after_seconds_and_missing():
+    assert llm_client._retry_after_seconds(httpx.Response(429, headers={"retry-after": "4"})) == 4.0
+    assert llm_client._retry_after_seconds(httpx.Response(429)) is None
+    assert llm_client._retry_after_seconds(httpx.Response(429, headers={"retry-after": "soon"})) is None
+
+
+def test_retry_after_http_date(clock):
+    when = datetime.fromtimestamp(clock.wall, timezone.utc) + timedelta(seconds=30)
+    response = httpx.Response(503, headers={"retry-after": format_datetime(when, usegmt=True)})
+    assert llm_client._retry_after_seconds(response) == pytest.approx(30.0, abs=1.0)
+
+
+def test_429_with_retry_after_pauses_everyone(clock, limiter):
+    response = httpx.Response(429, headers={"retry-after": "3"})
+    outcome, value = llm_client._handle_response(response, 0.1, 100)
+    assert (outcome, value) == ("retry", 3.0)
+    assert llm_client._paused_until == pytest.approx(clock.now + 3.0)
+
+
+# ── Response handling ───────────────────────────────────────────────
+
+def test_success_corrects_token_estimate(clock, limiter):
+    _, tpm = limiter
+    tpm.reserve(1000, clock.now)
+    response = httpx.Response(200, json={
+        "choices": [{"message": {"content": "  ok  "}}],
+        "usage": {"total_tokens": 400},
+    })
+    assert llm_client._handle_response(response, 0.1, 1000) == ("ok", "ok")
+    assert tpm.level == pytest.approx(5600)
+
+
+@pytest.mark.parametrize("payload", [
+    {"choices": [{"message": {"content": None}}]},
+    {"choices": []},
+    {"choices": [{"message": {}}]},
+    ["not", "an", "object"],
+])
+def test_malformed_200_is_a_request_error(limiter, payload):
+    outcome, error = llm_client._handle_response(httpx.Response(200, json=payload), 0.1, 10)
+    assert outcome == "fail"
+    assert isinstance(error, LLMRequestError)
+
+
+def test_non_retryable_status_fails():
+    outcome, error = llm_client._handle_response(httpx.Response(401, text="bad key"), 0.1, 10)
+    assert outcome == "fail" and error.status_code == 401
+
+
+# ── AIMD concurrency ────────────────────────────────────────────────
+
+def test_throttle_halves_limit_once_per_cooldown():
+    limiter = _AdaptiveConcurrency(8, 1, 32)
+    limiter.on_throttle(100.0)
+    assert limiter.limit == 4
+    limiter.on_throttle(100.5)   # same burst of 429s
+    assert limiter.limit == 4
+    limiter.on_throttle(100.0 + llm_client.LLM_DECREASE_COOLDOWN_S)
+    assert limiter.limit == 2
+
+
+def test_throttle_stops_at_minimum():
+    limiter = _AdaptiveConcurrency(1, 1, 32)
+    limiter.on_throttle(100.0)
+    assert limiter.limit == 1
+
+
+def test_success_grows_limit_only_while_saturated():
+    limiter = _AdaptiveConcurrency(2, 1, 32)
+    limiter.on_success(0.1)
+    assert limiter.limit == 2   # idle slots — nothing to grow for
+
+    limiter.in_flight = 2
+    for _ in range(2):
+        limiter.on_success(0.1)
+    assert limiter.limit == pytest.approx(2.9, abs=0.1)
+
+
+def test_slow_success_shrinks_limit():
+    limiter = _AdaptiveConcurrency(10, 1, 32)
+    limiter.on_success(llm_client.LLM_LATENCY_TARGET_S + 1)
+    assert limiter.limit == pytest.approx(9.0)
+
+
+def test_async_acquire_times_out_and_keeps_queue_clean():
+    limiter = _AdaptiveConcurrency(1, 1, 4)
+
+    async def run():
+        assert await limiter.acquire(llm_client.time.monotonic() + 1)
+        assert not await limiter.acquire(llm_client.time.monotonic() + 0.05)
+        assert not limiter._waiters
+        limiter.release()
+        assert await limiter.acquire(llm_client.time.monotonic() + 0.05)
+
+    asyncio.run(run())
+    assert limiter.in_flight == 1
+
+
+def test_sync_acquire_times_out():
+    limiter = _AdaptiveConcurrency(1, 1, 4)
+    assert limiter.acquire_sync(llm_client.time.monotonic() + 1)
+    assert not limiter.acquire_sync(llm_client.time.monotonic() + 0.05)
+    assert not limiter._waiters